@@ -1,12 +1,32 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
+import importlib
 import json
 import os
+import sys
 import math
+import time
+from collections import deque
+
+from scheduler import (IncrementalScheduler, ScheduleCache, build_schedule, compute_entry, snapshot_day,
+                       time_to_min, min_to_time)
+from model import minutes_label, parse_hhmm
+from storage import DayStore, key_for_date
+from analytics import date_range, month_bounds, week_bounds
+from background import LatestRequests
+from rollups import ROLLUP_FILE, RollupStore, compute_rollups, day_rollup, mood_score
+from recurrence import DEFAULT_TEMPLATE, RECURRENCE_FILE, Calendar, LayeredDays
+from dayindex import DayIndex, parse_day_key
+from profiling import PROFILER, profiled, span, trace_path
+from optimize import optimize_schedule
 
 # --- CONFIGURATION & THEME ---
-DATA_FILE = "weekly_timetable.json"
+DATA_FILE = "weekly_timetable.json"   # old single-file format, migrated on first start
+DATA_DIR = "zenith_data"
+TIMINGS = bool(os.environ.get("ZENITH_TIMINGS"))     # print startup / page switch times to stderr
+REBUILD_CHUNK = 64      # days per background job when rollups are rebuilt
+OVERLAY_MS = 500        # refresh period of the profiling overlay (F12)
 COLORS = {
     "bg": "#F4F6F9",            # Light Grey Background
     "sidebar": "#2C3E50",       # Dark Blue Sidebar
@@ -20,34 +40,158 @@ COLORS = {
     "card_bg": "#FFFFFF"
 }
 
-# --- HELPER FUNCTIONS ---
-def time_to_min(t_str):
-    """Convert HH:MM string to minutes from midnight."""
-    try:
-        t = datetime.strptime(t_str, "%H:%M")
-        return t.hour * 60 + t.minute
-    except:
-        return 0
-
-def min_to_time(mins):
-    """Convert minutes from midnight to HH:MM."""
-    h = int(mins // 60)
-    m = int(mins % 60)
-    return f"{h:02d}:{m:02d}"
+TYPE_COLORS = {                 # (time box, card border)
+    "Class": ("#E8F6F3", "#1ABC9C"),
+    "Meal": ("#FEF9E7", "#F1C40F"),
+    "Task": ("#EBF5FB", "#3498DB"),
+}
+
+# --- WIDGETS ---
+class TimelineCanvas(tk.Canvas):
+    """
+    Timeline drawn as canvas items on a single Canvas. Only rows inside
+    the visible viewport (plus a small overscan) exist as canvas items;
+    they are created and dropped as the view scrolls. Task checkboxes are
+    hit-tested from the click position and redrawn in place.
+    """
+    ROW_H = 70
+    OVERSCAN = 2
+
+    def __init__(self, parent, on_toggle=None, **kw):
+        super().__init__(parent, bg="white", highlightthickness=0, yscrollincrement=10, **kw)
+        self.on_toggle = on_toggle
+        self.items = []
+        self._rows = {}         # row index -> {"ids": [...], "box": id, "mark": id}
+        self._width = 0
+
+        self.bind("<Configure>", self._on_configure)
+        self.bind("<Button-1>", self._on_click)
+        self.bind("<MouseWheel>", lambda e: self._scroll(-3 if e.delta > 0 else 3))
+        self.bind("<Button-4>", lambda e: self._scroll(-3))
+        self.bind("<Button-5>", lambda e: self._scroll(3))
+
+    def set_items(self, items):
+        self.items = items
+        self.delete("all")
+        self._rows.clear()
+        self.configure(scrollregion=(0, 0, self._width, len(items) * self.ROW_H))
+        self._render_visible()
+
+    def yview(self, *args):
+        result = super().yview(*args)
+        if args:
+            self._render_visible()
+        return result
+
+    def _scroll(self, units):
+        self.yview_scroll(units, "units")
+        self._render_visible()
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            # Card widths depend on the canvas width: lay the rows out again
+            self._width = event.width
+            self.set_items(self.items)
+        else:
+            self._render_visible()
+
+    def _visible_range(self):
+        top = self.canvasy(0)
+        bottom = self.canvasy(self.winfo_height())
+        first = max(0, int(top // self.ROW_H) - self.OVERSCAN)
+        last = min(len(self.items), int(bottom // self.ROW_H) + 1 + self.OVERSCAN)
+        return first, last
+
+    @profiled("timeline.render")
+    def _render_visible(self):
+        first, last = self._visible_range()
+        for i in [i for i in self._rows if i < first or i >= last]:
+            for item_id in self._rows.pop(i)["ids"]:
+                self.delete(item_id)
+        for i in range(first, last):
+            if i not in self._rows:
+                self._rows[i] = self._draw_row(i)
+
+    def _draw_row(self, i):
+        item = self.items[i]
+        y0 = i * self.ROW_H + 5
+        right = max(self._width, 400) - 5
+        bg_c, border_c = TYPE_COLORS.get(item['type'], ("#ECF0F1", "#BDC3C7"))
+
+        ids = [
+            # Time Block
+            self.create_rectangle(0, y0, 80, y0 + 50, fill=bg_c, outline=""),
+            self.create_text(40, y0 + 25, text=item['start'], font=("Segoe UI", 10, "bold"), fill="#2C3E50"),
+            # Details Block (Visual Card)
+            self.create_rectangle(95, y0, right, y0 + 60, fill="white", outline=border_c),
+            self.create_text(107, y0 + 18, text=item['name'], anchor="w", font=("Segoe UI", 12, "bold"), fill="#2C3E50"),
+            self.create_text(107, y0 + 42, text=f"{item['type']} • {item['end']} ({item['duration']}m)",
+                             anchor="w", font=("Segoe UI", 10), fill="#7F8C8D"),
+        ]
+        row = {"ids": ids, "box": None, "mark": None}
+
+        # Checkbox for tasks
+        if item['type'] == 'Task':
+            row["box"] = self.create_rectangle(right - 30, y0 + 9, right - 12, y0 + 27, width=1)
+            row["mark"] = self.create_text(right - 21, y0 + 18, text="✓", font=("Segoe UI", 10, "bold"), fill="white")
+            ids += [row["box"], row["mark"]]
+            self._paint_check(row, item.get('completed', False))
+        return row
+
+    def _paint_check(self, row, checked):
+        self.itemconfigure(row["box"], fill=COLORS["accent"] if checked else "white",
+                           outline=COLORS["accent"] if checked else "#7F8C8D")
+        self.itemconfigure(row["mark"], state="normal" if checked else "hidden")
+
+    def _on_click(self, event):
+        x, y = self.canvasx(event.x), self.canvasy(event.y)
+        i = int(y // self.ROW_H)
+        row = self._rows.get(i)
+        if row is None or row["box"] is None:
+            return
+        x1, y1, x2, y2 = self.coords(row["box"])
+        if not (x1 - 4 <= x <= x2 + 4 and y1 - 4 <= y <= y2 + 4):
+            return
+
+        item = self.items[i]
+        value = not item.get('completed', False)
+        if self.on_toggle:
+            self.on_toggle(item['name'], value)
+        self.refresh_checks()
+
+    def refresh_checks(self):
+        """Redraw the checkboxes of the materialized rows from their items."""
+        for i, row in self._rows.items():
+            if row["box"] is not None:
+                self._paint_check(row, self.items[i].get('completed', False))
 
 # --- CORE APPLICATION ---
 class ModernTimetableApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, data_dir=DATA_DIR, legacy_file=DATA_FILE):
+        self._t0 = time.perf_counter()
         super().__init__()
         self.title("🚀 Zenith - Smart Scheduler")
         self.geometry("1280x800")
         self.minsize(1100, 700)
         self.configure(bg=COLORS["bg"])
         
-        # Data Storage
-        self.weekly_data = self.load_data()
+        # Data Storage (opened once the window is on screen, see finish_startup)
+        self.data_dir, self.legacy_file = data_dir, legacy_file
+        self.store = None
+        self.calendar = None
+        self.weekly_data = None
+        self.day_index = None       # stored dates, built after startup (see index_days)
+        self.rollups = None
+        self.schedule_cache = ScheduleCache()
+        # Schedules / analytics that are not cached are computed here, off the Tk thread
+        self.background = LatestRequests(self)
         self.current_view_date = datetime.now().strftime("%d-%m-%Y")
         self.current_view_day = datetime.now().strftime("%A")
+        self.analytics_view = "Day"
+
+        # Startup phases (seconds since __init__) and recent page switch times
+        self.timings = {}
+        self.switch_times = deque(maxlen=200)
 
         # Setup Styles
         self._setup_styles()
@@ -58,9 +202,58 @@ class ModernTimetableApp(tk.Tk):
 
         self._create_sidebar()
         self._create_main_area()
-        
-        # Default Page
-        self.show_dashboard()
+
+        # Pages are built on first visit and then kept, see show_page
+        self.pages = {}
+        self.current_page = None
+        self._requested_page = "Dashboard"
+        self._loading = tk.Label(self.main_frame, text="Loading…", font=("Segoe UI", 16), bg=COLORS["bg"], fg="#95a5a6")
+        self._loading.grid(row=0, column=0)
+
+        # Saving happens on the store's writer thread: flush it on close, surface its errors
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._save_error_shown = False
+        self.bind("<Map>", self._on_map)
+        # Hidden: F12 toggles profiling and its overlay, Shift+F12 saves a trace (see profiling.py)
+        self._overlay = None
+        self.bind("<F12>", lambda e: self.toggle_profiling())
+        self.bind("<Shift-F12>", lambda e: self.export_trace())
+        self._mark("init")
+
+    def _mark(self, phase):
+        self.timings[phase] = time.perf_counter() - self._t0
+
+    def _on_map(self, event):
+        # The root's bindings also see its children's events
+        if event.widget is self and "mapped" not in self.timings:
+            self._mark("mapped")
+            self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Open the data and show the first page, once the empty window has been painted."""
+        if self.store is not None:
+            return
+        self.update_idletasks()
+        self._mark("first_paint")
+        with span("load_data"):
+            self.store = DayStore(self.data_dir, legacy_file=self.legacy_file)
+            self.calendar = Calendar(os.path.join(self.data_dir, RECURRENCE_FILE))
+            self.weekly_data = self.load_data()
+            self.rollups = RollupStore(os.path.join(self.data_dir, ROLLUP_FILE))
+            self._rollup_stamp = self.data_stamp()     # before this session writes anything
+        self._mark("data_loaded")
+
+        self._loading.destroy()
+        self.show_page(self._requested_page)
+        self._mark("ready")
+        self.index_days()
+        self.background.submit("rollups_file", self.rollups.read, self._rollup_stamp, self.store.keys,
+                               on_done=self._rollups_read)
+        self.after(500, self.poll_save_errors)
+        if PROFILER.enabled:
+            self.show_overlay()
+        if TIMINGS:
+            print("startup: " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in self.timings.items()), file=sys.stderr)
 
     def _setup_styles(self):
         style = ttk.Style()
@@ -86,17 +279,119 @@ class ModernTimetableApp(tk.Tk):
         style.configure("TCombobox", padding=5)
 
     def load_data(self):
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, "r") as f:
-                    return json.load(f)
-            except:
-                pass
-        return {}
+        # Days are read from disk on demand (see storage.DayStore) and laid over
+        # their weekly rules and meal templates (see recurrence.LayeredDays)
+        return LayeredDays(self.store, self.calendar)
 
-    def save_data(self):
-        with open(DATA_FILE, "w") as f:
-            json.dump(self.weekly_data, f, indent=2)
+    def data_stamp(self):
+        """Changes whenever the stored days or the rules change (see RollupStore.load)."""
+        return self.store.stamp() + [self.calendar.stamp()]
+
+    def get_day_index(self):
+        """Stored dates, for navigation and lookups (built here if index_days has not finished)."""
+        if self.day_index is None:
+            self.background.cancel("day_index")
+            self.day_index = DayIndex(self.weekly_data.keys())
+        return self.day_index
+
+    def index_days(self):
+        """Build the day index on a worker: it reads the manifest and parses every key."""
+        self.background.submit("day_index", lambda days: DayIndex(days.keys()), self.weekly_data,
+                               on_done=self._days_indexed)
+
+    def _days_indexed(self, index):
+        before = self.view_key()
+        self.day_index = index
+        if self.current_page == "Dashboard" and self.view_key() != before:
+            self.refresh_dashboard()    # the viewed date is stored under an older-style key
+
+    def day_key_for(self, day, date_str):
+        """
+        Key of a day/date pair: the date's canonical key, or an older-style
+        key already holding that date (e.g. with a mismatched weekday). Those
+        are only found once the day index is built.
+        """
+        date = parse_day_key(date_str)
+        if date is None:
+            return f"{day} {date_str}"
+        key = key_for_date(date)
+        if key in self.weekly_data or self.day_index is None:
+            return key
+        return self.day_index.key_for(date) or key
+
+    def view_key(self):
+        return self.day_key_for(self.current_view_day, self.current_view_date)
+
+    def set_view_date(self, date):
+        self.current_view_day = f"{date:%A}"
+        self.current_view_date = f"{date:%d-%m-%Y}"
+
+    def poll_save_errors(self):
+        errors = []
+        while not self.store.errors.empty():
+            errors.append(self.store.errors.get_nowait())
+        if errors and not self._save_error_shown:
+            # One dialog per failure streak; the writer keeps retrying meanwhile
+            self._save_error_shown = True
+            messagebox.showerror("Save failed", f"Could not save your changes:\n{errors[-1]}\n\nZenith will keep retrying.")
+        elif self.store.last_error is None:
+            self._save_error_shown = False
+        self.after(500, self.poll_save_errors)
+
+    # --- PROFILING ---
+    def toggle_profiling(self):
+        PROFILER.enabled = not PROFILER.enabled
+        if PROFILER.enabled:
+            self.show_overlay()
+        elif self._overlay is not None:
+            self._overlay.destroy()
+            self._overlay = None
+
+    def show_overlay(self):
+        """Small p50/p99 table in the bottom-right corner, refreshed while profiling is on."""
+        if self._overlay is None:
+            self._overlay = tk.Label(self, font=("Consolas", 9), bg=COLORS["sidebar"], fg="white",
+                                     justify="left", anchor="w", padx=8, pady=6)
+            self._overlay.place(relx=1.0, rely=1.0, x=-8, y=-8, anchor="se")
+            self._refresh_overlay()
+
+    def _refresh_overlay(self):
+        if self._overlay is None:
+            return
+        self._overlay.configure(text=PROFILER.report(limit=10))
+        self._overlay.lift()
+        self.after(OVERLAY_MS, self._refresh_overlay)
+
+    def export_trace(self, path=None):
+        path = path or trace_path() or os.path.join(os.path.dirname(os.path.abspath(self.data_dir)), "zenith_trace.json")
+        n = PROFILER.export_chrome(path)
+        if self._overlay is not None:
+            self._overlay.configure(text=f"{n} calls saved to {path}")
+        return path
+
+    def on_close(self):
+        self.background.shutdown()
+        if trace_path():
+            try:
+                self.export_trace()
+            except OSError as e:
+                print(f"could not write the trace: {e}", file=sys.stderr)
+        if self.store is None:      # closed while still starting up
+            self.destroy()
+            return
+        if not self.store.flush(timeout=5):
+            if not messagebox.askyesno("Unsaved changes", f"Some changes could not be saved ({self.store.last_error}).\nQuit anyway?"):
+                return
+        try:
+            self.store.close()
+            if not self.rollups.loaded:
+                self.background.cancel("rollups_file")
+                self.rollups.load(self._rollup_stamp, self.store.keys)
+            # Stamped with the store's final state; a mismatch next time means a rebuild
+            self.rollups.save(self.data_stamp())
+        except Exception:
+            pass    # already confirmed above
+        self.destroy()
 
     # --- UI LAYOUTS ---
     def _create_sidebar(self):
@@ -127,10 +422,45 @@ class ModernTimetableApp(tk.Tk):
     def _create_main_area(self):
         self.main_frame = tk.Frame(self, bg=COLORS["bg"])
         self.main_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+        self.main_frame.grid_rowconfigure(0, weight=1)
+        self.main_frame.grid_columnconfigure(0, weight=1)
 
-    def clear_main(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
+    @profiled("show_page")
+    def show_page(self, name):
+        """
+        Raise a page, building it on first use. Pages stay alive between
+        visits; only their data-bound parts are refreshed (refresh_<page>).
+        """
+        if self.weekly_data is None:
+            self._requested_page = name     # still starting up: show it once the data is in
+            return
+        t0 = time.perf_counter()
+        page = self.pages.get(name)
+        if page is None:
+            page = tk.Frame(self.main_frame, bg=COLORS["bg"])
+            page.grid(row=0, column=0, sticky="nsew")
+            getattr(self, f"build_{name.lower()}")(page)
+            self.pages[name] = page
+        self.set_active_nav(name)
+        getattr(self, f"refresh_{name.lower()}")()
+        page.tkraise()
+        self.current_page = name
+        self.update_idletasks()
+
+        elapsed = time.perf_counter() - t0
+        self.switch_times.append((name, elapsed))
+        if TIMINGS:
+            print(f"page {name}: {elapsed * 1000:.1f}ms", file=sys.stderr)
+
+    def show_dashboard(self):
+        self.show_page("Dashboard")
+
+    def show_editor(self):
+        self.show_page("Editor")
+
+    def show_analytics(self, view=None):
+        if view: self.analytics_view = view
+        self.show_page("Analytics")
 
     def set_active_nav(self, name):
         for key, btn in self.nav_btns.items():
@@ -140,54 +470,108 @@ class ModernTimetableApp(tk.Tk):
                 btn.config(bg=COLORS["sidebar"], fg="#BDC3C7")
 
     # ================= DASHBOARD (TIMELINE) =================
-    def show_dashboard(self):
-        self.clear_main()
-        self.set_active_nav("Dashboard")
-        
+    def build_dashboard(self, page):
         # Header
-        top_bar = tk.Frame(self.main_frame, bg=COLORS["bg"])
+        top_bar = tk.Frame(page, bg=COLORS["bg"])
         top_bar.pack(fill="x", pady=(0, 20))
         ttk.Label(top_bar, text="Today's Timeline", style="Header.TLabel").pack(side="left")
         
-        # Date Selector (Simple wrapper for demo)
-        day_key = f"{self.current_view_day} {self.current_view_date}"
-        ttk.Label(top_bar, text=f"Viewing: {day_key}", font=("Segoe UI", 12), background=COLORS["bg"]).pack(side="right", padx=10)
-
-        if day_key not in self.weekly_data:
-            self.render_empty_state(day_key)
-            return
+        # Date Selector: previous / next day with a schedule
+        ttk.Button(top_bar, text="▶", width=3, command=lambda: self.step_day(1)).pack(side="right")
+        self.dash_day_label = ttk.Label(top_bar, font=("Segoe UI", 12), background=COLORS["bg"])
+        self.dash_day_label.pack(side="right", padx=10)
+        ttk.Button(top_bar, text="◀", width=3, command=lambda: self.step_day(-1)).pack(side="right")
 
-        data = self.weekly_data[day_key]
-        schedule = self.calculate_schedule(data)
+        # Entries that could not be parsed are left out of the schedule: shown when there are any
+        self.dash_warning = tk.Label(page, bg=COLORS["bg"], fg=COLORS["danger"], font=("Segoe UI", 10), anchor="w")
+        self.dash_content = tk.Frame(page, bg=COLORS["bg"])
+        self.dash_empty = self.build_empty_state(page)
+        self.dash_loading = tk.Label(page, text="Computing schedule…", font=("Segoe UI", 14), bg=COLORS["bg"], fg="#95a5a6")
 
         # Statistics Summary
-        stats_frame = tk.Frame(self.main_frame, bg=COLORS["bg"])
+        stats_frame = tk.Frame(self.dash_content, bg=COLORS["bg"])
         stats_frame.pack(fill="x", pady=(0, 20))
-        
-        total_tasks = len([x for x in schedule if x['type'] == 'Task'])
-        completed = len([x for x in schedule if x['type'] == 'Task' and x.get('completed')])
-        
-        self.create_stat_card(stats_frame, "Total Events", str(len(schedule)), COLORS["accent"], 0)
-        self.create_stat_card(stats_frame, "Tasks Done", f"{completed}/{total_tasks}", COLORS["success"], 1)
-        self.create_stat_card(stats_frame, "Day Status", self.get_day_mood(data.get('tasks',[])), COLORS["warning"], 2)
+        self.total_events_label = self.create_stat_card(stats_frame, "Total Events", "", COLORS["accent"], 0)
+        self.tasks_done_label = self.create_stat_card(stats_frame, "Tasks Done", "", COLORS["success"], 1)
+        self.day_mood_label = self.create_stat_card(stats_frame, "Day Status", "", COLORS["warning"], 2)
 
         # Scrollable Canvas for Timeline
-        canvas_frame = ttk.Frame(self.main_frame, style="Card.TFrame")
+        canvas_frame = ttk.Frame(self.dash_content, style="Card.TFrame")
         canvas_frame.pack(fill="both", expand=True)
 
-        canvas = tk.Canvas(canvas_frame, bg="white", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical", command=canvas.yview)
-        scrollable_inner = tk.Frame(canvas, bg="white")
+        self.timeline = TimelineCanvas(canvas_frame)
+        scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical", command=self.timeline.yview)
+        self.timeline.configure(yscrollcommand=scrollbar.set)
         
-        scrollable_inner.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=scrollable_inner, anchor="nw", width=950) # Adjust width for scroll
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True, padx=20, pady=20)
+        self.timeline.pack(side="left", fill="both", expand=True, padx=20, pady=20)
         scrollbar.pack(side="right", fill="y")
+        self._timeline_day = None
+
+    def step_day(self, step):
+        """Move the Dashboard to the previous (step < 0) or next stored day."""
+        date = parse_day_key(self.current_view_date)
+        index = self.get_day_index()
+        target = None
+        if date is not None:
+            target = index.prev(date) if step < 0 else index.next(date)
+        if target is None:
+            self.bell()
+            return
+        self.set_view_date(target)
+        self.show_dashboard()
 
-        # Draw Timeline
-        self.draw_timeline(scrollable_inner, schedule, day_key)
+    def refresh_dashboard(self):
+        day_key = self.view_key()
+        self.dash_day_label.config(text=f"Viewing: {day_key}")
+        for widget in (self.dash_warning, self.dash_content, self.dash_empty, self.dash_loading):
+            widget.pack_forget()
+
+        if day_key not in self.weekly_data:
+            self.background.cancel("dashboard")
+            self.dash_empty.pack(expand=True)
+            return
+
+        data = self.weekly_data[day_key]
+        schedule = self.schedule_cache.lookup(day_key, data)
+        if schedule is None:
+            # Not cached: compute it on a worker and show a placeholder meanwhile
+            self.dash_loading.pack(expand=True)
+            self.background.submit("dashboard", compute_entry, snapshot_day(data),
+                                   on_done=lambda entry: self._dashboard_computed(day_key, entry))
+            return
+        self.background.cancel("dashboard")
+        self.render_dashboard(day_key, data, schedule)
+
+    def _dashboard_computed(self, day_key, entry):
+        self.schedule_cache.put(day_key, entry)
+        if self.current_page == "Dashboard" and day_key == self.view_key():
+            self.refresh_dashboard()
+
+    def render_dashboard(self, day_key, data, schedule):
+        if day_key in self.rollups.dirty:
+            self.rollups.update(day_key, day_rollup(schedule, data))
+
+        errors = self.schedule_cache.plan(day_key).errors
+        if errors:
+            more = f" (+{len(errors) - 1} more)" if len(errors) > 1 else ""
+            self.dash_warning.config(text=f"⚠ Skipped: {errors[0]}{more}")
+            self.dash_warning.pack(fill="x", pady=(0, 10))
+        self.dash_content.pack(fill="both", expand=True)
+
+        total_tasks = len([x for x in schedule if x['type'] == 'Task'])
+        completed = len([x for x in schedule if x['type'] == 'Task' and x.get('completed')])
+        
+        self.total_events_label.config(text=str(len(schedule)))
+        self.tasks_done_label.config(text=f"{completed}/{total_tasks}")
+        self.day_mood_label.config(text=self.get_day_mood(data.get('tasks',[])))
+
+        # Draw Timeline (a cached schedule that is already shown is up to date: toggles patch it in place)
+        if day_key != self._timeline_day:
+            self.timeline.yview_moveto(0)
+            self._timeline_day = day_key
+        elif self.timeline.items is schedule:
+            return
+        self.draw_timeline(self.timeline, schedule, day_key)
 
     def create_stat_card(self, parent, title, value, color, col_idx):
         card = tk.Frame(parent, bg="white", padx=20, pady=15)
@@ -195,66 +579,48 @@ class ModernTimetableApp(tk.Tk):
         parent.grid_columnconfigure(col_idx, weight=1)
         
         tk.Label(card, text=title, font=("Segoe UI", 10), fg="#7f8c8d", bg="white").pack(anchor="w")
-        tk.Label(card, text=value, font=("Segoe UI", 20, "bold"), fg=color, bg="white").pack(anchor="w")
+        value_lbl = tk.Label(card, text=value, font=("Segoe UI", 20, "bold"), fg=color, bg="white")
+        value_lbl.pack(anchor="w")
         # Strip
         tk.Frame(card, bg=color, height=3).pack(fill="x", pady=(10,0))
+        return value_lbl
 
-    def draw_timeline(self, parent, schedule, day_key):
+    @profiled("draw_timeline")
+    def draw_timeline(self, canvas, schedule, day_key):
         # Sort by time
         schedule.sort(key=lambda x: x['start_min'])
-        
-        for item in schedule:
-            row = tk.Frame(parent, bg="white", pady=5)
-            row.pack(fill="x")
-            
-            # Color Coding
-            bg_c = "#ECF0F1" # Default gray
-            border_c = "#BDC3C7"
-            if item['type'] == "Class": bg_c, border_c = "#E8F6F3", "#1ABC9C"
-            elif item['type'] == "Meal": bg_c, border_c = "#FEF9E7", "#F1C40F"
-            elif item['type'] == "Task": bg_c, border_c = "#EBF5FB", "#3498DB"
-
-            # Time Block
-            time_box = tk.Frame(row, bg=bg_c, width=80, height=50)
-            time_box.pack(side="left", padx=(0, 15))
-            time_box.pack_propagate(False)
-            tk.Label(time_box, text=item['start'], font=("Segoe UI", 10, "bold"), bg=bg_c, fg="#2C3E50").pack(expand=True)
+        canvas.on_toggle = lambda name, value: self.toggle_task(day_key, name, value)
+        canvas.set_items(schedule)
 
-            # Details Block (Visual Card)
-            card = tk.Frame(row, bg="white", highlightbackground=border_c, highlightthickness=1, highlightcolor=border_c, padx=10, pady=10)
-            card.pack(side="left", fill="x", expand=True)
-            
-            # Title & Type
-            header = tk.Frame(card, bg="white")
-            header.pack(fill="x")
-            tk.Label(header, text=item['name'], font=("Segoe UI", 12, "bold"), bg="white", fg="#2C3E50").pack(side="left")
-            
-            # Checkbox for tasks
-            if item['type'] == 'Task':
-                var = tk.BooleanVar(value=item.get('completed', False))
-                chk = ttk.Checkbutton(header, variable=var, command=lambda v=var, n=item['name']: self.toggle_task(day_key, n, v))
-                chk.pack(side="right")
-            
-            # Subtext
-            dur = f"{item['end']} ({item['duration']}m)"
-            tk.Label(card, text=f"{item['type']} • {dur}", font=("Segoe UI", 10), bg="white", fg="#7F8C8D").pack(anchor="w")
-
-    def toggle_task(self, day_key, task_name, var):
+    def toggle_task(self, day_key, task_name, completed):
         data = self.weekly_data[day_key]
         for t in data['tasks']:
             if t['name'] == task_name:
-                t['completed'] = var.get()
-        self.save_data()
-        # Refresh stats only (lazy reload)
-        self.after(100, self.show_dashboard)
+                t['completed'] = completed
+        self.schedule_cache.set_completed(day_key, task_name, completed)
+        self.store.set_completed(day_key, task_name, completed)
+
+        # Patch the rows on screen: they need not be the cached list any more
+        # (it may have been evicted), and the checkbox is redrawn from them
+        if self._timeline_day == day_key:
+            tasks = [x for x in self.timeline.items if x['type'] == 'Task']
+            for x in tasks:
+                if x['name'] == task_name:
+                    x['completed'] = completed
+            done = len([x for x in tasks if x.get('completed')])
+            self.tasks_done_label.config(text=f"{done}/{len(tasks)}")
+            self.rollups.patch(day_key, tasks_done=done)    # also outdates rows still being computed
+        else:
+            self.rollups.invalidate(day_key)
+        if self.schedule_cache.plan(day_key) is None:
+            # Evicted: recompute on a worker like the dashboard does, never on the Tk thread
+            self.background.submit("dashboard", compute_entry, snapshot_day(data),
+                                   on_done=lambda entry: self._dashboard_computed(day_key, entry))
 
     # ================= EDITOR (INPUT) =================
-    def show_editor(self):
-        self.clear_main()
-        self.set_active_nav("Editor")
-        
+    def build_editor(self, page):
         # Container
-        container = tk.Frame(self.main_frame, bg=COLORS["bg"])
+        container = tk.Frame(page, bg=COLORS["bg"])
         container.pack(fill="both", expand=True)
         
         # --- Left Panel (Controls) ---
@@ -267,11 +633,9 @@ class ModernTimetableApp(tk.Tk):
         f_date = tk.Frame(left_panel, bg="white")
         f_date.pack(fill="x", pady=5)
         self.day_var = ttk.Combobox(f_date, values=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"], width=12)
-        self.day_var.set(self.current_view_day)
         self.day_var.pack(side="left", padx=(0,5))
         
         self.date_var = ttk.Entry(f_date, width=15)
-        self.date_var.insert(0, self.current_view_date)
         self.date_var.pack(side="left")
         
         ttk.Button(f_date, text="Load/Create", style="Accent.TButton", command=self.load_editor_data).pack(side="left", padx=10)
@@ -293,6 +657,9 @@ class ModernTimetableApp(tk.Tk):
         ttk.Label(tab_task, text="Priority", background="white").pack(anchor="w")
         self.e_prio = ttk.Combobox(tab_task, values=["High", "Medium", "Low"], state="readonly")
         self.e_prio.set("Medium"); self.e_prio.pack(fill="x", pady=5)
+        for w in (self.e_task, self.e_dur):
+            w.bind("<KeyRelease>", self.preview_task_input)
+        self.e_prio.bind("<<ComboboxSelected>>", self.preview_task_input)
         
         ttk.Button(tab_task, text="Add to List", style="Accent.TButton", command=self.add_task_to_mem).pack(pady=15, fill="x")
 
@@ -312,6 +679,11 @@ class ModernTimetableApp(tk.Tk):
         f_time_inp.pack(fill="x", pady=5)
         self.e_start = ttk.Entry(f_time_inp, width=10); self.e_start.pack(side="left")
         self.e_end = ttk.Entry(f_time_inp, width=10); self.e_end.pack(side="right")
+        for w in (self.e_cls, self.e_start, self.e_end):
+            w.bind("<KeyRelease>", self.preview_class_input)
+
+        self.e_repeat = tk.BooleanVar(value=False)
+        ttk.Checkbutton(tab_class, text="Repeat every week on this weekday", variable=self.e_repeat).pack(anchor="w", pady=5)
         
         ttk.Button(tab_class, text="Add Fixed Event", style="Accent.TButton", command=self.add_class_to_mem).pack(pady=15, fill="x")
 
@@ -323,50 +695,106 @@ class ModernTimetableApp(tk.Tk):
         
         self.draft_list = tk.Listbox(right_panel, font=("Segoe UI", 11), bd=0, bg="#ECF0F1", highlightthickness=0, activestyle="none")
         self.draft_list.pack(fill="both", expand=True, pady=15)
+
+        ttk.Label(right_panel, text="Live Schedule", style="SubHeader.TLabel").pack(anchor="w")
+        self.preview_list = tk.Listbox(right_panel, font=("Segoe UI", 10), bd=0, bg="#ECF0F1", highlightthickness=0, activestyle="none")
+        self.preview_list.pack(fill="both", expand=True, pady=15)
+
+        # Saved with the day: its tasks are then placed by optimize.py instead of first-fit
+        self.e_optimize = tk.BooleanVar(value=False)
+        ttk.Checkbutton(right_panel, text="⚡ Optimize placement (fit as many tasks as possible)",
+                        variable=self.e_optimize, command=self.refresh_preview).pack(anchor="w", pady=(0, 10))
         
         btn_row = tk.Frame(right_panel, bg="white")
         btn_row.pack(fill="x")
         ttk.Button(btn_row, text="Remove Selected", style="Danger.TButton", command=self.remove_draft_item).pack(side="left")
         ttk.Button(btn_row, text="💾 Save & Generate", style="Accent.TButton", command=self.save_draft).pack(side="right")
 
+        self._editor_view = None    # (day, date) the editor was last set up for
+
+    def refresh_editor(self):
+        # A draft survives tab switches; it is only reset when the viewed day changed
+        view = (self.current_view_day, self.current_view_date)
+        if view == self._editor_view:
+            return
+        self._editor_view = view
+        self.day_var.set(self.current_view_day)
+        self.date_var.delete(0, tk.END)
+        self.date_var.insert(0, self.current_view_date)
+
         # Temporary storage for editor
         self.editor_data = {"tasks": [], "classes": [], "meals": {}}
+        self.editor_key = None      # stored day the draft was loaded from
+        self.editor_sched = IncrementalScheduler(self.editor_data)
+        self.e_optimize.set(False)
+        self.refresh_draft_list()
+        self.refresh_preview()
 
     def load_editor_data(self):
-        key = f"{self.day_var.get()} {self.date_var.get()}"
+        key = self.day_key_for(self.day_var.get(), self.date_var.get())
         self.editor_data = {"tasks": [], "classes": [], "meals": {}}
+        self.editor_key = None
         
-        # Default Meals
-        self.editor_data["meals"] = {"Breakfast": "09:00", "Lunch": "13:00", "Dinner": "20:00"}
+        # Default Meals (the weekday's template)
+        date = parse_day_key(self.date_var.get())
+        if date is not None:
+            self.day_var.set(f"{date:%A}")
+            self.editor_data["meals"] = dict(self.calendar.template_for(date)["meals"])
+        else:
+            self.editor_data["meals"] = dict(DEFAULT_TEMPLATE["meals"])
         
         if key in self.weekly_data:
-            # Load existing
+            self.editor_key = key
+            # Load existing (copies: the store hands out its live day, and the draft is not saved yet)
             existing = self.weekly_data[key]
-            self.editor_data["tasks"] = existing.get("tasks", [])
-            self.editor_data["classes"] = existing.get("classes", [])
-            if "meals" in existing: self.editor_data["meals"] = existing["meals"]
+            self.editor_data["tasks"] = [dict(t) for t in existing.get("tasks", [])]
+            self.editor_data["classes"] = [dict(c) for c in existing.get("classes", [])]
+            if "meals" in existing: self.editor_data["meals"] = dict(existing["meals"])
+        self.e_optimize.set(bool(self.weekly_data[key].get("optimize")) if self.editor_key else False)
         
+        self.editor_sched = IncrementalScheduler(self.editor_data)
         self.refresh_draft_list()
+        self.refresh_preview()
         messagebox.showinfo("Loaded", f"Loaded data for {key}")
 
     def add_task_to_mem(self):
         n = self.e_task.get(); d = self.e_dur.get(); p = self.e_prio.get()
         if n and d:
-            self.editor_data["tasks"].append({"name": n, "duration": int(d), "priority": p, "completed": False})
+            try:
+                d = int(d)
+            except ValueError:
+                messagebox.showerror("Invalid duration", f"Duration must be a whole number of minutes, not {d!r}.")
+                return
+            task = {"name": n, "duration": d, "priority": p, "completed": False}
+            self.editor_data["tasks"].append(task)
+            self.editor_sched.add_task(task)
             self.e_task.delete(0, tk.END); self.e_dur.delete(0, tk.END)
             self.refresh_draft_list()
+            self.refresh_preview()
 
     def add_class_to_mem(self):
         n = self.e_cls.get(); s = self.e_start.get(); e = self.e_end.get()
         if n and s and e:
-            self.editor_data["classes"].append({"name": n, "start": s, "end": e})
+            # Validate once here so the stored day only holds clean HH:MM times
+            try:
+                s, e = minutes_label(parse_hhmm(s)), minutes_label(parse_hhmm(e))
+            except ValueError as err:
+                messagebox.showerror("Invalid time", str(err))
+                return
+            cls = {"name": n, "start": s, "end": e}
+            if self.e_repeat.get():
+                cls["repeat"] = True    # becomes a weekly rule on save
+            self.editor_data["classes"].append(cls)
+            self.editor_sched.add_class(cls)
             self.e_cls.delete(0, tk.END); self.e_start.delete(0, tk.END); self.e_end.delete(0, tk.END)
             self.refresh_draft_list()
+            self.refresh_preview()
 
     def refresh_draft_list(self):
         self.draft_list.delete(0, tk.END)
         for c in self.editor_data["classes"]:
-            self.draft_list.insert(tk.END, f"🔒 {c['name']} ({c['start']}-{c['end']})")
+            icon = "🔁" if "rule" in c or c.get("repeat") else "🔒"
+            self.draft_list.insert(tk.END, f"{icon} {c['name']} ({c['start']}-{c['end']})")
         for t in self.editor_data["tasks"]:
             self.draft_list.insert(tk.END, f"📝 {t['name']} ({t['duration']}m) [{t['priority']}]")
 
@@ -377,154 +805,316 @@ class ModernTimetableApp(tk.Tk):
         n_classes = len(self.editor_data["classes"])
         if idx < n_classes:
             self.editor_data["classes"].pop(idx)
+            self.editor_sched.remove_class(idx)
         else:
             self.editor_data["tasks"].pop(idx - n_classes)
+            self.editor_sched.remove_task(idx - n_classes)
         self.refresh_draft_list()
+        self.refresh_preview()
+
+    # --- Live preview ---
+    def refresh_preview(self, schedule=None, unplaced=None):
+        """Show the placed schedule of the draft (or of a tentative edit) and what does not fit."""
+        if schedule is None:
+            if self.e_optimize.get():
+                return self.preview_optimized(self.editor_data)
+            schedule, unplaced = self.editor_sched.schedule(), self.editor_sched.unplaced()
+        self.background.cancel("preview")      # an optimized preview still running is older than this one
+        self.preview_list.delete(0, tk.END)
+        for item in schedule:
+            self.preview_list.insert(tk.END, f"{item['start']}-{item['end']}  {item['name']}")
+            self.preview_list.itemconfigure(tk.END, fg=TYPE_COLORS.get(item["type"], ("", COLORS["text"]))[1])
+        for task in unplaced:
+            self.preview_list.insert(tk.END, f"✗ {task.name} ({task.minutes}m) doesn't fit")
+            self.preview_list.itemconfigure(tk.END, fg=COLORS["danger"])
+
+    def preview_optimized(self, draft):
+        """Optimize a draft on a worker; the preview shows it when done (the latest request wins)."""
+        self.background.submit("preview", optimize_schedule, snapshot_day(draft),
+                               on_done=lambda result: self.refresh_preview(*result))
+
+    def preview_task_input(self, event=None):
+        """Preview the task being typed as if it were added."""
+        try:
+            d = int(self.e_dur.get())
+        except ValueError:
+            return self.refresh_preview()
+        task = {"name": self.e_task.get() or "New task", "duration": d, "priority": self.e_prio.get(), "completed": False}
+        if self.e_optimize.get():
+            return self.preview_optimized(dict(self.editor_data, tasks=self.editor_data["tasks"] + [task]))
+        n = len(self.editor_data["tasks"])
+        self.refresh_preview(*self.editor_sched.preview(lambda: self.editor_sched.add_task(task),
+                                                        lambda: self.editor_sched.remove_task(n)))
 
+    def preview_class_input(self, event=None):
+        """Preview the fixed event being typed as if it were added."""
+        cls = {"name": self.e_cls.get() or "New event", "start": self.e_start.get(), "end": self.e_end.get()}
+        try:
+            parse_hhmm(cls["start"]); parse_hhmm(cls["end"])
+        except ValueError:
+            return self.refresh_preview()
+        if self.e_optimize.get():
+            return self.preview_optimized(dict(self.editor_data, classes=self.editor_data["classes"] + [cls]))
+        n = len(self.editor_data["classes"])
+        self.refresh_preview(*self.editor_sched.preview(lambda: self.editor_sched.add_class(cls),
+                                                        lambda: self.editor_sched.remove_class(n)))
+
+    @profiled("save_draft")
     def save_draft(self):
-        key = f"{self.day_var.get()} {self.date_var.get()}"
-        self.weekly_data[key] = self.editor_data
-        self.save_data()
+        # Always saved under the date's own key, so a typo'd weekday cannot make an orphan copy
+        date = parse_day_key(self.date_var.get())
+        if date is None:
+            messagebox.showerror("Invalid date", f"{self.date_var.get()!r} is not a DD-MM-YYYY date.")
+            return
+        key = key_for_date(date)
+        repeats = [c for c in self.editor_data["classes"] if c.get("repeat")]
+        if repeats:
+            for c in repeats:
+                rule = self.calendar.add_rule(c["name"], c["start"], c["end"], [date.weekday()], first=date)
+                c.pop("repeat")
+                c["rule"] = rule["id"]
+            # Every later date on this weekday changed
+            self.schedule_cache = ScheduleCache()
+            self.rollups.invalidate_all()
+            self.after(1000, self.rebuild_rollups)
+        if self.e_optimize.get():
+            self.editor_data["optimize"] = True
+        else:
+            self.editor_data.pop("optimize", None)
+        self.weekly_data[key] = self.editor_data   # journaled by the store, as a delta from its rules
+        self.schedule_cache.invalidate(key)
+        self.rollups.invalidate(key)
+        if self.day_index is not None:
+            self.day_index.add(key)
+        elif self.background.pending("day_index"):
+            self.index_days()                       # its key list may predate this save
+        if self.editor_key not in (None, key) and parse_day_key(self.editor_key) == date:
+            # Loaded from an older-style key of this date: the draft replaces it
+            self.weekly_data.delete_day(self.editor_key)
+            self.schedule_cache.invalidate(self.editor_key)
+            self.rollups.drop(self.editor_key)
+            if self.day_index is not None:
+                self.day_index.discard(self.editor_key)
+        self._editor_view = None                    # start a fresh draft next time
         
         # Update global view vars
-        self.current_view_day = self.day_var.get()
-        self.current_view_date = self.date_var.get()
+        self.set_view_date(date)
         
         messagebox.showinfo("Saved", "Timetable generated successfully!")
         self.show_dashboard()
 
     # ================= ANALYTICS =================
-    def show_analytics(self):
-        self.clear_main()
-        self.set_active_nav("Analytics")
-        
-        ttk.Label(self.main_frame, text="Time Distribution", style="Header.TLabel").pack(pady=20)
+    def build_analytics(self, page):
+        top_bar = tk.Frame(page, bg=COLORS["bg"])
+        top_bar.pack(fill="x", pady=20)
+        ttk.Label(top_bar, text="Time Distribution", style="Header.TLabel").pack(side="left")
+        self.analytics_btns = {}
+        for name in ("Month", "Week", "Day"):
+            btn = ttk.Button(top_bar, text=name, command=lambda v=name: self.show_analytics(v))
+            btn.pack(side="right", padx=2)
+            self.analytics_btns[name] = btn
+
+        # Charts are redrawn into this frame on every refresh
+        self.analytics_body = tk.Frame(page, bg=COLORS["bg"])
+        self.analytics_body.pack(fill="both", expand=True)
+
+    @profiled("refresh_analytics")
+    def refresh_analytics(self):
+        for name, btn in self.analytics_btns.items():
+            btn.configure(style="Accent.TButton" if name == self.analytics_view else "TButton")
+        for widget in self.analytics_body.winfo_children():
+            widget.destroy()
         
-        key = f"{self.current_view_day} {self.current_view_date}"
-        if key not in self.weekly_data:
-            self.render_empty_state(key)
+        if not self.rollups.loaded:
+            # Still reading rollups.json; _rollups_read comes back here
+            tk.Label(self.analytics_body, text="Crunching numbers…", font=("Segoe UI", 14), bg=COLORS["bg"], fg="#95a5a6").pack(expand=True)
             return
+        key = self.view_key()
+        if self.analytics_view == "Day":
+            if key not in self.weekly_data:
+                self.build_empty_state(self.analytics_body).pack(expand=True)
+                return
+            stale = [] if self.rollups.day_stats(key) else [key]
+        else:
+            day = parse_day_key(self.current_view_date)
+            if day is None:
+                self.build_empty_state(self.analytics_body).pack(expand=True)
+                return
+            first, last = (week_bounds if self.analytics_view == "Week" else month_bounds)(day)
+            stale = self.rollups.dirty_in(first, last)
+            # Dates only holding weekly classes are not stored, so never marked dirty
+            for d in date_range(first, last):
+                k = key_for_date(d)
+                if k not in self.rollups.rows and k not in self.rollups.dirty and k in self.weekly_data:
+                    stale.append(k)
 
-        data = self.weekly_data[key]
-        schedule = self.calculate_schedule(data)
-        
-        # Calculate totals (minutes)
-        totals = {"Class": 0, "Task": 0, "Meal": 0, "Free": 0}
-        day_minutes = 24 * 60
-        occupied = 0
+        jobs = self._rollup_jobs(stale)
+        if jobs:
+            # Days saved since their rollup was made: recompute those first
+            tk.Label(self.analytics_body, text="Crunching numbers…", font=("Segoe UI", 14), bg=COLORS["bg"], fg="#95a5a6").pack(expand=True)
+            self.background.submit("analytics", compute_rollups, jobs, on_done=self._analytics_computed)
+            return
+        self.background.cancel("analytics")
+
+        # Everything else comes straight from the rollups' running totals
+        stats = self.rollups.day_stats(key) if self.analytics_view == "Day" else self.rollups.stats(first, last)
+        if not stats or not stats["days"]:
+            self.build_empty_state(self.analytics_body).pack(expand=True)
+            return
+        self.render_analytics(stats)
+
+    def _rollup_jobs(self, day_keys):
+        """Worker input for recomputing the rollups of `day_keys` (days no longer stored are dropped)."""
+        jobs = []
+        for k in day_keys:
+            if k not in self.weekly_data:
+                self.rollups.drop(k)
+                continue
+            data = self.weekly_data[k]
+            jobs.append((k, self.rollups.generation(k), self.schedule_cache.lookup(k, data), snapshot_day(data)))
+        return jobs
+
+    def _analytics_computed(self, results):
+        for k, gen, entry, row in results:
+            # Computed from a snapshot: a toggle since then (a newer generation, or a
+            # cached entry patched in place) is newer than this entry
+            if entry is not None and gen == self.rollups.generation(k) and self.schedule_cache.plan(k) is None:
+                self.schedule_cache.put(k, entry)
+            self.rollups.update(k, row, gen)
+        if self.current_page == "Analytics":
+            self.refresh_analytics()
+
+    def _rollups_read(self, saved):
+        self.rollups.adopt(saved)
+        if self.current_page == "Analytics":
+            self.refresh_analytics()
+        if self.rollups.dirty:
+            self.after(1000, self.rebuild_rollups)
+
+    def rebuild_rollups(self):
+        """Recompute dirty rollups in the background, a chunk of days at a time."""
+        if self.background.pending("rollups") or not self.rollups.loaded:
+            return      # not loaded yet: _rollups_read starts it
+        jobs = self._rollup_jobs(sorted(self.rollups.dirty)[:REBUILD_CHUNK])
+        if jobs:
+            self.background.submit("rollups", compute_rollups, jobs, on_done=self._rollups_rebuilt)
+        elif self.rollups.dirty:
+            self.after_idle(self.rebuild_rollups)
+
+    def _rollups_rebuilt(self, results):
+        for k, gen, _, row in results:
+            self.rollups.update(k, row, gen)
+        if self.rollups.dirty:
+            self.after(50, self.rebuild_rollups)
+
+    def render_analytics(self, stats):
+        parent = self.analytics_body
+        for widget in parent.winfo_children():
+            widget.destroy()
+
+        # Totals (minutes): time actually covered per category, Free = nothing scheduled 08:00-23:00
+        summary = stats["summary"]
+        totals = {cat: summary[cat] for cat in ("Class", "Task", "Meal", "Free")}
         
-        for item in schedule:
-            dur = item['duration']
-            totals[item['type']] += dur
-            occupied += dur
-            
-        totals["Free"] = max(0, (14 * 60) - occupied) # Assuming 14 hour active day for chart
+        body = tk.Frame(parent, bg=COLORS["bg"])
+        body.pack()
         
         # Draw Pie Chart using Canvas
-        canvas = tk.Canvas(self.main_frame, bg=COLORS["bg"], width=400, height=400, highlightthickness=0)
-        canvas.pack()
+        size = 400 if self.analytics_view == "Day" else 300
+        canvas = tk.Canvas(body, bg=COLORS["bg"], width=size, height=size, highlightthickness=0)
+        canvas.pack(side="left")
         
         colors_map = {"Class": "#1ABC9C", "Task": "#3498DB", "Meal": "#F1C40F", "Free": "#BDC3C7"}
         start_deg = 0
         total_val = sum(totals.values())
         
-        legend_frame = tk.Frame(self.main_frame, bg=COLORS["bg"])
+        legend_frame = tk.Frame(parent, bg=COLORS["bg"])
         legend_frame.pack(pady=20)
 
         for cat, val in totals.items():
             if val > 0:
                 extent = (val / total_val) * 360
-                canvas.create_arc(50, 50, 350, 350, start=start_deg, extent=extent, fill=colors_map[cat], outline="white")
+                canvas.create_arc(50, 50, size - 50, size - 50, start=start_deg, extent=extent, fill=colors_map[cat], outline="white")
                 start_deg += extent
                 
                 # Legend
                 lbl = tk.Label(legend_frame, text=f" {cat}: {val//60}h {val%60}m ", bg=COLORS["bg"], fg=colors_map[cat], font=("Segoe UI", 12, "bold"))
                 lbl.pack(side="left", padx=10)
+        
+        overlap = summary["Overlap"]
+        info = f"{stats['days']} day(s) with a schedule  •  Class/Meal overlap: {overlap//60}h {overlap%60}m"
+        tk.Label(parent, text=info, bg=COLORS["bg"], fg="#7F8C8D", font=("Segoe UI", 11)).pack()
+        
+        if stats["heatmap"] is not None:
+            self.draw_heatmap(body, stats["heatmap"])
+
+    def draw_heatmap(self, parent, heat):
+        """Busiest hours: weekday rows x hour columns, shaded by occupied minutes."""
+        cell, left, top = 22, 40, 20
+        canvas = tk.Canvas(parent, bg=COLORS["bg"], width=left + 24 * cell, height=top + 7 * cell, highlightthickness=0)
+        canvas.pack(side="left", padx=20)
+        
+        peak = max(max(row) for row in heat) or 1
+        base = (0xFF, 0xFF, 0xFF)
+        accent = tuple(int(COLORS["accent"][i:i + 2], 16) for i in (1, 3, 5))
+        for h in range(0, 24, 3):
+            canvas.create_text(left + h * cell + cell / 2, top / 2, text=f"{h:02d}", font=("Segoe UI", 8), fill="#7F8C8D")
+        for wd, row in enumerate(heat):
+            y = top + wd * cell
+            canvas.create_text(left / 2, y + cell / 2, text=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][wd], font=("Segoe UI", 9), fill="#7F8C8D")
+            for h, val in enumerate(row):
+                f = val / peak
+                rgb = "#%02X%02X%02X" % tuple(int(b + (a - b) * f) for a, b in zip(accent, base))
+                x = left + h * cell
+                canvas.create_rectangle(x, y, x + cell - 2, y + cell - 2, fill=rgb, outline="")
 
     # ================= LOGIC & UTILS =================
+    @profiled("calculate_schedule")
     def calculate_schedule(self, data):
         """
         Smart Algorithm:
         1. Place fixed events (Classes, Meals).
         2. Identify gaps.
         3. Fit tasks into gaps.
+        (See scheduler.build_schedule, which also runs without the UI.)
         """
-        timeline = []
-        
-        # 1. Fixed Events
-        for c in data.get("classes", []):
-            s, e = time_to_min(c["start"]), time_to_min(c["end"])
-            timeline.append({"name": c["name"], "start_min": s, "end_min": e, "type": "Class", "duration": e-s})
-            
-        for m, t in data.get("meals", {}).items():
-            s = time_to_min(t)
-            timeline.append({"name": m, "start_min": s, "end_min": s+45, "type": "Meal", "duration": 45})
-
-        timeline.sort(key=lambda x: x['start_min'])
-        
-        # 2. Place Tasks
-        tasks = sorted(data.get("tasks", []), key=lambda x: {"High": 0, "Medium": 1, "Low": 2}[x["priority"]])
-        
-        # Define active day range (e.g., 08:00 to 23:00)
-        day_start = 8 * 60
-        day_end = 23 * 60
-        
-        for task in tasks:
-            t_dur = task["duration"] # already in minutes in new editor logic? let's ensure
-            # Note: Old editor saved hours, new saves minutes. Let's handle both.
-            if t_dur < 10: t_dur = t_dur * 60 # Assume hours if small number
-            
-            placed = False
-            current_pointer = day_start
-            
-            # Try to find a gap
-            for i in range(len(timeline) + 1):
-                # Determine gap window
-                gap_start = current_pointer
-                if i < len(timeline):
-                    gap_end = timeline[i]['start_min']
-                    next_event_end = timeline[i]['end_min']
-                else:
-                    gap_end = day_end
-                    next_event_end = day_end # End of loop
-                
-                if gap_end - gap_start >= t_dur:
-                    # Found space!
-                    timeline.append({
-                        "name": task["name"],
-                        "start_min": gap_start,
-                        "end_min": gap_start + t_dur,
-                        "type": "Task",
-                        "duration": t_dur,
-                        "completed": task.get("completed", False)
-                    })
-                    placed = True
-                    timeline.sort(key=lambda x: x['start_min'])
-                    break
-                
-                current_pointer = max(current_pointer, next_event_end)
-                
-        # Add formatted time strings
-        for item in timeline:
-            item['start'] = min_to_time(item['start_min'])
-            item['end'] = min_to_time(item['end_min'])
-            
-        return timeline
+        return build_schedule(data)
+
+    def get_schedule(self, day_key):
+        """Cached schedule of a stored day (shared by Dashboard and Analytics)."""
+        return self.schedule_cache.get(day_key, self.weekly_data[day_key])
 
     def get_day_mood(self, tasks):
-        score = sum({"High": 3, "Medium": 2, "Low": 1}.get(t["priority"], 1) for t in tasks)
+        score = mood_score(tasks)
         if score >= 12: return "🔥 Intense"
         elif score >= 6: return "⚖️ Balanced"
         else: return "🍃 Chill"
 
-    def render_empty_state(self, day_key):
-        f = tk.Frame(self.main_frame, bg=COLORS["bg"])
-        f.pack(expand=True)
+    def build_empty_state(self, parent):
+        """"No schedule" placeholder (not packed)."""
+        f = tk.Frame(parent, bg=COLORS["bg"])
         tk.Label(f, text="💤", font=("Segoe UI", 60), bg=COLORS["bg"]).pack()
         tk.Label(f, text="No schedule found for this day.", font=("Segoe UI", 16), bg=COLORS["bg"], fg="#95a5a6").pack(pady=10)
         ttk.Button(f, text="Create Schedule", style="Accent.TButton", command=self.show_editor).pack(pady=10)
+        return f
+
+# Headless subcommands: python Zenith.py <command> --help
+COMMANDS = {
+    "generate": ("batch", "main"),              # schedules of a date range, without the window
+    "export": ("batch", "export_main"),         # the same, as an .ics calendar
+    "import": ("interchange", "main"),          # merge an .ics or CSV file into the data
+    "compact": ("recurrence", "main"),          # turn weekly repeated classes into rules
+    "reindex": ("dayindex", "main"),            # merge days stored under mismatched weekdays / old key formats
+    "serve": ("server", "main"),                # headless JSON API on localhost
+    "optimize": ("optimize", "main"),           # fit a day's tasks better than first-fit
+    "archive": ("archive", "main"),             # pack old days into a binary archive, or back
+}
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        module, func = COMMANDS[sys.argv[1]]
+        sys.exit(getattr(importlib.import_module(module), func)(sys.argv[2:]))
+
     app = ModernTimetableApp()
     app.mainloop()
 
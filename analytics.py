@@ -0,0 +1,179 @@
+"""
+Minute-occupancy analytics for Zenith.
+
+Each computed schedule becomes a 1440-slot vector (one byte per minute of
+the day, one bit per category occupying it). Many days are stacked into
+one matrix and summarized with whole-array operations: NumPy when it is
+installed, otherwise `array` rows and byte translation tables, which keep
+the per-minute work in C as well.
+"""
+from array import array
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:     # optional dependency
+    np = None
+
+from scheduler import DAY_END, DAY_START
+
+MINUTES = 24 * 60
+CATEGORY_BITS = {"Class": 1, "Task": 2, "Meal": 4}
+
+def _bit_table(test):
+    """256-byte translation table: 1 where `test(code)` holds, else 0."""
+    return bytes(1 if test(code) else 0 for code in range(256))
+
+_OR_TABLES = {bit: bytes(code | bit for code in range(256)) for bit in CATEGORY_BITS.values()}
+
+def _clip(item):
+    """Item bounds as whole minutes inside the day."""
+    s = min(max(int(item["start_min"]), 0), MINUTES)
+    e = min(max(int(item["end_min"]), 0), MINUTES)
+    return s, e
+
+class OccupancyMatrix:
+    """
+    Minute occupancy of a batch of days. `dates` (optional, same length as
+    `schedules`) are only needed for the weekday heatmap.
+    """
+
+    def __init__(self, schedules, dates=None, use_numpy=None):
+        self.n_days = len(schedules)
+        self.dates = list(dates) if dates is not None else None
+        self.use_numpy = (np is not None) if use_numpy is None else use_numpy
+        if self.use_numpy:
+            self._m = self._build_numpy(schedules)
+        else:
+            self._rows = [self._build_row(schedule) for schedule in schedules]
+
+    def __len__(self):
+        return self.n_days
+
+    # --- Construction ---
+    def _build_numpy(self, schedules):
+        m = np.zeros((self.n_days, MINUTES), dtype=np.uint8)
+        for cat, bit in CATEGORY_BITS.items():
+            rows, starts, ends = [], [], []
+            for d, schedule in enumerate(schedules):
+                for item in schedule:
+                    if item["type"] == cat:
+                        s, e = _clip(item)
+                        if e > s:
+                            rows.append(d); starts.append(s); ends.append(e)
+            if not rows:
+                continue
+            # +1 at each start, -1 at each end; a running sum > 0 means covered
+            diff = np.zeros((self.n_days, MINUTES + 1), dtype=np.int32)
+            np.add.at(diff, (rows, starts), 1)
+            np.add.at(diff, (rows, ends), -1)
+            covered = np.cumsum(diff[:, :MINUTES], axis=1) > 0
+            m |= covered.astype(np.uint8) * np.uint8(bit)
+        return m
+
+    def _build_row(self, schedule):
+        row = array("B", bytes(MINUTES))
+        for item in schedule:
+            bit = CATEGORY_BITS.get(item["type"])
+            s, e = _clip(item)
+            if bit and e > s:
+                row[s:e] = array("B", row[s:e].tobytes().translate(_OR_TABLES[bit]))
+        return row
+
+    # --- Summaries ---
+    def category_minutes(self):
+        """Minutes covered by each category, over all days (overlaps counted once per category)."""
+        totals = {}
+        for cat, bit in CATEGORY_BITS.items():
+            if self.use_numpy:
+                totals[cat] = int(np.count_nonzero(self._m & bit))
+            else:
+                table = _bit_table(lambda code: code & bit)
+                totals[cat] = sum(row.tobytes().translate(table).count(1) for row in self._rows)
+        return totals
+
+    def free_minutes(self, day_start=DAY_START, day_end=DAY_END):
+        """Minutes with nothing scheduled inside the active window, over all days."""
+        s, e = max(0, int(day_start)), min(MINUTES, int(day_end))
+        if self.use_numpy:
+            return int(np.count_nonzero(self._m[:, s:e] == 0))
+        return sum(row[s:e].count(0) for row in self._rows)
+
+    def overlap_minutes(self, a="Class", b="Meal"):
+        """Minutes where categories `a` and `b` are both scheduled."""
+        bit_a, bit_b = CATEGORY_BITS[a], CATEGORY_BITS[b]
+        if self.use_numpy:
+            return int(np.count_nonzero((self._m & bit_a).astype(bool) & (self._m & bit_b).astype(bool)))
+        table = _bit_table(lambda code: code & bit_a and code & bit_b)
+        return sum(row.tobytes().translate(table).count(1) for row in self._rows)
+
+    def busy_by_hour(self):
+        """Occupied minutes per hour of the day (24 values), over all days."""
+        if self.use_numpy:
+            busy = (self._m != 0).reshape(self.n_days, 24, 60).sum(axis=(0, 2))
+            return [int(x) for x in busy]
+        return [sum(60 - row[h * 60:(h + 1) * 60].count(0) for row in self._rows) for h in range(24)]
+
+    def weekday_heatmap(self):
+        """7 x 24 occupied minutes: one row per weekday (Monday first), one column per hour."""
+        if self.dates is None:
+            raise ValueError("weekday_heatmap needs the dates of the days")
+        weekdays = [d.weekday() for d in self.dates]
+        if self.use_numpy:
+            heat = np.zeros((7, 24), dtype=np.int64)
+            if self.n_days:
+                per_day = (self._m != 0).reshape(self.n_days, 24, 60).sum(axis=2)
+                np.add.at(heat, weekdays, per_day)
+            return heat.tolist()
+
+        heat = [[0] * 24 for _ in range(7)]
+        for wd, row in zip(weekdays, self._rows):
+            for h in range(24):
+                heat[wd][h] += 60 - row[h * 60:(h + 1) * 60].count(0)
+        return heat
+
+    def summary(self, day_start=DAY_START, day_end=DAY_END):
+        """Category totals plus true free time and class/meal overlap."""
+        totals = self.category_minutes()
+        totals["Free"] = self.free_minutes(day_start, day_end)
+        totals["Overlap"] = self.overlap_minutes("Class", "Meal")
+        return totals
+
+# --- DATE RANGES ---
+def date_range(first, last):
+    d = first
+    while d <= last:
+        yield d
+        d += timedelta(days=1)
+
+def week_bounds(date):
+    """Monday..Sunday around `date`."""
+    first = date - timedelta(days=date.weekday())
+    return first, first + timedelta(days=6)
+
+def month_bounds(date):
+    first = date.replace(day=1)
+    nxt = (first + timedelta(days=32)).replace(day=1)
+    return first, nxt - timedelta(days=1)
+
+def occupancy_for_range(schedule_for, first, last, use_numpy=None):
+    """
+    OccupancyMatrix of every day in first..last that has a schedule.
+    `schedule_for(date)` returns the day's schedule, or None when nothing is stored.
+    """
+    dates, schedules = [], []
+    for date in date_range(first, last):
+        schedule = schedule_for(date)
+        if schedule is not None:
+            dates.append(date)
+            schedules.append(schedule)
+    return OccupancyMatrix(schedules, dates, use_numpy=use_numpy)
+
+def summarize(schedules, dates=None, use_numpy=None):
+    """
+    Everything the Analytics page draws for a batch of days, as plain data:
+    {"days", "summary", "heatmap"} (heatmap is None without dates).
+    """
+    occ = OccupancyMatrix(schedules, dates, use_numpy=use_numpy)
+    return {"days": len(occ), "summary": occ.summary(),
+            "heatmap": occ.weekday_heatmap() if dates is not None else None}
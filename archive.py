@@ -0,0 +1,387 @@
+"""
+Binary archive of historical days: one read-only file, opened with mmap.
+
+    python Zenith.py archive pack --data zenith_data -o history.zarc
+    python Zenith.py archive unpack history.zarc -o history.json
+
+Layout (little-endian; every section starts 8-byte aligned, its offset
+and length are in the header):
+
+    header        magic, version, day and string counts, section table
+    str_offsets   uint32[n_strings + 1]  start of each string in str_blob
+    str_blob      UTF-8 names (tasks, classes, meals), each stored once
+    ordinals      int32[n_days]    date.toordinal() of each day, ascending
+    offsets       uint32[n_days+1] start of each day's records in `records`
+    n_classes, n_meals, n_tasks    uint16[n_days] each
+    flags         uint8[n_days]    which of tasks/classes/meals the day has
+    records       per day: classes (name id, start, end minutes),
+                  meals (name id, minutes), tasks (name id, duration,
+                  priority code, completed bits), 8 or 12 bytes each
+    extra         JSON {day_key: data} of the days the columns cannot
+                  hold exactly (odd keys, unparsable times, extra fields)
+
+Reading a day bisects `ordinals` and unpacks only that day's records.
+Unpacking gives back data equal to what was packed.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date as _date
+
+from model import minutes_label, parse_hhmm
+from storage import DATA_DIR, DATA_FILE, DayStore, date_of_key, key_for_date, load_legacy
+
+MAGIC = b"ZARC"
+VERSION = 1
+ARCHIVE_EXT = ".zarc"
+SECTIONS = ("str_offsets", "str_blob", "ordinals", "offsets", "n_classes", "n_meals", "n_tasks",
+            "flags", "records", "extra")
+HEADER = struct.Struct("<4sHHII" + "QQ" * len(SECTIONS))
+CLASS = struct.Struct("<IHH")       # name id, start, end (minutes)
+MEAL = struct.Struct("<IH2x")       # name id, time (minutes)
+TASK = struct.Struct("<IIBB2x")     # name id, duration, priority code, completed bits
+PRIORITIES = ("High", "Medium", "Low")
+NO_PRIORITY = 255
+HAS_TASKS, HAS_CLASSES, HAS_MEALS = 1, 2, 4
+DONE, HAS_DONE = 1, 2
+MAX_COUNT = 0xFFFF
+
+def _align(buf):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+def _minutes(label):
+    """Minutes of a time label, or None unless minutes_label() gives exactly that label back."""
+    try:
+        m = parse_hhmm(label)
+    except ValueError:
+        return None
+    return m if minutes_label(m) == label else None
+
+def ordinal_of_key(day_key):
+    """date_of_key(day_key).toordinal() without strptime (the bulk of a lookup otherwise), or None."""
+    weekday, _, ds = day_key.partition(" ")
+    if len(ds) != 10 or ds[2] != "-" or ds[5] != "-" or not (ds[:2] + ds[3:5] + ds[6:]).isdigit():
+        return None
+    try:
+        date = _date(int(ds[6:]), int(ds[3:5]), int(ds[:2]))
+    except ValueError:
+        return None
+    return date.toordinal() if f"{date:%A}" == weekday else None
+
+# --- WRITING ---
+class _Packer:
+    def __init__(self):
+        self.strings = {}           # name -> id
+        self.days = []              # (ordinal, flags, n_classes, n_meals, n_tasks, record bytes)
+        self.extra = {}             # day_key -> data kept as JSON
+
+    def intern(self, s):
+        sid = self.strings.get(s)
+        if sid is None:
+            sid = self.strings[s] = len(self.strings)
+        return sid
+
+    def add(self, day_key, data):
+        date = date_of_key(day_key)
+        packed = self._pack_day(data) if date is not None and isinstance(data, dict) else None
+        if packed is None:
+            self.extra[day_key] = data
+        else:
+            self.days.append((date.toordinal(),) + packed)
+
+    def _pack_day(self, data):
+        """(flags, n_classes, n_meals, n_tasks, records), or None if the columns cannot hold `data` exactly."""
+        if not set(data) <= {"tasks", "classes", "meals"}:
+            return None
+        classes, meals, tasks = data.get("classes", []), data.get("meals", {}), data.get("tasks", [])
+        if not (isinstance(classes, list) and isinstance(meals, dict) and isinstance(tasks, list)):
+            return None
+        if max(len(classes), len(meals), len(tasks)) > MAX_COUNT:
+            return None
+        out = bytearray()
+        for c in classes:
+            if not isinstance(c, dict) or set(c) != {"name", "start", "end"} or not isinstance(c["name"], str):
+                return None
+            start, end = _minutes(c["start"]), _minutes(c["end"])
+            if start is None or end is None:
+                return None
+            out += CLASS.pack(self.intern(c["name"]), start, end)
+        for name, t in meals.items():
+            m = _minutes(t)
+            if m is None:
+                return None
+            out += MEAL.pack(self.intern(name), m)
+        for t in tasks:
+            if not isinstance(t, dict) or not {"name", "duration"} <= set(t) <= {"name", "duration", "priority", "completed"}:
+                return None
+            d, p, done = t["duration"], t.get("priority", NO_PRIORITY), t.get("completed", False)
+            if not isinstance(t["name"], str) or type(d) is not int or not 0 <= d < 2 ** 32 or not isinstance(done, bool):
+                return None
+            if p != NO_PRIORITY:
+                if p not in PRIORITIES:
+                    return None
+                p = PRIORITIES.index(p)
+            bits = (DONE if done else 0) | (HAS_DONE if "completed" in t else 0)
+            out += TASK.pack(self.intern(t["name"]), d, p, bits)
+        flags = ((HAS_TASKS if "tasks" in data else 0) | (HAS_CLASSES if "classes" in data else 0)
+                 | (HAS_MEALS if "meals" in data else 0))
+        return flags, len(classes), len(meals), len(tasks), bytes(out)
+
+    def tobytes(self):
+        self.days.sort(key=lambda d: d[0])
+        names = [s.encode("utf-8") for s in self.strings]      # in id order
+        str_offsets = array("I", [0])
+        for b in names:
+            str_offsets.append(str_offsets[-1] + len(b))
+        offsets = array("I", [0])
+        for d in self.days:
+            offsets.append(offsets[-1] + len(d[5]))
+        sections = {
+            "str_offsets": str_offsets.tobytes(),
+            "str_blob": b"".join(names),
+            "ordinals": array("i", [d[0] for d in self.days]).tobytes(),
+            "offsets": offsets.tobytes(),
+            "n_classes": array("H", [d[2] for d in self.days]).tobytes(),
+            "n_meals": array("H", [d[3] for d in self.days]).tobytes(),
+            "n_tasks": array("H", [d[4] for d in self.days]).tobytes(),
+            "flags": bytes(d[1] for d in self.days),
+            "records": b"".join(d[5] for d in self.days),
+            "extra": json.dumps(self.extra).encode("utf-8") if self.extra else b"",
+        }
+        buf = bytearray(HEADER.size)
+        table = []
+        for name in SECTIONS:
+            _align(buf)
+            table += [len(buf), len(sections[name])]
+            buf += sections[name]
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, len(self.days), len(self.strings), *table)
+        return bytes(buf)
+
+def write_archive(path, items):
+    """Pack (day_key, data) pairs into an archive at `path`. Returns (columnar days, extra days)."""
+    packer = _Packer()
+    for day_key, data in items:
+        packer.add(day_key, data)
+    if sys.byteorder != "little":
+        raise OSError("archives are written on little-endian machines only")
+    data = packer.tobytes()
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(packer.days), len(packer.extra)
+
+# --- READING ---
+class Archive:
+    """
+    Read-only day_key -> day data over an archive file. Only the header is
+    read when it is opened; a day is unpacked from its own bytes when asked
+    for (fresh dicts every time: editing them does not change the archive).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        # Checked before mapping: mmap cannot map an empty file, and a truncated one would fail later
+        size = os.fstat(self._file.fileno()).st_size
+        head = self._file.read(HEADER.size)
+        if len(head) < HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a Zenith archive")
+        magic, version, _, self.n_days, self.n_strings, *table = HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION:
+            self._file.close()
+            raise ValueError(f"{path} is not a version {VERSION} Zenith archive")
+        if any(table[i] + table[i + 1] > size for i in range(0, len(table), 2)):
+            self._file.close()
+            raise ValueError(f"{path} is truncated")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._map)
+        sec = {name: buf[table[2 * i]:table[2 * i] + table[2 * i + 1]] for i, name in enumerate(SECTIONS)}
+        self._str_offsets = sec["str_offsets"].cast("I")
+        self._str_blob = sec["str_blob"]
+        self._ordinals = sec["ordinals"].cast("i")
+        self._offsets = sec["offsets"].cast("I")
+        self._n_classes = sec["n_classes"].cast("H")
+        self._n_meals = sec["n_meals"].cast("H")
+        self._n_tasks = sec["n_tasks"].cast("H")
+        self._flags = sec["flags"]
+        self._records = sec["records"]
+        self._extra_bytes = sec["extra"]
+        self._extra = None
+        self._names = {}
+
+    def close(self):
+        # Views into the map must go before it can be closed
+        for attr in ("_str_offsets", "_str_blob", "_ordinals", "_offsets", "_n_classes", "_n_meals",
+                     "_n_tasks", "_flags", "_records", "_extra_bytes"):
+            view = self.__dict__.pop(attr, None)
+            if view is not None:
+                view.release()
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _name(self, sid):
+        s = self._names.get(sid)
+        if s is None:
+            s = self._names[sid] = str(self._str_blob[self._str_offsets[sid]:self._str_offsets[sid + 1]], "utf-8")
+        return s
+
+    def _extra_days(self):
+        if self._extra is None:
+            self._extra = json.loads(bytes(self._extra_bytes)) if len(self._extra_bytes) else {}
+        return self._extra
+
+    def _index(self, day_key):
+        """Row of a day in the columns, or -1."""
+        o = ordinal_of_key(day_key)
+        if o is None:
+            return -1
+        i = bisect_left(self._ordinals, o)
+        return i if i < self.n_days and self._ordinals[i] == o else -1
+
+    def _unpack(self, i):
+        pos = self._offsets[i]
+        records, name = self._records, self._name
+        n = self._n_classes[i]
+        classes = [{"name": name(sid), "start": minutes_label(s), "end": minutes_label(e)}
+                   for sid, s, e in CLASS.iter_unpack(records[pos:pos + n * CLASS.size])]
+        pos += n * CLASS.size
+        n = self._n_meals[i]
+        meals = {name(sid): minutes_label(m) for sid, m in MEAL.iter_unpack(records[pos:pos + n * MEAL.size])}
+        pos += n * MEAL.size
+        n = self._n_tasks[i]
+        tasks = []
+        for sid, d, p, bits in TASK.iter_unpack(records[pos:pos + n * TASK.size]):
+            t = {"name": name(sid), "duration": d}
+            if p != NO_PRIORITY:
+                t["priority"] = PRIORITIES[p]
+            if bits & HAS_DONE:
+                t["completed"] = bool(bits & DONE)
+            tasks.append(t)
+        flags = self._flags[i]
+        day = {}
+        if flags & HAS_TASKS:
+            day["tasks"] = tasks
+        if flags & HAS_CLASSES:
+            day["classes"] = classes
+        if flags & HAS_MEALS:
+            day["meals"] = meals
+        return day
+
+    # --- Dict-like access ---
+    def get(self, day_key, default=None):
+        i = self._index(day_key)
+        if i >= 0:
+            return self._unpack(i)
+        if len(self._extra_bytes):
+            return self._extra_days().get(day_key, default)
+        return default
+
+    def __getitem__(self, day_key):
+        data = self.get(day_key)
+        if data is None:
+            raise KeyError(day_key)
+        return data
+
+    def __contains__(self, day_key):
+        return self._index(day_key) >= 0 or (len(self._extra_bytes) > 0 and day_key in self._extra_days())
+
+    def keys(self):
+        """Every day key: the columnar days in date order, then the extra ones."""
+        keys = [key_for_date(_date.fromordinal(o)) for o in self._ordinals]
+        return keys + list(self._extra_days())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.n_days + len(self._extra_days())
+
+    def items(self):
+        for i, day_key in enumerate(self.keys()):
+            yield day_key, self._unpack(i) if i < self.n_days else self._extra_days()[day_key]
+
+# --- CONVERTER ---
+def strip_rules(data):
+    """A day as stored in full: classes lose the recurrence tag LayeredDays adds."""
+    if any("rule" in c for c in data.get("classes", [])):
+        data = dict(data, classes=[{k: v for k, v in c.items() if k != "rule"} for c in data["classes"]])
+    return data
+
+def source_days(path):
+    """(day_key, data) of a legacy JSON file or a zenith_data directory (days resolved against their rules)."""
+    if os.path.isdir(path):
+        from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+        days = LayeredDays(DayStore(path, legacy_file=None), Calendar(os.path.join(path, RECURRENCE_FILE)))
+        try:
+            for day_key in days.keys():
+                yield day_key, strip_rules(days[day_key])
+        finally:
+            days.close()
+    else:
+        yield from load_legacy(path).items()
+
+def write_json(items, out):
+    """Stream {day_key: data, ...} without building the whole dict."""
+    out.write("{")
+    for n, (day_key, data) in enumerate(items):
+        out.write((",\n" if n else "\n") + json.dumps(day_key) + ": " + json.dumps(data))
+    out.write("\n}\n")
+
+def main(argv=None):
+    default_data = DATA_DIR if os.path.isdir(DATA_DIR) else DATA_FILE
+    parser = argparse.ArgumentParser(prog="Zenith.py archive", description="Pack days into a binary archive, or back to JSON.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("pack", help="JSON file or zenith_data directory -> archive")
+    p.add_argument("--data", default=default_data, help="weekly_timetable.json or zenith_data directory")
+    p.add_argument("-o", "--output", required=True, help=f"archive file (*{ARCHIVE_EXT})")
+    u = sub.add_parser("unpack", help="archive -> JSON file in the weekly_timetable.json format")
+    u.add_argument("archive")
+    u.add_argument("-o", "--output", default="-", help="JSON file (default stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        if not os.path.exists(args.data):
+            parser.error(f"no data at {args.data}")
+        columnar, extra = write_archive(args.output, source_days(args.data))
+        # Check the round trip before anyone relies on the archive
+        with Archive(args.output) as archive:
+            failed = next((day_key for day_key, data in source_days(args.data) if archive.get(day_key) != data), None)
+        if failed is not None:
+            os.remove(args.output)      # closed first: Windows will not remove a mapped file
+            print(f"round trip failed for {failed}; no archive written", file=sys.stderr)
+            return 1
+        before = sum(os.path.getsize(os.path.join(dp, f)) for dp, _, fs in os.walk(args.data) for f in fs) \
+            if os.path.isdir(args.data) else os.path.getsize(args.data)
+        print(f"Packed {columnar + extra} days ({extra} kept as JSON): {before} -> {os.path.getsize(args.output)} bytes",
+              file=sys.stderr)
+    else:
+        with Archive(args.archive) as archive:
+            if args.output == "-":
+                write_json(archive.items(), sys.stdout)
+            else:
+                tmp = f"{args.output}.tmp"
+                with open(tmp, "w") as f:
+                    write_json(archive.items(), f)
+                os.replace(tmp, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Work run off the Tk thread for Zenith's UI.
+
+Tk may only be touched from the thread running mainloop, so results are
+not delivered by callbacks from the worker: the UI thread polls the
+outstanding futures with `after()` and runs the callbacks itself.
+"""
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+POLL_MS = 15
+
+class LatestRequests:
+    """
+    Futures for background work, one live request per channel.
+
+    Submitting on a channel (say "dashboard") supersedes the request
+    already there: it is cancelled if it has not started yet, and its
+    result is dropped if it has. Only the latest request of a channel
+    ever reaches its callback.
+    """
+
+    def __init__(self, widget, workers=2, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zenith-compute")
+        self._live = {}         # channel -> (future, on_done, on_error)
+        self._polling = None
+        self.superseded = 0     # requests cancelled or dropped because newer ones came in
+
+    def submit(self, channel, fn, *args, on_done, on_error=None):
+        """Run fn(*args) on a worker; on_done(result) is later called on the Tk thread."""
+        self.cancel(channel)
+        future = self._pool.submit(fn, *args)
+        self._live[channel] = (future, on_done, on_error)
+        if self._polling is None:
+            self._polling = self.widget.after(self.poll_ms, self._poll)
+        return future
+
+    def cancel(self, channel):
+        """Forget the request on `channel`, cancelling it if it has not started."""
+        entry = self._live.pop(channel, None)
+        if entry is not None:
+            entry[0].cancel()
+            self.superseded += 1
+
+    def pending(self, channel):
+        return channel in self._live
+
+    def _poll(self):
+        self._polling = None
+        for channel, (future, on_done, on_error) in list(self._live.items()):
+            if not future.done():
+                continue
+            del self._live[channel]
+            try:
+                result = future.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+                else:
+                    self.widget.report_callback_exception(type(e), e, e.__traceback__)
+                continue
+            on_done(result)
+        if self._live:
+            self._polling = self.widget.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        """Drop everything outstanding; running work finishes on its own, unobserved."""
+        for channel in list(self._live):
+            self.cancel(channel)
+        if self._polling is not None:
+            self.widget.after_cancel(self._polling)
+            self._polling = None
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,177 @@
+"""
+Headless batch generation: compute schedules for a date range without the UI.
+
+    python Zenith.py generate --from 01-10-2026 --to 31-10-2026 --format csv -o out.csv
+    python batch.py --data users/ --workers 8
+
+`--data` can be a weekly_timetable.json file, a zenith_data directory, a .zarc
+archive (see archive.py), or a directory holding one of those per user (the file/directory name is the user).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from scheduler import build_schedule
+from analytics import date_range
+from archive import ARCHIVE_EXT, Archive
+from dayindex import DayIndex
+from interchange import write_ics
+from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+from storage import DATA_DIR, DATA_FILE, DayStore, key_for_date, load_legacy
+
+CSV_FIELDS = ["user", "day", "date", "name", "type", "start", "end", "duration", "completed", "priority"]
+
+# --- DATA SOURCES ---
+def is_store_dir(path):
+    """
+    A zenith_data directory: it has day files or a journal (manifest.json
+    only appears after a migration or the first compaction).
+    """
+    return (os.path.isdir(os.path.join(path, "days"))
+            or any(os.path.isfile(os.path.join(path, name)) for name in ("manifest.json", "journal.jsonl", "journal.old")))
+
+def open_source(path):
+    """Day-key -> data mapping for one user's data file or store directory."""
+    if os.path.isdir(path):
+        calendar = Calendar(os.path.join(path, RECURRENCE_FILE))
+        return LayeredDays(DayStore(path, legacy_file=None), calendar)
+    if path.endswith(ARCHIVE_EXT):
+        return Archive(path)
+    return load_legacy(path)
+
+def find_users(path):
+    """(user, path) pairs under `path`."""
+    if os.path.isfile(path) or is_store_dir(path):
+        return [(os.path.splitext(os.path.basename(os.path.normpath(path)))[0], path)]
+    users = []
+    for name in sorted(os.listdir(path)):
+        child = os.path.join(path, name)
+        if name.endswith((".json", ARCHIVE_EXT)) and os.path.isfile(child):
+            users.append((os.path.splitext(name)[0], child))
+        elif os.path.isdir(child) and is_store_dir(child):
+            users.append((name, child))
+    return users
+
+def iter_jobs(users, first, last):
+    """(user, day key, ISO date, day data) for every stored day in the range."""
+    for user, path in users:
+        days = open_source(path)
+        index = DayIndex(days.keys())   # also finds days stored under older-style keys
+        for date in date_range(first, last):
+            key = index.key_for(date) or key_for_date(date)
+            if key in days:
+                yield user, key, date.isoformat(), days[key]
+        if isinstance(days, (LayeredDays, Archive)):
+            days.close()
+
+# --- WORKERS ---
+def with_priorities(schedule, data):
+    """The schedule with each task's priority on its item, so exports can be imported back as they were."""
+    priorities = {t.get("name"): t.get("priority") for t in data.get("tasks", [])}
+    return [dict(item, priority=priorities.get(item["name"])) if item["type"] == "Task" else item for item in schedule]
+
+def schedule_job(job):
+    user, key, iso, data = job
+    return user, key, iso, with_priorities(build_schedule(data), data)
+
+def optimized(jobs):
+    """The jobs with every day placed by the optimizer (one process per day: the pool is already per day)."""
+    for user, key, iso, data in jobs:
+        yield user, key, iso, dict(data, optimize=True)
+
+def batched(iterable, n):
+    batch = []
+    for x in iterable:
+        batch.append(x)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate(jobs, workers, chunksize=16):
+    """Yield (user, key, iso date, schedule) in input order, `workers` processes wide."""
+    if workers <= 1:
+        yield from map(schedule_job, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Submit a bounded window at a time so huge ranges stream in constant memory
+        for batch in batched(jobs, workers * chunksize * 4):
+            yield from pool.map(schedule_job, batch, chunksize=chunksize)
+
+# --- OUTPUT ---
+def write_jsonl(results, out):
+    n = 0
+    for user, key, iso, schedule in results:
+        out.write(json.dumps({"user": user, "day": key, "date": iso, "schedule": schedule}) + "\n")
+        n += 1
+    return n
+
+def write_csv(results, out):
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    n = 0
+    for user, key, iso, schedule in results:
+        for item in schedule:
+            writer.writerow(dict(item, user=user, day=key, date=iso, completed=item.get("completed", ""),
+                                 priority=item.get("priority") or ""))
+        n += 1
+    return n
+
+# --- CLI ---
+def parse_date(text):
+    return datetime.strptime(text, "%d-%m-%Y").date()
+
+def main(argv=None, prog="Zenith.py generate", default_format="jsonl"):
+    today = datetime.now().strftime("%d-%m-%Y")
+    default_data = DATA_DIR if is_store_dir(DATA_DIR) else DATA_FILE
+
+    parser = argparse.ArgumentParser(prog=prog, description="Generate schedules for a date range.")
+    parser.add_argument("--data", default=default_data, help="data file, zenith_data directory, or directory of per-user data")
+    parser.add_argument("--from", dest="first", type=parse_date, default=today, help="first day (DD-MM-YYYY, default today)")
+    parser.add_argument("--to", dest="last", type=parse_date, default=None, help="last day (DD-MM-YYYY, default --from)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (1 = no pool)")
+    parser.add_argument("--chunksize", type=int, default=16, help="days handed to a worker at a time")
+    parser.add_argument("--format", choices=["jsonl", "csv", "ics"], default=default_format)
+    parser.add_argument("--optimize", action="store_true", help="place tasks with the optimizer (see optimize.py)")
+    parser.add_argument("-o", "--output", default="-", help="output file (default stdout)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.data):
+        parser.error(f"no data at {args.data}")
+    users = find_users(args.data)
+    if not users:
+        parser.error(f"no data files or zenith_data directories in {args.data}")
+    last = args.last or args.first
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        t0 = time.perf_counter()
+        jobs = iter_jobs(users, args.first, last)
+        if args.optimize:
+            jobs = optimized(jobs)
+        results = generate(jobs, args.workers, args.chunksize)
+        n = {"csv": write_csv, "ics": write_ics, "jsonl": write_jsonl}[args.format](results, out)
+        elapsed = time.perf_counter() - t0
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    rate = n / elapsed if elapsed > 0 else 0.0
+    print(f"Generated {n} days in {elapsed:.2f}s ({rate:.1f} days/sec, {args.workers} workers)", file=sys.stderr)
+    if not n:
+        print(f"no stored days from {args.first:%d-%m-%Y} to {last:%d-%m-%Y} in {args.data}", file=sys.stderr)
+        return 1
+    return 0
+
+def export_main(argv=None):
+    """`Zenith.py export`: the same as generate, written as an .ics calendar unless --format says otherwise."""
+    return main(argv, prog="Zenith.py export", default_format="ics")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Benchmarks for Zenith's hot paths: scheduling, time parsing, persistence
+and timeline rendering, on synthetic data.
+
+    python bench.py                              # run and print
+    python bench.py --save bench_baseline.json   # record a baseline
+    python bench.py --compare bench_baseline.json --threshold 0.25
+                                                 # exit 1 if anything got >25% slower
+
+Timings are the median of several runs, in milliseconds. Baselines are
+compared on the fastest run (the one least disturbed by the rest of the
+machine), and a slowdown under NOISE_FLOOR_MS never counts.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from analytics import date_range, month_bounds, summarize
+from archive import Archive, write_archive
+from model import compile_day
+from optimize import optimize_plan
+from profiling import Profiler
+from rollups import RollupStore, day_rollup
+from scheduler import build_schedule, min_to_time, time_to_min
+from server import ApiServer, ZenithService
+from storage import DayStore, atomic_write_json, date_of_key, key_for_date, load_legacy
+
+BASELINE_FILE = "bench_baseline.json"
+NOISE_FLOOR_MS = 0.05   # slowdowns smaller than this are timer noise, whatever the ratio
+
+# --- SYNTHETIC DATA ---
+def make_day(n_tasks, m_events, seed=0):
+    """A day with `m_events` fixed classes spread over 08:00-23:00 and `n_tasks` tasks."""
+    rnd = random.Random(seed)
+    classes = []
+    for i in range(m_events):
+        s = rnd.randrange(8 * 60, 22 * 60)
+        classes.append({"name": f"Class {i}", "start": min_to_time(s), "end": min_to_time(s + rnd.choice([30, 45, 60, 90]))})
+    tasks = [{"name": f"Task {i}", "duration": rnd.choice([15, 20, 30, 45, 60, 1, 2]),
+              "priority": rnd.choice(["High", "Medium", "Low"]), "completed": rnd.random() < 0.3}
+             for i in range(n_tasks)]
+    return {"tasks": tasks, "classes": classes, "meals": {"Breakfast": "09:00", "Lunch": "13:00", "Dinner": "20:00"}}
+
+def make_fragmented_day(n_tasks, seed=0):
+    """Worst case for first-fit: 1-minute classes every 3 minutes leave hundreds of 2-minute gaps."""
+    rnd = random.Random(seed)
+    classes = [{"name": f"Slot {i}", "start": min_to_time(m), "end": min_to_time(m + 1)}
+               for i, m in enumerate(range(8 * 60, 23 * 60, 3))]
+    tasks = [{"name": f"Task {i}", "duration": rnd.choice([10, 12, 15]), "priority": rnd.choice(["High", "Medium", "Low"])}
+             for i in range(n_tasks)]
+    return {"tasks": tasks, "classes": classes, "meals": {}}
+
+def make_history(k_days, n_tasks=8, m_events=4, start=date(2024, 1, 1)):
+    """weekly_data for `k_days` consecutive days."""
+    return {key_for_date(start + timedelta(days=i)): make_day(n_tasks, m_events, seed=i) for i in range(k_days)}
+
+# --- HEADLESS TIMELINE ---
+def headless_timeline_class():
+    """TimelineCanvas' layout logic running against a recorder instead of a Tk canvas."""
+    from Zenith import TimelineCanvas
+
+    class HeadlessTimeline:
+        ROW_H, OVERSCAN = TimelineCanvas.ROW_H, TimelineCanvas.OVERSCAN
+        set_items = TimelineCanvas.set_items
+        refresh_checks = TimelineCanvas.refresh_checks
+        _render_visible = TimelineCanvas._render_visible
+        _visible_range = TimelineCanvas._visible_range
+        _draw_row = TimelineCanvas._draw_row
+        _paint_check = TimelineCanvas._paint_check
+
+        def __init__(self, width=950, height=600):
+            self.items, self._rows, self._width, self._height = [], {}, width, height
+            self.top = 0
+            self.created = 0
+
+        def create_rectangle(self, *args, **kw):
+            self.created += 1
+            return self.created
+        create_text = create_rectangle
+
+        def delete(self, *ids): pass
+        def configure(self, **kw): pass
+        def itemconfigure(self, item_id, **kw): pass
+        def canvasy(self, y): return self.top + y
+        def winfo_height(self): return self._height
+
+    return HeadlessTimeline
+
+def open_app(data_root, day_key):
+    """The app on a store, viewing `day_key`, started without waiting for the window to map."""
+    from Zenith import ModernTimetableApp
+    app = ModernTimetableApp(data_dir=data_root, legacy_file=None)
+    app.current_view_day, app.current_view_date = day_key.split(" ", 1)
+    app.finish_startup()
+    return app
+
+def tk_root():
+    """A withdrawn Tk root, or None when there is no display."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    return root
+
+# --- BENCHMARKS ---
+def bench_schedule(data):
+    return lambda: build_schedule(data)
+
+def bench_optimize(data):
+    """The optimizer without its time budget: only its step limits, so every run does the same work."""
+    return lambda: optimize_plan(compile_day(data), budget=float("inf"))
+
+def bench_time_to_min(n=10000):
+    strings = [min_to_time(i % 1440) for i in range(n)]
+    return lambda: [time_to_min(s) for s in strings]
+
+def bench_profiled_calls(enabled, n=10000):
+    """n calls of a trivial function under @profiled: the cost profiling adds to each call."""
+    profiler = Profiler(enabled=enabled)
+    noop = profiler.timed("noop")(lambda: None)
+    def run():
+        for _ in range(n):
+            noop()
+        profiler.reset()
+    return run
+
+class TempStore:
+    """The history migrated into a DayStore in a temp directory."""
+
+    def __init__(self, history):
+        self.tmp = tempfile.mkdtemp(prefix="zenith-bench-")
+        self.legacy = os.path.join(self.tmp, "weekly_timetable.json")
+        atomic_write_json(self.legacy, history, fsync=False, indent=2)
+        self.root = os.path.join(self.tmp, "zenith_data")
+        DayStore(self.root, legacy_file=self.legacy).close()
+
+    def close(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+def collect(k_days, quick=False):
+    """name -> zero-argument callable for every benchmark, plus a cleanup callable."""
+    benches = {}
+    benches["schedule/day_20x6"] = bench_schedule(make_day(20, 6))
+    benches["schedule/day_500x100"] = bench_schedule(make_day(500, 100, seed=1))
+    benches["schedule/fragmented_300"] = bench_schedule(make_fragmented_day(300))
+    benches["schedule/optimize_40x10"] = bench_optimize(make_day(40, 10, seed=2))
+    benches["time_to_min/10k"] = bench_time_to_min()
+    benches["profiling/off_10k_calls"] = bench_profiled_calls(False)
+    benches["profiling/on_10k_calls"] = bench_profiled_calls(True)
+
+    history = make_history(k_days)
+    store = TempStore(history)
+    today = list(history)[-1]
+
+    benches[f"load/legacy_json_{k_days}d"] = lambda: load_legacy(os.path.join(store.tmp, "weekly_timetable.json.migrated"))
+    benches[f"load/store_open_{k_days}d"] = lambda: DayStore(store.root, legacy_file=None).close()
+    def open_and_read_today():
+        s = DayStore(store.root, legacy_file=None)
+        s.get(today)
+        s.close()
+    benches[f"load/store_open_get_today_{k_days}d"] = open_and_read_today
+    archive_path = os.path.join(store.tmp, "history.zarc")
+    write_archive(archive_path, history.items())
+    archive = Archive(archive_path)
+    def open_archive_get_today():
+        with Archive(archive_path) as a:
+            a.get(today)
+    benches[f"load/archive_open_get_today_{k_days}d"] = open_archive_get_today
+    benches["load/archive_get_day_x100"] = lambda: [archive.get(today) for _ in range(100)]
+
+    live = DayStore(store.root, legacy_file=None, compact_after=10 ** 9, debounce=0)
+    day = history[today]
+    task = day["tasks"][0]["name"]
+    def toggles():
+        for i in range(100):
+            live.set_completed(today, task, bool(i % 2))
+        return live.flush()
+    def puts():
+        for _ in range(100):
+            live.put_day(today, day)
+        return live.flush()
+    benches["save/toggle_x100"] = toggles
+    benches["save/put_day_x100"] = puts
+
+    # "Task minutes this month": scheduling every day again vs. the rollups' running totals
+    first, last = month_bounds(date(2024, 1, 1))
+    dates = [d for d in date_range(first, last) if key_for_date(d) in history]
+    benches["analytics/month_recompute"] = lambda: summarize([build_schedule(history[key_for_date(d)]) for d in dates], dates)
+    rollups = RollupStore(os.path.join(store.tmp, "rollups.json"))
+    for key, data in history.items():
+        rollups.update(key, day_rollup(build_schedule(data), data))
+    benches["analytics/month_rollups"] = lambda: rollups.stats(first, last)
+    benches["analytics/year_totals_rollups"] = lambda: rollups.totals(date(2024, 1, 1), date(2024, 12, 31))
+
+    # The JSON API over one keep-alive connection (its own copy of the store: the server owns it)
+    api_store = TempStore(history)
+    api = ApiServer(ZenithService(api_store.root, legacy_file=None), port=0)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", api.server_address[1])
+    def api_calls(method, path, body=None):
+        def run():
+            for _ in range(100):
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                conn.getresponse().read()
+        return run
+    iso = date_of_key(today).isoformat()
+    benches["server/get_schedule_x100"] = api_calls("GET", f"/api/days/{iso}")
+    benches["server/toggle_x100"] = api_calls("POST", f"/api/days/{iso}/tasks/{quote(task)}", json.dumps({"completed": True}))
+
+    Headless = None
+    try:
+        Headless = headless_timeline_class()
+    except ImportError:
+        pass
+    if Headless is not None:
+        schedule = build_schedule(make_day(500, 100, seed=1))
+        def headless_draw():
+            t = Headless()
+            t.set_items(schedule)
+        benches["draw_timeline/headless_600_rows"] = headless_draw
+
+    root = None if quick else tk_root()
+    app = None
+    if root is not None:
+        from Zenith import TimelineCanvas
+        canvas = TimelineCanvas(root, width=950, height=600)
+        canvas.pack()
+        schedule = build_schedule(make_day(500, 100, seed=1))
+        def tk_draw():
+            canvas.set_items(schedule)
+            root.update_idletasks()
+        benches["draw_timeline/tk_600_rows"] = tk_draw
+
+        def cold_start():
+            open_app(store.root, today).on_close()
+        benches[f"startup/cold_start_{k_days}d"] = cold_start
+
+        app = open_app(store.root, today)
+        pages = ("Editor", "Analytics", "Dashboard")
+        for page in pages:
+            app.show_page(page)     # built once, then only raised and refreshed
+        def tab_switch():
+            for page in pages:
+                app.show_page(page)
+        benches["startup/tab_switch_x3"] = tab_switch
+
+    def cleanup():
+        live.close()
+        archive.close()
+        conn.close()
+        api.shutdown()
+        api.server_close()
+        api.service.close()
+        api_store.close()
+        if app is not None:
+            app.on_close()
+        store.close()
+        if root is not None:
+            root.destroy()
+    return benches, cleanup
+
+def timeit(fn, repeat, min_time=0.05):
+    """Median time of one call, in ms. Fast functions are looped to get a measurable run."""
+    t0 = time.perf_counter()
+    fn()
+    one = time.perf_counter() - t0
+    loops = max(1, int(min_time / one)) if one > 0 else 1000
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - t0) / loops * 1000)
+    return {"median_ms": statistics.median(runs), "min_ms": min(runs), "runs": repeat, "loops": loops}
+
+# --- BASELINES ---
+def compare(results, baseline, threshold):
+    """
+    Names of benchmarks whose fastest run grew by more than `threshold`
+    (0.25 = 25%) and by more than NOISE_FLOOR_MS.
+    """
+    regressions = []
+    for name, res in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        old_ms = old.get("min_ms", old["median_ms"])
+        ratio = res["min_ms"] / old_ms if old_ms > 0 else 1.0
+        res["vs_baseline"] = ratio
+        if ratio > 1 + threshold and res["min_ms"] - old_ms > NOISE_FLOOR_MS:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Zenith's hot paths.")
+    parser.add_argument("--days", type=int, default=365, help="history length for the persistence benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats, no Tk benchmarks")
+    parser.add_argument("--save", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", nargs="?", const=BASELINE_FILE, help="compare with a baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+    repeat = 3 if args.quick else args.repeat
+
+    benches, cleanup = collect(args.days, quick=args.quick)
+    results = {}
+    try:
+        for name, fn in benches.items():
+            if args.filter in name:
+                results[name] = timeit(fn, repeat)
+    finally:
+        cleanup()
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    for name, res in results.items():
+        line = f"{name:<40} {res['median_ms']:10.3f} ms"
+        if "vs_baseline" in res:
+            line += f"   x{res['vs_baseline']:.2f}" + ("  REGRESSION" if name in regressions else "")
+        print(line)
+
+    if args.save:
+        atomic_write_json(args.save, {"python": sys.version.split()[0], "days": args.days, "results": results},
+                          fsync=False, indent=2)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Date index over Zenith's stored day keys.
+
+Day keys are strings ("Saturday 17-10-2026") typed partly by hand, so the
+same date can end up under several keys: a weekday that does not match
+the date, a date without a weekday, an unpadded "5-1-2026". The index
+maps every key that holds a date to that date's ordinal and keeps the
+ordinals in a sorted list, so navigation, range queries and existence
+checks are bisects instead of parsing every key.
+
+`python Zenith.py reindex` merges the keys of a date into its
+key_for_date() key once, so the UI never shows an orphan copy again.
+"""
+import argparse
+import os
+import sys
+from bisect import bisect_left, bisect_right, insort
+from datetime import date as _date, datetime
+
+from storage import DATA_DIR, DayStore, key_for_date
+
+# Date spellings found in day keys, tried in order
+DATE_FORMATS = ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y")
+
+def parse_day_key(day_key):
+    """
+    The date a key stands for, whatever its weekday says (or None): the
+    last word is the date, e.g. "Monday 17-10-2026", "17-10-2026".
+    """
+    words = day_key.split()
+    if not words:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(words[-1], fmt).date()
+        except ValueError:
+            pass
+    return None
+
+class DayIndex:
+    """
+    Stored day keys by date. Dates are kept as a sorted list of ordinals;
+    each ordinal maps to the keys stored for it, the canonical one first.
+    Keys without a recognizable date are kept in `unparsed`.
+    """
+
+    def __init__(self, keys=()):
+        self._ords = []         # sorted ordinals that have at least one key
+        self._keys = {}         # ordinal -> [day keys]
+        self.unparsed = set()
+        for day_key in keys:
+            self.add(day_key)
+
+    # --- Changes ---
+    def add(self, day_key):
+        date = parse_day_key(day_key)
+        if date is None:
+            self.unparsed.add(day_key)
+            return
+        o = date.toordinal()
+        keys = self._keys.get(o)
+        if keys is None:
+            self._keys[o] = [day_key]
+            insort(self._ords, o)
+        elif day_key not in keys:
+            if day_key == key_for_date(date):
+                keys.insert(0, day_key)
+            else:
+                keys.append(day_key)
+
+    def discard(self, day_key):
+        self.unparsed.discard(day_key)
+        date = parse_day_key(day_key)
+        if date is None:
+            return
+        o = date.toordinal()
+        keys = self._keys.get(o)
+        if keys is None or day_key not in keys:
+            return
+        keys.remove(day_key)
+        if not keys:
+            del self._keys[o]
+            del self._ords[bisect_left(self._ords, o)]
+
+    # --- Queries ---
+    def __contains__(self, date):
+        return date.toordinal() in self._keys
+
+    def __len__(self):
+        return len(self._ords)
+
+    def keys_on(self, date):
+        """Every stored key of `date`, the canonical one first."""
+        return list(self._keys.get(date.toordinal(), ()))
+
+    def key_for(self, date):
+        """The key `date` is stored under (its canonical key if it has one), or None."""
+        keys = self._keys.get(date.toordinal())
+        return keys[0] if keys else None
+
+    def prev(self, date):
+        """Latest stored date before `date`, or None."""
+        i = bisect_left(self._ords, date.toordinal())
+        return _date.fromordinal(self._ords[i - 1]) if i else None
+
+    def next(self, date):
+        """Earliest stored date after `date`, or None."""
+        i = bisect_right(self._ords, date.toordinal())
+        return _date.fromordinal(self._ords[i]) if i < len(self._ords) else None
+
+    def between(self, first, last):
+        """(date, key) for every stored date in first..last, in date order."""
+        lo = bisect_left(self._ords, first.toordinal())
+        hi = bisect_right(self._ords, last.toordinal())
+        for o in self._ords[lo:hi]:
+            yield _date.fromordinal(o), self._keys[o][0]
+
+    def duplicates(self):
+        """(date, keys) for every date not stored under exactly its canonical key."""
+        for o in self._ords:
+            keys = self._keys[o]
+            date = _date.fromordinal(o)
+            if len(keys) > 1 or keys[0] != key_for_date(date):
+                yield date, list(keys)
+
+# --- MIGRATION ---
+def merge_days(into, other):
+    """
+    Fold the day `other` into `into` (in place): tasks and classes not
+    already there are appended, meals missing from `into` are added.
+    """
+    names = {t.get("name") for t in into.setdefault("tasks", [])}
+    for t in other.get("tasks", []):
+        if t.get("name") not in names:
+            into["tasks"].append(t)
+            names.add(t.get("name"))
+    held = {(c.get("name"), c.get("start"), c.get("end")) for c in into.setdefault("classes", [])}
+    for c in other.get("classes", []):
+        sig = (c.get("name"), c.get("start"), c.get("end"))
+        if sig not in held:
+            into["classes"].append({k: v for k, v in c.items() if k != "rule"})
+            held.add(sig)
+    meals = into.setdefault("meals", {})
+    for m, t in other.get("meals", {}).items():
+        meals.setdefault(m, t)
+    return into
+
+def merge_duplicates(days, index=None):
+    """
+    One pass over the index: every date stored under another key than
+    key_for_date() (or under several keys) ends up under that key alone,
+    its copies merged with merge_days, canonical copy first. `days` is a
+    DayStore or LayeredDays. Returns the number of keys folded away.
+    """
+    if index is None:
+        index = DayIndex(days.keys())
+    merged = 0
+    for date, keys in list(index.duplicates()):
+        canonical = key_for_date(date)
+        data = days.get(canonical)
+        data = {"tasks": [], "classes": [], "meals": {}} if data is None else dict(data)
+        for k in keys:
+            if k != canonical:
+                merge_days(data, days[k])
+        days[canonical] = data
+        index.add(canonical)
+        for k in keys:
+            if k != canonical:
+                days.delete_day(k)
+                index.discard(k)
+                merged += 1
+    return merged
+
+def main(argv=None):
+    from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+
+    parser = argparse.ArgumentParser(prog="Zenith.py reindex",
+                                     description="Merge days stored under mismatched or old-style keys into one key per date.")
+    parser.add_argument("--data", default=DATA_DIR, help="zenith_data directory")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.data):
+        parser.error(f"no zenith_data directory at {args.data}")
+
+    days = LayeredDays(DayStore(args.data, legacy_file=None), Calendar(os.path.join(args.data, RECURRENCE_FILE)))
+    try:
+        index = DayIndex(days.keys())
+        merged = merge_duplicates(days, index)
+    finally:
+        days.close()
+    print(f"{merged} key(s) merged, {len(index)} date(s) stored", file=sys.stderr)
+    if index.unparsed:
+        print(f"left as they are (no date): {', '.join(sorted(index.unparsed))}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+Streaming iCalendar (.ics) and CSV import / export for Zenith.
+
+Export writes the computed schedules of `python Zenith.py export` (the
+same as `generate --format ics`; CSV and JSONL are in batch.py) a chunk of
+lines at a time.
+Import reads a file line by line and merges its timed events into a
+zenith_data directory: fixed events become classes, Zenith's own exports
+come back as the classes, meals and tasks they were made from (tasks with
+their priority, X-ZENITH-PRIORITY or the CSV priority column, and their
+length in minutes).
+
+    python Zenith.py export --from 01-01-2026 --to 31-12-2026 -o 2026.ics
+    python Zenith.py import university.ics
+    python Zenith.py import history.csv --user alice
+
+Times are local wall-clock times: exported events carry no time zone, and
+imported UTC times are converted to the local zone (TZID times are taken
+as written).
+"""
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from dayindex import merge_days, parse_day_key
+from model import PRIORITY_RANK, minutes_label
+from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+from storage import DATA_DIR, DayStore, key_for_date
+
+CHUNK_LINES = 1000      # exported lines collected before one write
+BUFFER_DAYS = 64        # imported dates held in memory before they are merged into the store
+PRODID = "-//Zenith//Smart Scheduler//EN"
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+KINDS = ("Class", "Meal", "Task")
+LAST_MINUTE = 23 * 60 + 59      # classes running past midnight are cut here
+
+# --- ICS TEXT ---
+def ics_escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def ics_unescape(text):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), text)
+
+def fold(line):
+    """Split a content line into 75-octet pieces, continuation lines starting with a space."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    pieces, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:     # never cut a UTF-8 sequence
+            end -= 1
+        pieces.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(pieces) + "\r\n"
+
+def unfold(lines):
+    """Logical content lines of an iCalendar stream (folded lines joined)."""
+    current = ""
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+def _split_unquoted(text, sep):
+    parts, quoted, start = [], False, 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == sep and not quoted:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+def parse_content_line(line):
+    """(NAME, {PARAM: value}, value) of a content line, or None if it has no value."""
+    if '"' in line:
+        head = _split_unquoted(line, ":")[0]
+        if len(head) == len(line):
+            return None
+        name, *params = _split_unquoted(head, ";")
+    else:
+        # Usual case, no quoted parameter values: plain string splits
+        head, colon, _ = line.partition(":")
+        if not colon:
+            return None
+        name, *params = head.split(";")
+    value = line[len(head) + 1:]
+    params = dict(p.split("=", 1) for p in params if "=" in p)
+    return name.upper(), {k.upper(): v.strip('"') for k, v in params.items()}, value
+
+# --- EXPORT ---
+def ics_event(user, key, iso, item, stamp):
+    """Content lines of one schedule item as a VEVENT."""
+    day = datetime.strptime(iso, "%Y-%m-%d")
+    start = day + timedelta(minutes=item["start_min"])
+    end = day + timedelta(minutes=item["end_min"])
+    digest = hashlib.sha1(f"{user}|{item['type']}|{item['name']}".encode("utf-8")).hexdigest()[:10]
+    lines = ["BEGIN:VEVENT",
+             f"UID:{iso}-{item['start_min']}-{digest}@zenith",
+             f"DTSTAMP:{stamp}",
+             f"DTSTART:{start:%Y%m%dT%H%M%S}",
+             f"DTEND:{end:%Y%m%dT%H%M%S}",
+             f"SUMMARY:{ics_escape(item['name'])}",
+             f"CATEGORIES:{item['type']}"]
+    if item["type"] == "Task":
+        lines.append(f"X-ZENITH-COMPLETED:{'TRUE' if item.get('completed') else 'FALSE'}")
+        if item.get("priority"):
+            lines.append(f"X-ZENITH-PRIORITY:{item['priority']}")
+    lines.append("END:VEVENT")
+    return lines
+
+def write_ics(results, out, chunk_lines=CHUNK_LINES):
+    """One VCALENDAR with an event per schedule item; returns the number of days written."""
+    stamp = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+    chunk = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"]
+    n = 0
+    for user, key, iso, schedule in results:
+        for item in schedule:
+            chunk.extend(ics_event(user, key, iso, item, stamp))
+        n += 1
+        if len(chunk) >= chunk_lines:
+            out.write("".join(fold(line) for line in chunk))
+            chunk = []
+    chunk.append("END:VCALENDAR")
+    out.write("".join(fold(line) for line in chunk))
+    return n
+
+# --- READING ---
+def iter_vevents(lines):
+    """{NAME: [(params, value), ...]} for every VEVENT (nested components such as VALARM left out)."""
+    event, depth = None, 0
+    for line in unfold(lines):
+        parsed = parse_content_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == "BEGIN":
+            if event is not None:
+                depth += 1
+            elif value.upper() == "VEVENT":
+                event = {}
+        elif name == "END":
+            if event is not None and depth:
+                depth -= 1
+            elif event is not None and value.upper() == "VEVENT":
+                yield event
+                event = None
+        elif event is not None and not depth:
+            event.setdefault(name, []).append((params, value))
+
+def ics_time(params, value):
+    """A DATE-TIME as a naive local datetime, or a DATE (all day) as a date."""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d").date()
+    if len(value) < 15 or value[8] != "T" or not value[:8].isdigit() or not value[9:15].isdigit():
+        raise ValueError(f"invalid DATE-TIME {value!r}")
+    # Sliced by hand: strptime dominates the import otherwise
+    dt = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return dt
+
+_DURATION = re.compile(r"^\+?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+def ics_duration(value):
+    m = _DURATION.match(value)
+    if m is None:
+        raise ValueError(f"unsupported DURATION {value!r}")
+    w, d, h, mi, s = (int(x or 0) for x in m.groups())
+    return timedelta(weeks=w, days=d, hours=h, minutes=mi, seconds=s)
+
+def _value(ev, name, default=None):
+    return ev[name][0][1] if name in ev else default
+
+def _day_of(params, value):
+    t = ics_time(params, value)
+    return t.date() if isinstance(t, datetime) else t
+
+def ics_event_fields(ev):
+    """Import event of one VEVENT, or None for an all-day event. Raises ValueError if unreadable."""
+    start = ics_time(*ev["DTSTART"][0])
+    if not isinstance(start, datetime):
+        return None
+    if "DTEND" in ev:
+        end = ics_time(*ev["DTEND"][0])
+    elif "DURATION" in ev:
+        end = start + ics_duration(_value(ev, "DURATION"))
+    else:
+        end = start
+    if not isinstance(end, datetime):
+        end = datetime.combine(end, datetime.min.time())
+
+    kind = _value(ev, "CATEGORIES")
+    start_min = start.hour * 60 + start.minute
+    event = {"date": start.date(), "type": kind if kind in KINDS else "Class",
+             "name": ics_unescape(_value(ev, "SUMMARY", "Event")),
+             "start": start_min, "end": start_min + int((end - start).total_seconds() // 60),
+             "completed": _value(ev, "X-ZENITH-COMPLETED", "").upper() == "TRUE",
+             "priority": _value(ev, "X-ZENITH-PRIORITY"), "uid": _value(ev, "UID")}
+    if "RRULE" in ev:
+        event["rrule"] = dict(p.split("=", 1) for p in _value(ev, "RRULE").upper().split(";") if "=" in p)
+        event["exdates"] = [_day_of(params, v) for params, value in ev.get("EXDATE", []) for v in value.split(",")]
+    if "RECURRENCE-ID" in ev:
+        event["recurrence_id"] = _day_of(*ev["RECURRENCE-ID"][0])
+    return event
+
+def ics_events(lines, stats):
+    """
+    Import events (see Importer.add) of an iCalendar stream. All-day and
+    unreadable events are counted in `stats` and left out.
+    """
+    for ev in iter_vevents(lines):
+        try:
+            event = ics_event_fields(ev)
+        except (KeyError, TypeError, ValueError):
+            stats["unreadable"] += 1
+            continue
+        if event is None:
+            stats["all_day"] += 1
+            continue
+        yield event
+
+def _label_minutes(label):
+    h, m = label.split(":")
+    return int(h) * 60 + int(m)
+
+def csv_events(f, stats, user=None):
+    """Import events of a CSV export (batch.CSV_FIELDS columns), optionally only one user's rows."""
+    for row in csv.DictReader(f):
+        if user is not None and row.get("user") != user:
+            continue
+        try:
+            date = (datetime.strptime(row["date"], "%Y-%m-%d").date() if row.get("date")
+                    else parse_day_key(row.get("day") or ""))
+            if date is None:
+                raise ValueError("no date")
+            start = _label_minutes(row["start"])
+            end = _label_minutes(row["end"]) if row.get("end") else start + int(row["duration"])
+        except (KeyError, TypeError, ValueError):
+            stats["unreadable"] += 1
+            continue
+        yield {"date": date, "type": row.get("type") if row.get("type") in KINDS else "Class",
+               "name": row.get("name") or "Event", "start": start, "end": end,
+               "completed": row.get("completed") == "True", "priority": row.get("priority")}
+
+# --- IMPORT ---
+class Importer:
+    """
+    Merges import events into stored days in one pass, in bounded memory.
+
+    Events are collected per date, at most `buffer_days` dates at a time;
+    when the buffer is full its oldest dates are merged into the store
+    (merge_days, so importing a file twice adds nothing the second time)
+    and the store is flushed before reading on. Weekly recurring classes
+    become rules of `calendar` when there is one; other recurrences only
+    import their first occurrence.
+    """
+
+    def __init__(self, days, calendar=None, buffer_days=BUFFER_DAYS):
+        self.days = days
+        self.calendar = calendar
+        self.buffer_days = buffer_days
+        self.stats = Counter()
+        self._buffer = OrderedDict()    # date -> imported part of that day
+        self._rules = {}                # UID -> rule made from it
+        self._overridden = {}           # UID -> dates with a RECURRENCE-ID override
+        self._unsaved_rules = False     # rules added since the calendar was last saved
+
+    def add(self, event):
+        if event.get("rrule") is not None:
+            try:
+                as_rule = self._add_rule(event)
+            except (KeyError, ValueError):
+                as_rule = False
+            if as_rule:
+                return
+            self.stats["not_expanded"] += 1
+        if event.get("recurrence_id") is not None and event.get("uid"):
+            self._overridden.setdefault(event["uid"], set()).add(event["recurrence_id"])
+
+        part = self._buffer.get(event["date"])
+        if part is None:
+            part = self._buffer[event["date"]] = {"tasks": [], "classes": [], "meals": {}}
+        merge_days(part, self._day_part(event))
+        self.stats["events"] += 1
+        if len(self._buffer) > self.buffer_days:
+            self._flush(max(1, self.buffer_days // 2))
+
+    def _day_part(self, event):
+        kind, start, end = event["type"], event["start"], event["end"]
+        if kind == "Meal":
+            return {"meals": {event["name"]: minutes_label(start)}}
+        if kind == "Task":
+            # Minutes as exported: short ones are marked, or they would be read as hours (model.task_minutes)
+            task = {"name": event["name"], "duration": end - start,
+                    "priority": event.get("priority") if event.get("priority") in PRIORITY_RANK else "Medium",
+                    "completed": event["completed"]}
+            if task["duration"] < 10:
+                task["unit"] = "minutes"
+            return {"tasks": [task]}
+        if end > LAST_MINUTE:
+            end = LAST_MINUTE
+            self.stats["clipped"] += 1
+        return {"classes": [{"name": event["name"], "start": minutes_label(start), "end": minutes_label(max(end, start))}]}
+
+    def _add_rule(self, event):
+        """Weekly RRULE (every week, plain BYDAY) of a class -> calendar rule. False if not supported."""
+        rrule = event["rrule"]
+        if (self.calendar is None or event["type"] != "Class" or rrule.get("FREQ") != "WEEKLY"
+                or rrule.get("INTERVAL", "1") != "1" or event["end"] > LAST_MINUTE):
+            return False
+        codes = rrule["BYDAY"].split(",") if "BYDAY" in rrule else [WEEKDAY_CODES[event["date"].weekday()]]
+        if any(c not in WEEKDAY_CODES for c in codes):
+            return False
+        weekdays = [WEEKDAY_CODES.index(c) for c in codes]
+        first, last = event["date"], None
+        if "UNTIL" in rrule:
+            until = ics_time({}, rrule["UNTIL"])
+            last = until.date() if isinstance(until, datetime) else until
+        elif "COUNT" in rrule:
+            # Walk the occurrences to the COUNTth
+            last, left = first, int(rrule["COUNT"])
+            while True:
+                if last.weekday() in weekdays:
+                    left -= 1
+                    if left <= 0:
+                        break
+                last += timedelta(days=1)
+        rule = self.calendar.add_rule(event["name"], minutes_label(event["start"]), minutes_label(event["end"]),
+                                      weekdays, first=first, last=last, exceptions=event.get("exdates", ()), save=False)
+        self._unsaved_rules = True
+        if event.get("uid"):
+            self._rules[event["uid"]] = rule
+        self.stats["rules"] += 1
+        return True
+
+    def _flush(self, n):
+        if self._unsaved_rules:
+            # Stored days are deltas from their rules: the rules go to disk first
+            self.calendar.save()
+            self._unsaved_rules = False
+        for _ in range(min(n, len(self._buffer))):
+            date, part = self._buffer.popitem(last=False)
+            key = key_for_date(date)
+            existing = self.days.get(key)
+            if existing is None:
+                # A new day starts as its base (rule classes, template meals); imported meals override those
+                base = self.calendar.base(date)
+                data = {"tasks": [], "classes": [dict(c) for c in base["classes"]], "meals": dict(base["meals"])}
+                merge_days(data, dict(part, meals={}))
+                data["meals"].update(part.get("meals", {}))
+            else:
+                data = {"tasks": list(existing.get("tasks", [])), "classes": list(existing.get("classes", [])),
+                        "meals": dict(existing.get("meals", {}))}
+                merge_days(data, part)
+                if data == existing:
+                    continue
+            self.days[key] = data
+            self.stats["days"] += 1
+        if not self.days.flush():
+            raise OSError("the imported days could not be saved")
+
+    def close(self):
+        """Merge what is left and save the rules (with their overridden occurrences as exceptions)."""
+        if self._rules:
+            self.calendar.save()
+            self._unsaved_rules = False
+            for uid, dates in self._overridden.items():
+                rule = self._rules.get(uid)
+                for date in sorted(dates) if rule is not None else ():
+                    self.calendar.add_exception(rule["id"], date)
+        self._flush(len(self._buffer))
+        return self.stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="Zenith.py import",
+                                     description="Merge the events of an .ics or CSV file into Zenith's data.")
+    parser.add_argument("file", help=".ics or .csv file (CSV as written by 'Zenith.py generate --format csv')")
+    parser.add_argument("--data", default=DATA_DIR, help="zenith_data directory (created if missing)")
+    parser.add_argument("--format", choices=["ics", "csv"], default=None, help="default: from the file extension")
+    parser.add_argument("--user", default=None, help="CSV only: import just this user's rows")
+    parser.add_argument("--buffer-days", type=int, default=BUFFER_DAYS, help="dates held in memory at a time")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "ics")
+    if not os.path.isfile(args.file):
+        parser.error(f"no file at {args.file}")
+
+    calendar = Calendar(os.path.join(args.data, RECURRENCE_FILE))
+    days = LayeredDays(DayStore(args.data, legacy_file=None), calendar)
+    importer = Importer(days, calendar, args.buffer_days)
+    try:
+        with open(args.file, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+            events = csv_events(f, importer.stats, args.user) if fmt == "csv" else ics_events(f, importer.stats)
+            for event in events:
+                importer.add(event)
+        stats = importer.close()
+    except OSError as e:
+        print(f"Import stopped: {e} ({days.store.last_error})", file=sys.stderr)
+        return 1
+    finally:
+        days.close()
+
+    print(f"Imported {stats['events']} event(s) into {stats['days']} day(s), {stats['rules']} weekly rule(s)", file=sys.stderr)
+    notes = {"all_day": "all-day events skipped", "unreadable": "unreadable entries skipped",
+             "not_expanded": "recurring events imported as their first occurrence only",
+             "clipped": "classes cut at 23:59"}
+    for k, text in notes.items():
+        if stats[k]:
+            print(f"  {stats[k]} {text}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
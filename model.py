@@ -0,0 +1,150 @@
+"""
+Compiled day model: a day's raw JSON (strings, dicts) turned once into
+compact slotted records with integer minutes and interned type codes.
+"""
+# --- TYPE CODES ---
+CLASS, MEAL, TASK = 0, 1, 2
+TYPE_NAMES = ("Class", "Meal", "Task")
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+MEAL_DURATION = 45
+
+# --- TIME PARSING ---
+# Every spelling strptime("%H:%M") accepts ("9:05", "09:05", "9:5", ...),
+# looked up in one dict instead of parsed.
+_HHMM = {}
+for _h in range(24):
+    for _m in range(60):
+        for _hs in {f"{_h}", f"{_h:02d}"}:
+            for _ms in {f"{_m}", f"{_m:02d}"}:
+                _HHMM[f"{_hs}:{_ms}"] = _h * 60 + _m
+del _h, _m, _hs, _ms
+
+# "HH:MM" labels for 0..48h, so formatting a schedule is an index lookup
+_LABELS = [f"{m // 60:02d}:{m % 60:02d}" for m in range(48 * 60)]
+
+def parse_hhmm(t_str):
+    """Minutes from midnight of an "HH:MM" string. Raises ValueError if it is not a valid time."""
+    try:
+        return _HHMM[t_str]
+    except (KeyError, TypeError):
+        raise ValueError(f"invalid time {t_str!r} (expected HH:MM)") from None
+
+def minutes_label(mins):
+    """HH:MM for minutes from midnight (same output as scheduler.min_to_time)."""
+    if type(mins) is int and 0 <= mins < len(_LABELS):
+        return _LABELS[mins]
+    return f"{int(mins // 60):02d}:{int(mins % 60):02d}"
+
+def task_minutes(duration, unit=None):
+    """
+    Old editor saved hours, new one saves minutes: assume hours if small number
+    (unless the task says "unit": "minutes", as imported short tasks do).
+    """
+    if duration < 10 and unit != "minutes":
+        return duration * 60
+    return duration
+
+# --- RECORDS ---
+class Event:
+    """A block on the timeline: a class, a meal, or a placed task."""
+    __slots__ = ("name", "start", "end", "kind", "completed")
+
+    def __init__(self, name, start, end, kind, completed=None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.completed = completed
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def as_dict(self):
+        """The schedule item dict the UI and exports use."""
+        d = {"name": self.name, "start_min": self.start, "end_min": self.end,
+             "type": TYPE_NAMES[self.kind], "duration": self.end - self.start}
+        if self.kind == TASK:
+            d["completed"] = self.completed
+        d["start"] = minutes_label(self.start)
+        d["end"] = minutes_label(self.end)
+        return d
+
+    def __repr__(self):
+        return f"Event({self.name!r}, {self.start}, {self.end}, {TYPE_NAMES[self.kind]})"
+
+class Task:
+    """A flexible task waiting to be placed. `minutes` already has the hours rule applied."""
+    __slots__ = ("name", "minutes", "rank", "completed")
+
+    def __init__(self, name, minutes, rank, completed=False):
+        self.name = name
+        self.minutes = minutes
+        self.rank = rank
+        self.completed = completed
+
+    def __repr__(self):
+        return f"Task({self.name!r}, {self.minutes}m, rank {self.rank})"
+
+class DayPlan:
+    """
+    A day ready for scheduling: fixed events sorted by start, tasks in
+    placement (priority) order, and the problems found while compiling.
+    """
+    __slots__ = ("events", "tasks", "errors")
+
+    def __init__(self, events, tasks, errors):
+        self.events = events
+        self.tasks = tasks
+        self.errors = errors
+
+# --- COMPILER ---
+def compile_class(c):
+    """Event of a stored class. Raises ValueError (with a readable message) if it cannot be parsed."""
+    name = c.get("name", "?")
+    try:
+        return Event(name, parse_hhmm(c.get("start")), parse_hhmm(c.get("end")), CLASS)
+    except ValueError as e:
+        raise ValueError(f"Class '{name}': {e}") from None
+
+def compile_meal(name, t_str):
+    """Event of a stored meal (MEAL_DURATION long)."""
+    try:
+        s = parse_hhmm(t_str)
+    except ValueError as e:
+        raise ValueError(f"Meal '{name}': {e}") from None
+    return Event(name, s, s + MEAL_DURATION, MEAL)
+
+def compile_task(t):
+    """Task of a stored task dict. Raises ValueError if its priority or duration is unusable."""
+    name = t.get("name", "?")
+    rank = PRIORITY_RANK.get(t.get("priority"))
+    duration = t.get("duration")
+    if rank is None:
+        raise ValueError(f"Task '{name}': unknown priority {t.get('priority')!r}")
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)):
+        raise ValueError(f"Task '{name}': invalid duration {duration!r}")
+    return Task(name, task_minutes(duration, t.get("unit")), rank, t.get("completed", False))
+
+def _compile_all(entries, compile_one, errors):
+    out = []
+    for entry in entries:
+        try:
+            out.append(compile_one(*entry))
+        except ValueError as e:
+            errors.append(str(e))
+    return out
+
+def compile_day(data):
+    """
+    Parse and validate a stored day once. Entries that cannot be parsed are
+    left out and described in `errors` instead of silently becoming 00:00.
+    """
+    errors = []
+    events = _compile_all(((c,) for c in data.get("classes", [])), compile_class, errors)
+    events += _compile_all(data.get("meals", {}).items(), compile_meal, errors)
+    tasks = _compile_all(((t,) for t in data.get("tasks", [])), compile_task, errors)
+
+    events.sort(key=lambda e: e.start)
+    tasks.sort(key=lambda t: t.rank)
+    return DayPlan(events, tasks, errors)
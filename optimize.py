@@ -0,0 +1,314 @@
+"""
+Optimizing task placement, for days where greedy first-fit drops tasks.
+
+place_tasks() puts tasks in priority order into the first gap that fits,
+so one long task can take the gap two shorter ones would have shared and
+whatever comes after it is dropped. optimize_plan() looks for the
+assignment of tasks to gaps that places the most High minutes, then the
+most Medium minutes, then the most Low minutes (see priority_weights), and
+keeps the greedy placement unless it finds a strictly better one: it never
+gives up High minutes for any number of lower-priority ones. Fixed events
+never move; tasks sharing a gap are laid out from its start in priority
+order.
+
+Strategies, each limited by a number of steps, so the same day is placed
+the same way whatever the number of workers; the best result wins, ties
+go to the earliest:
+
+    best-fit    by priority, longest first, each into the smallest gap it fits
+    restart-N   best-fit with the priority order perturbed by seed N
+    branch      depth-first branch and bound over task -> gap choices
+
+They run one after another here, or spread over a process pool with
+workers > 1. The time budget is one deadline for the whole search, a
+safety net the step limits keep ordinary days well inside: once it
+passes, every strategy stops with the best it has found so far (and the
+ones not started yet do not run). A day is scheduled this way when it has
+"optimize": true.
+
+    python Zenith.py optimize --date 17-10-2026 --workers 4 --budget 2
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from random import Random
+
+from model import TASK, Event, compile_day, minutes_label
+from scheduler import DAY_END, DAY_START, FreeGapIndex, _needs_linear, _place_linear
+
+BUDGET = 2.0            # seconds for the whole search (its best so far is used then)
+NODE_LIMIT = 50000      # branch-and-bound nodes
+MAX_BRANCH_TASKS = 200  # more tasks than this: the restarts alone
+RESTARTS = 6            # perturbed best-fit strategies
+ROUNDS = 100            # best-fit passes per restart strategy
+SPREAD = 1.5            # how far a restart may move a task across priorities
+
+class _Stop(Exception):
+    """Step limit or deadline reached: the strategy keeps the best it has."""
+
+# --- STRATEGIES ---
+# Every strategy gets `items` [(minutes, weight)] in plan order and the gap
+# capacities, and returns (score, gap index per item or None).
+
+def _best_fit(items, caps, order):
+    residual = list(caps)
+    assign = [None] * len(items)
+    score = 0
+    for i in order:
+        m, w = items[i]
+        g = min((g for g, r in enumerate(residual) if r >= m), key=residual.__getitem__, default=None)
+        if g is not None:
+            residual[g] -= m
+            assign[i] = g
+            score += m * w
+    return score, assign
+
+def _branch(items, caps, lower, deadline, node_limit=NODE_LIMIT):
+    """
+    Depth-first over items, heaviest per minute and longest first: each goes
+    into one of the gaps (one per distinct residual) or is skipped. A branch
+    is cut when filling what is left of the day with the remaining items,
+    fractionally, could not beat `lower` or the best found so far. Stops
+    after `node_limit` nodes or at `deadline` (time.time()), with the best
+    found by then.
+    """
+    order = sorted(range(len(items)), key=lambda i: (-items[i][1], -items[i][0], i))
+    sorted_items = [items[i] for i in order]
+    n = len(sorted_items)
+    residual = list(caps)
+    chosen = [None] * n
+    best = [lower, None]
+    nodes = [0]
+
+    def bound(k, value):
+        free, biggest = sum(residual), max(residual)
+        for m, w in sorted_items[k:]:
+            if m > biggest:
+                continue
+            if m >= free:
+                return value + free * w
+            value += m * w
+            free -= m
+        return value
+
+    def visit(k, value):
+        nodes[0] += 1
+        if nodes[0] > node_limit or (nodes[0] & 1023 == 0 and time.time() > deadline):
+            raise _Stop
+        if k == n:
+            if value > best[0]:
+                best[:] = [value, list(chosen)]
+            return
+        if bound(k, value) <= best[0]:
+            return
+        m, w = sorted_items[k]
+        # Of two identical items, the second is only placed if the first one was
+        if not (k and sorted_items[k - 1] == (m, w) and chosen[k - 1] is None):
+            tried = set()
+            for g in sorted(range(len(residual)), key=residual.__getitem__):
+                r = residual[g]
+                if r < m or r in tried:
+                    continue
+                tried.add(r)
+                residual[g] -= m
+                chosen[k] = g
+                visit(k + 1, value + m * w)
+                residual[g] += m
+                chosen[k] = None
+        visit(k + 1, value)
+
+    if caps and time.time() <= deadline:
+        try:
+            visit(0, 0)
+        except _Stop:
+            pass    # the best found within the limits
+    if best[1] is None:
+        return -1, None
+    assign = [None] * n
+    for k, g in enumerate(best[1]):
+        assign[order[k]] = g
+    return best[0], assign
+
+def _restarts(items, caps, seed, deadline, rounds=ROUNDS):
+    rng = Random(seed)
+    ranks = {w: r for r, w in enumerate(sorted({w for _, w in items}, reverse=True))}
+    best = (-1, None)
+    for n in range(rounds):
+        if n % 16 == 0 and time.time() > deadline:
+            break
+        keys = [ranks[w] + rng.random() * SPREAD for m, w in items]
+        result = _best_fit(items, caps, sorted(range(len(items)), key=keys.__getitem__))
+        if result[0] > best[0]:
+            best = result
+    return best
+
+def run_strategy(job):
+    """
+    (score, assignment) of one strategy, the best it found by `deadline`
+    (time.time(), shared by every job of a search). Top-level so pool
+    workers can run it.
+    """
+    name, items, caps, lower, deadline = job
+    if name == "best-fit":
+        return _best_fit(items, caps, sorted(range(len(items)), key=lambda i: (-items[i][1], -items[i][0])))
+    if name == "branch":
+        return _branch(items, caps, lower, deadline)
+    return _restarts(items, caps, int(name.split("-")[1]), deadline)
+
+def strategies(n_tasks):
+    names = ["best-fit"] + [f"restart-{i}" for i in range(RESTARTS)]
+    if n_tasks <= MAX_BRANCH_TASKS:
+        names.append("branch")
+    return names
+
+# --- RESULT ---
+class Placement:
+    """
+    A day's timeline plus what it places (score, see priority_weights) and
+    which tasks it leaves out.
+    """
+    __slots__ = ("timeline", "unplaced", "score", "greedy_score", "strategy")
+
+    def __init__(self, timeline, unplaced, score, greedy_score, strategy):
+        self.timeline = timeline
+        self.unplaced = unplaced
+        self.score = score
+        self.greedy_score = greedy_score
+        self.strategy = strategy
+
+    def schedule(self):
+        return [e.as_dict() for e in self.timeline]
+
+def priority_weights(tasks):
+    """
+    Weight per placed minute by rank (High, Medium, Low). Each is more than
+    all minutes of the lower ranks together can add up to, so scores compare
+    High minutes first, then Medium, then Low.
+    """
+    m = sum(t.minutes for t in tasks if t.minutes > 0) + 1
+    return (m * m, m, 1)
+
+def placed_minutes(tasks, unplaced):
+    """Minutes placed per rank (High, Medium, Low)."""
+    minutes = [0, 0, 0]
+    for t in tasks:
+        minutes[t.rank] += t.minutes
+    for t in unplaced:
+        minutes[t.rank] -= t.minutes
+    return minutes
+
+def _score(tasks, weights):
+    return sum(t.minutes * weights[t.rank] for t in tasks)
+
+def _greedy(plan, day_start, day_end, weights):
+    """place_tasks(), keeping track of which tasks did not fit."""
+    if _needs_linear(plan.events, plan.tasks):
+        starts = []
+        timeline = _place_linear(list(plan.events), plan.tasks, day_start, day_end, starts)
+    else:
+        gaps = FreeGapIndex(plan.events, day_start, day_end)
+        starts = [gaps.take(t.minutes) for t in plan.tasks]
+        timeline = list(plan.events) + [Event(t.name, s, s + t.minutes, TASK, t.completed)
+                                        for t, s in zip(plan.tasks, starts) if s is not None]
+        timeline.sort(key=lambda e: e.start)
+    unplaced = [t for t, s in zip(plan.tasks, starts) if s is None]
+    score = _score(plan.tasks, weights) - _score(unplaced, weights)
+    return Placement(timeline, unplaced, score, score, "greedy")
+
+def optimize_plan(plan, day_start=DAY_START, day_end=DAY_END, budget=BUDGET, workers=1, pool=None):
+    """
+    Placement of a compiled day that places the most minutes by priority the
+    strategies find within `budget` seconds in all, or the greedy one if
+    nothing beats it. With `workers` > 1 the strategies run in a process
+    pool (`pool`, if given, is used instead of starting one).
+    """
+    weights = priority_weights(plan.tasks)
+    greedy = _greedy(plan, day_start, day_end, weights)
+    if not greedy.unplaced or _needs_linear(plan.events, plan.tasks):
+        return greedy   # nothing to gain, or a malformed day the gap model does not cover
+
+    gaps = FreeGapIndex(plan.events, day_start, day_end)
+    slots = [(s, e - s) for s, e in zip(gaps.starts, gaps.ends) if e > s]
+    caps = [c for _, c in slots]
+    items = [(t.minutes, weights[t.rank]) for t in plan.tasks]
+    deadline = time.time() + budget
+    jobs = [(name, items, caps, greedy.score, deadline) for name in strategies(len(items))]
+    if pool is not None:
+        results = list(pool.map(run_strategy, jobs))
+    elif workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as p:
+            results = list(p.map(run_strategy, jobs))
+    else:
+        results = [run_strategy(job) for job in jobs]
+
+    best = max(range(len(jobs)), key=lambda i: (results[i][0], -i))
+    score, assign = results[best]
+    if assign is None or score <= greedy.score:
+        return greedy
+
+    timeline = list(plan.events)
+    pointer = [s for s, _ in slots]
+    unplaced = []
+    for t, g in zip(plan.tasks, assign):     # priority order within each gap
+        if g is None:
+            unplaced.append(t)
+            continue
+        timeline.append(Event(t.name, pointer[g], pointer[g] + t.minutes, TASK, t.completed))
+        pointer[g] += t.minutes
+    timeline.sort(key=lambda e: e.start)
+    return Placement(timeline, unplaced, score, greedy.score, jobs[best][0])
+
+def optimize_schedule(data, budget=BUDGET, workers=1):
+    """(schedule, unplaced tasks) of a day dict, like IncrementalScheduler.preview() gives."""
+    result = optimize_plan(compile_day(data), budget=budget, workers=workers)
+    return result.schedule(), result.unplaced
+
+# --- CLI ---
+def main(argv=None):
+    from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+    from storage import DATA_DIR, DayStore, key_for_date
+
+    parser = argparse.ArgumentParser(prog="Zenith.py optimize",
+                                     description="Place a day's tasks to fit as many minutes as possible, High priority first.")
+    parser.add_argument("--data", default=DATA_DIR, help="zenith_data directory")
+    parser.add_argument("--date", default=datetime.now().strftime("%d-%m-%Y"), help="day to optimize (DD-MM-YYYY, default today)")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="seconds before giving up on optimizing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (1 = no pool)")
+    parser.add_argument("--save", action="store_true", help="keep scheduling this day with the optimizer")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.data):
+        parser.error(f"no zenith_data directory at {args.data}")
+    try:
+        key = key_for_date(datetime.strptime(args.date, "%d-%m-%Y").date())
+    except ValueError:
+        parser.error(f"not a DD-MM-YYYY date: {args.date!r}")
+
+    days = LayeredDays(DayStore(args.data, legacy_file=None), Calendar(os.path.join(args.data, RECURRENCE_FILE)))
+    try:
+        data = days.get(key)
+        if data is None:
+            print(f"nothing stored for {key}", file=sys.stderr)
+            return 1
+        plan = compile_day(data)
+        t0 = time.perf_counter()
+        result = optimize_plan(plan, budget=args.budget, workers=args.workers)
+        elapsed = time.perf_counter() - t0
+        for e in result.timeline:
+            print(f"{minutes_label(e.start)}-{minutes_label(e.end)}  {e.name}")
+        for t in result.unplaced:
+            print(f"not placed: {t.name} ({t.minutes}m)")
+        high, medium, low = placed_minutes(plan.tasks, result.unplaced)
+        gain = "better than" if result.score > result.greedy_score else "same as"
+        print(f"{result.strategy}: {high}/{medium}/{low} High/Medium/Low minutes placed, {gain} first-fit, "
+              f"in {elapsed:.2f}s", file=sys.stderr)
+        if args.save and not data.get("optimize"):
+            days[key] = dict(data, optimize=True)
+    finally:
+        days.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Latency profiling for Zenith's hot paths.
+
+Functions are wrapped with @profiled("name") and code blocks with
+`with span("name"):`. While profiling is off, that costs one attribute
+check per call. While it is on, every call is added to a per-name latency
+histogram (p50/p99 in the app's overlay, F12) and to a ring buffer of
+trace events that export_chrome() writes as Chrome trace-event JSON (open
+it in chrome://tracing or ui.perfetto.dev).
+
+    ZENITH_PROFILE=1 python Zenith.py              # profile from the start
+    ZENITH_PROFILE=trace.json python Zenith.py     # ... and write the trace on exit
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+PROFILE_ENV = "ZENITH_PROFILE"
+TRACE_EVENTS = 100000   # most recent calls kept for the trace
+SUB_BUCKETS = 4         # histogram buckets per power of two (each about 19% wide)
+
+def _bucket(ns):
+    e = max(ns, 1).bit_length() - 1
+    return e * SUB_BUCKETS + ((ns >> e - 2) & 3 if e >= 2 else ns & 3)
+
+def _bucket_bounds(i):
+    """[low, high) nanoseconds of histogram bucket i."""
+    e, sub = divmod(i, SUB_BUCKETS)
+    if e < 2:
+        return sub, sub + 1
+    return (SUB_BUCKETS + sub) << e - 2, (SUB_BUCKETS + sub + 1) << e - 2
+
+class Histogram:
+    """Log-scale latency histogram: fixed memory, percentiles to within a bucket."""
+
+    def __init__(self):
+        self.counts = {}        # bucket -> calls
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        b = _bucket(ns)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q):
+        """Latency in ns below which a fraction `q` of the calls fall (bucket midpoint, at most max)."""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                low, high = _bucket_bounds(b)
+                return min((low + high) // 2, self.max_ns)
+        return self.max_ns
+
+class _Span:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.t0, time.perf_counter_ns())
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Profiler:
+    """Per-name histograms plus a trace of the latest calls. Safe to record from any thread."""
+
+    def __init__(self, enabled=False, trace_events=TRACE_EVENTS):
+        self.enabled = enabled
+        self.histograms = {}    # name -> Histogram
+        self.trace = deque(maxlen=trace_events)     # (name, start ns, duration ns, thread id)
+        self._threads = {}      # thread id -> thread name
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter_ns()
+
+    def record(self, name, start_ns, end_ns):
+        tid = threading.get_ident()
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = Histogram()
+            h.add(end_ns - start_ns)
+            self.trace.append((name, start_ns, end_ns - start_ns, tid))
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+
+    def span(self, name):
+        """Context manager timing its block under `name` (a shared no-op while disabled)."""
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def timed(self, name=None):
+        """Decorator timing every call of a function under `name` (default: its qualified name)."""
+        def wrap(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def timed_fn(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                t0 = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(label, t0, time.perf_counter_ns())
+            return timed_fn
+        return wrap
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.trace.clear()
+
+    # --- Reports ---
+    def stats(self):
+        """(name, calls, p50 ms, p99 ms, max ms), the names taking the most total time first."""
+        with self._lock:
+            rows = [(name, h.count, h.percentile(0.5) / 1e6, h.percentile(0.99) / 1e6, h.max_ns / 1e6, h.total_ns)
+                    for name, h in self.histograms.items()]
+        rows.sort(key=lambda r: -r[5])
+        return [r[:5] for r in rows]
+
+    def report(self, limit=None):
+        lines = [f"{'':<20} {'calls':>6} {'p50':>8} {'p99':>8}"]
+        for name, calls, p50, p99, _ in self.stats()[:limit]:
+            lines.append(f"{name[:20]:<20} {calls:>6} {p50:>6.2f}ms {p99:>6.2f}ms")
+        return "\n".join(lines)
+
+    def export_chrome(self, path):
+        """Write the traced calls as Chrome trace-event JSON ("X" events, microseconds)."""
+        with self._lock:
+            trace, threads = list(self.trace), dict(self._threads)
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in threads.items()]
+        events += [{"name": name, "cat": "zenith", "ph": "X", "pid": pid, "tid": tid,
+                    "ts": (start - self._epoch) / 1000, "dur": dur / 1000}
+                   for name, start, dur, tid in trace]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, path)
+        return len(trace)
+
+def trace_path():
+    """Where the trace goes on exit: the value of ZENITH_PROFILE if it names a .json file."""
+    value = os.environ.get(PROFILE_ENV, "")
+    return value if value.endswith(".json") else None
+
+PROFILER = Profiler(enabled=bool(os.environ.get(PROFILE_ENV)))
+profiled = PROFILER.timed
+span = PROFILER.span
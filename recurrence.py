@@ -0,0 +1,316 @@
+"""
+Recurring classes and day templates for Zenith.
+
+A weekly class is stored once, as a rule (weekdays, optional first/last
+date, exception dates), and meal defaults once, as templates. A date's
+base day is expanded from them on demand and cached. A stored day only
+keeps what differs from its base (see make_delta):
+
+    {"delta": 1, "tasks": [...], "classes": [extra classes],
+     "skip": [rule ids not held that day], "meals": {name: time, or None to drop},
+     "optimize": true (only if the day is placed by the optimizer)}
+
+Days saved before rules existed are complete copies; rules do not apply
+to them. `python Zenith.py compact` turns such copies into rules + deltas.
+"""
+import argparse
+import os
+import sys
+from collections import OrderedDict
+from datetime import timedelta
+
+from storage import DATA_DIR, DayStore, atomic_write_json, date_of_key, read_json
+
+RECURRENCE_FILE = "recurrence.json"
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+DEFAULT_TEMPLATE = {"meals": {"Breakfast": "09:00", "Lunch": "13:00", "Dinner": "20:00"}}
+CACHE_DATES = 366       # expanded base days kept in memory
+MIN_WEEKS = 3           # occurrences before `compact` turns a repeated class into a rule
+
+def is_delta(data):
+    return bool(data.get("delta"))
+
+# --- RULES & TEMPLATES ---
+class Calendar:
+    """
+    Rules and templates, saved together in one JSON file:
+
+        {"rules": [{"id": "r1", "name": "Math", "start": "10:00", "end": "11:00",
+                    "weekdays": [0, 2], "first": "2026-09-01", "last": "2026-12-18",
+                    "except": ["2026-10-12"]}],
+         "templates": {"default": {"meals": {...}}, "Saturday": {"meals": {...}}}}
+
+    Dates are ISO strings, weekdays 0 = Monday. A weekday template is laid
+    over the default one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        saved = read_json(path, {})
+        self.rules = saved.get("rules", [])
+        self.templates = saved.get("templates", {})
+        self._base = OrderedDict()      # ordinal -> base day (LRU)
+        self._by_weekday = None         # weekday -> rules, built on demand
+
+    def save(self):
+        atomic_write_json(self.path, {"rules": self.rules, "templates": self.templates}, fsync=True, indent=2)
+
+    def stamp(self):
+        """Size and mtime of the file (None if there is none yet)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def _changed(self, save=True):
+        self._base.clear()
+        self._by_weekday = None
+        if save:
+            self.save()
+
+    # --- Editing ---
+    def add_rule(self, name, start, end, weekdays, first=None, last=None, exceptions=(), save=True):
+        """New weekly rule; returns it. `first`/`last`/`exceptions` are dates."""
+        n = max((int(r["id"][1:]) for r in self.rules), default=0) + 1
+        rule = {"id": f"r{n}", "name": name, "start": start, "end": end, "weekdays": sorted(set(weekdays)),
+                "first": first.isoformat() if first else None, "last": last.isoformat() if last else None,
+                "except": sorted(d.isoformat() for d in exceptions)}
+        self.rules.append(rule)
+        self._changed(save)
+        return rule
+
+    def remove_rule(self, rule_id):
+        self.rules = [r for r in self.rules if r["id"] != rule_id]
+        self._changed()
+
+    def add_exception(self, rule_id, date):
+        """Skip one occurrence of a rule on every day (e.g. a holiday)."""
+        for r in self.rules:
+            if r["id"] == rule_id and date.isoformat() not in r["except"]:
+                r["except"] = sorted(r["except"] + [date.isoformat()])
+        self._changed()
+
+    def set_template(self, name, template):
+        """`name` is "default" or a weekday name."""
+        self.templates[name] = template
+        self._changed()
+
+    # --- Expansion ---
+    def template_for(self, date):
+        meals = dict(self.templates.get("default", DEFAULT_TEMPLATE).get("meals", {}))
+        meals.update(self.templates.get(WEEKDAYS[date.weekday()], {}).get("meals", {}))
+        return {"meals": meals}
+
+    def rules_on(self, date):
+        if self._by_weekday is None:
+            self._by_weekday = [[] for _ in range(7)]
+            for r in self.rules:
+                for wd in r["weekdays"]:
+                    self._by_weekday[wd].append(r)
+        iso = date.isoformat()
+        return [r for r in self._by_weekday[date.weekday()]
+                if (r["first"] is None or r["first"] <= iso) and (r["last"] is None or iso <= r["last"])
+                and iso not in r["except"]]
+
+    def base(self, date):
+        """
+        What `date` holds before any per-day edit: its rule classes (tagged
+        with their rule id) and its template meals. Shared: do not mutate.
+        """
+        o = date.toordinal()
+        base = self._base.get(o)
+        if base is not None:
+            self._base.move_to_end(o)
+            return base
+        base = {"classes": [{"name": r["name"], "start": r["start"], "end": r["end"], "rule": r["id"]}
+                            for r in self.rules_on(date)],
+                "meals": self.template_for(date)["meals"]}
+        self._base[o] = base
+        while len(self._base) > CACHE_DATES:
+            self._base.popitem(last=False)
+        return base
+
+# --- DELTAS ---
+def make_delta(base, data):
+    """The stored form of a full day `data` whose base day is `base`."""
+    base_ids = {c["rule"] for c in base["classes"]}
+    held = {c.get("rule") for c in data.get("classes", [])}
+    extras = []
+    for c in data.get("classes", []):
+        if c.get("rule") not in base_ids:
+            # Rule classes whose rule is gone are kept as ordinary classes
+            extras.append({k: v for k, v in c.items() if k != "rule"})
+    delta = {"delta": 1, "tasks": data.get("tasks", []), "classes": extras}
+
+    skip = [rid for rid in sorted(base_ids) if rid not in held]
+    if skip:
+        delta["skip"] = skip
+    meals = data.get("meals", {})
+    changed = {m: t for m, t in meals.items() if base["meals"].get(m) != t}
+    changed.update({m: None for m in base["meals"] if m not in meals})
+    if changed:
+        delta["meals"] = changed
+    if data.get("optimize"):
+        delta["optimize"] = True
+    return delta
+
+def resolve(base, delta):
+    """The full day of a stored delta. Its task list is the delta's own (toggles edit it in place)."""
+    skip = set(delta.get("skip", ()))
+    meals = dict(base["meals"])
+    for m, t in delta.get("meals", {}).items():
+        if t is None:
+            meals.pop(m, None)
+        else:
+            meals[m] = t
+    day = {"tasks": delta.setdefault("tasks", []),
+           "classes": [dict(c) for c in base["classes"] if c["rule"] not in skip] + list(delta.get("classes", [])),
+           "meals": meals}
+    if delta.get("optimize"):
+        day["optimize"] = True
+    return day
+
+class LayeredDays:
+    """
+    Day key -> full day data, as the UI sees it: stored days resolved
+    against the calendar. Days written here are stored as deltas. A date
+    that only has rule classes exists too, but is not listed by keys().
+    """
+
+    def __init__(self, store, calendar):
+        self.store = store
+        self.calendar = calendar
+
+    def __contains__(self, day_key):
+        if day_key in self.store:
+            return True
+        date = date_of_key(day_key)
+        return date is not None and bool(self.calendar.rules_on(date))
+
+    def __getitem__(self, day_key):
+        data = self.get(day_key)
+        if data is None:
+            raise KeyError(day_key)
+        return data
+
+    def get(self, day_key, default=None):
+        rec = self.store.get(day_key)
+        date = date_of_key(day_key)
+        if rec is not None and not is_delta(rec):
+            return rec
+        if date is None:
+            return default
+        if rec is None:
+            if not self.calendar.rules_on(date):
+                return default
+            rec = {"delta": 1, "tasks": []}
+        return resolve(self.calendar.base(date), rec)
+
+    def __setitem__(self, day_key, data):
+        date = date_of_key(day_key)
+        if date is None:
+            self.store[day_key] = data
+        else:
+            self.store[day_key] = make_delta(self.calendar.base(date), data)
+
+    def delete_day(self, day_key):
+        self.store.delete_day(day_key)
+
+    def flush(self, timeout=None):
+        return self.store.flush(timeout)
+
+    def keys(self):
+        """Stored day keys."""
+        return self.store.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        for day_key in self.keys():
+            yield day_key, self[day_key]
+
+    def close(self):
+        self.store.close()
+
+# --- COMPACTION ---
+def extract_rules(store, calendar, min_weeks=MIN_WEEKS, check=None):
+    """
+    Turn full day copies into rules + deltas. A class held at the same
+    time on the same weekday in at least `min_weeks` stored days becomes
+    a weekly rule (the weeks in between without it become exceptions),
+    and each such day is rewritten as a delta. `check(full, resolved)`
+    may veto a rewrite; the day then stays a full copy.
+    Returns (rules added, days rewritten).
+    """
+    full = {}
+    for day_key in store.keys():
+        data = store.get(day_key)
+        date = date_of_key(day_key)
+        if data is not None and date is not None and not is_delta(data):
+            full[day_key] = (date, data)
+
+    seen = {}   # (weekday, name, start, end) -> dates it is held on
+    for date, data in full.values():
+        for c in data.get("classes", []):
+            seen.setdefault((date.weekday(), c.get("name"), c.get("start"), c.get("end")), set()).add(date)
+
+    rules = []
+    for (wd, name, start, end), dates in sorted(seen.items(), key=lambda kv: min(kv[1])):
+        if len(dates) < min_weeks:
+            continue
+        first, last = min(dates), max(dates)
+        missing = [first + timedelta(days=7 * i) for i in range((last - first).days // 7 + 1)]
+        missing = [d for d in missing if d not in dates]
+        rules.append(calendar.add_rule(name, start, end, [wd], first, last, missing, save=False))
+    if not rules:
+        return [], 0
+    calendar.save()
+
+    rewritten = 0
+    for day_key, (date, data) in full.items():
+        base = calendar.base(date)
+        # Match each rule class to one identical stored class
+        tagged, free = [], {c["rule"]: (c["name"], c["start"], c["end"]) for c in base["classes"]}
+        for c in data.get("classes", []):
+            sig = (c.get("name"), c.get("start"), c.get("end"))
+            rid = next((r for r, s in free.items() if s == sig), None)
+            if rid is not None:
+                del free[rid]
+                c = dict(c, rule=rid)
+            tagged.append(c)
+        delta = make_delta(base, dict(data, classes=tagged))
+        if check is not None and not check(data, resolve(base, dict(delta))):
+            continue
+        store.put_day(day_key, delta)
+        rewritten += 1
+    return rules, rewritten
+
+def main(argv=None):
+    from scheduler import build_schedule
+
+    parser = argparse.ArgumentParser(prog="Zenith.py compact",
+                                     description="Store weekly repeated classes once, as rules, and days as deltas.")
+    parser.add_argument("--data", default=DATA_DIR, help="zenith_data directory")
+    parser.add_argument("--min-weeks", type=int, default=MIN_WEEKS, help="occurrences before a class becomes a rule")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.data):
+        parser.error(f"no zenith_data directory at {args.data}")
+
+    store = DayStore(args.data, legacy_file=None)
+    calendar = Calendar(os.path.join(args.data, RECURRENCE_FILE))
+    # Only rewrite a day if it still schedules exactly the same
+    same = lambda full, resolved: build_schedule(full) == build_schedule(resolved)
+    try:
+        rules, rewritten = extract_rules(store, calendar, args.min_weeks, check=same)
+    finally:
+        store.close()
+    print(f"{len(rules)} rule(s) added, {rewritten} day(s) stored as deltas", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
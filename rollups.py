@@ -0,0 +1,225 @@
+"""
+Per-day rollups for Zenith's range analytics.
+
+Each stored day is summarized once, when it is saved: minutes covered by
+each type, free minutes, task counts and the mood score. Days are laid out
+by date in dense arrays of running totals, so the totals of any date range
+are one subtraction per field instead of scheduling every day again.
+"""
+from itertools import accumulate
+
+from analytics import OccupancyMatrix, date_range
+from scheduler import DAY_END, DAY_START, compute_entry
+from storage import atomic_write_json, date_of_key, key_for_date, read_json
+
+ROLLUP_FILE = "rollups.json"
+VERSION = 1
+CATEGORIES = ("Class", "Task", "Meal", "Free", "Overlap")
+TOTALS = CATEGORIES + ("tasks_total", "tasks_done", "mood")
+MOOD_WEIGHTS = {"High": 3, "Medium": 2, "Low": 1}
+
+def mood_score(tasks):
+    """Priority-weighted task count the Dashboard's "Day Status" is based on."""
+    return sum(MOOD_WEIGHTS.get(t.get("priority"), 1) for t in tasks)
+
+def day_rollup(schedule, data):
+    """Rollup row of one day from its schedule and stored data."""
+    occ = OccupancyMatrix([schedule])
+    row = occ.summary()
+    tasks = [x for x in schedule if x["type"] == "Task"]
+    row["tasks_total"] = len(tasks)
+    row["tasks_done"] = len([x for x in tasks if x.get("completed")])
+    row["mood"] = mood_score(data.get("tasks", []))
+    row["hours"] = occ.busy_by_hour()
+    return row
+
+def compute_rollups(jobs):
+    """
+    Rows for (day_key, generation, cached schedule or None, day snapshot)
+    jobs, as (day_key, generation, new cache entry or None, row). Touches no
+    shared state, so it can run on a worker thread.
+    """
+    results = []
+    for k, gen, schedule, data in jobs:
+        entry = None
+        if schedule is None:
+            entry = compute_entry(data)
+            schedule = entry[2]
+        results.append((k, gen, entry, day_rollup(schedule, data)))
+    return results
+
+class RollupStore:
+    """
+    Rollup rows by day key, saved in one JSON file next to the day files.
+
+    A day whose row is missing or out of date is `dirty` until a new row is
+    put in. The file records the store's stamp() when it was saved; if the
+    store changed without it (another process, a crash) every day is
+    marked dirty and rebuilt.
+
+    The file can be read on a worker (read) and taken in later (adopt):
+    changes made in between are kept over what the file says.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = {}          # day_key -> row
+        self.dirty = set()      # day keys whose row must be recomputed
+        self._gen = {}          # day_key -> bumped on every invalidate, to spot outdated results
+        self._prefix = None     # (first ordinal, {field: running totals}), built on demand
+        self.loaded = False
+        self._touched = set()   # days changed before the file was adopted
+        self._all_stale = False     # invalidate_all() before the file was adopted
+
+    # --- Persistence ---
+    def load(self, stamp, keys):
+        """read() and adopt() in one go. False if the file was missing or stale."""
+        return self.adopt(self.read(stamp, keys))
+
+    def read(self, stamp, keys):
+        """
+        (rows, dirty, fresh) from the saved rollups; touches nothing, so it
+        can run on a worker. `keys` is called for the full list of stored
+        days only when the file is missing or stale (fresh is False then).
+        """
+        try:
+            saved = read_json(self.path)
+        except ValueError:
+            saved = None
+        fresh = (saved is not None and saved.get("version") == VERSION
+                 and saved.get("window") == [DAY_START, DAY_END] and saved.get("stamp") == stamp)
+        if fresh:
+            return saved["days"], set(saved.get("dirty", [])), True
+        return {}, set(keys()), False
+
+    def adopt(self, saved):
+        """Take in what read() returned. Returns its `fresh`."""
+        rows, dirty, fresh = saved
+        if self._all_stale:
+            dirty |= set(rows)
+            rows = {}
+        for k in self._touched:
+            if k in self.rows:
+                rows[k] = self.rows[k]
+                dirty.discard(k)
+            else:
+                rows.pop(k, None)   # changed, dropped or patched without a row: recompute
+                dirty.add(k)
+        self.rows, self.dirty = rows, dirty
+        self.loaded = True
+        self._touched = set()
+        self._all_stale = False
+        self._prefix = None
+        return fresh
+
+    def save(self, stamp):
+        atomic_write_json(self.path, {"version": VERSION, "window": [DAY_START, DAY_END], "stamp": stamp,
+                                      "days": self.rows, "dirty": sorted(self.dirty)}, fsync=False)
+
+    # --- Changes ---
+    def generation(self, day_key):
+        return self._gen.get(day_key, 0)
+
+    def invalidate(self, day_key):
+        """The day changed: its row is recomputed before it is used again."""
+        self.rows.pop(day_key, None)
+        self.dirty.add(day_key)
+        self._gen[day_key] = self.generation(day_key) + 1
+        self._prefix = None
+        self._touch(day_key)
+
+    def invalidate_all(self):
+        """Every day may have changed (e.g. a weekly rule was added)."""
+        for day_key in list(self.rows):
+            self.invalidate(day_key)
+        if not self.loaded:
+            self._all_stale = True
+
+    def _touch(self, day_key):
+        if not self.loaded:
+            self._touched.add(day_key)
+
+    def update(self, day_key, row, generation=None):
+        """Put a freshly computed row in, unless the day changed since `generation` was read."""
+        if generation is not None and generation != self.generation(day_key):
+            return False
+        self.rows[day_key] = row
+        self.dirty.discard(day_key)
+        self._prefix = None
+        self._touch(day_key)
+        return True
+
+    def drop(self, day_key):
+        """The day is not stored (any more)."""
+        self.rows.pop(day_key, None)
+        self.dirty.discard(day_key)
+        self._prefix = None
+        self._touch(day_key)
+
+    def patch(self, day_key, **fields):
+        """
+        Change some fields of a clean row in place (e.g. tasks_done after a
+        toggle). Bumps the generation: rows computed before it are outdated.
+        """
+        self._gen[day_key] = self.generation(day_key) + 1
+        self._touch(day_key)
+        row = self.rows.get(day_key)
+        if row is not None:
+            row.update(fields)
+            self._prefix = None
+
+    # --- Queries ---
+    def dirty_in(self, first, last):
+        """Dirty day keys dated first..last."""
+        keys = []
+        for k in self.dirty:
+            d = date_of_key(k)
+            if d is not None and first <= d <= last:
+                keys.append(k)
+        return keys
+
+    def _build_prefix(self):
+        dated = [(date_of_key(k), row) for k, row in self.rows.items()]
+        dated = [(d.toordinal(), row) for d, row in dated if d is not None]
+        if not dated:
+            return 0, {f: [0] for f in TOTALS + ("days",)}
+        base = min(o for o, _ in dated)
+        span = max(o for o, _ in dated) - base + 1
+        per_day = {f: [0] * span for f in TOTALS + ("days",)}
+        for o, row in dated:
+            for f in TOTALS:
+                per_day[f][o - base] += row[f]
+            per_day["days"][o - base] += 1
+        return base, {f: [0] + list(accumulate(v)) for f, v in per_day.items()}
+
+    def totals(self, first, last):
+        """Sum of every TOTALS field (plus "days", the number of rows) over first..last."""
+        if self._prefix is None:
+            self._prefix = self._build_prefix()
+        base, prefix = self._prefix
+        n = len(prefix["days"]) - 1
+        lo = min(max(first.toordinal() - base, 0), n)
+        hi = min(max(last.toordinal() - base + 1, lo), n)
+        return {f: p[hi] - p[lo] for f, p in prefix.items()}
+
+    def heatmap(self, first, last):
+        """7 x 24 occupied minutes (weekday rows, hour columns) over first..last."""
+        heat = [[0] * 24 for _ in range(7)]
+        for d in date_range(first, last):
+            row = self.rows.get(key_for_date(d))
+            if row is not None:
+                heat[d.weekday()] = [a + b for a, b in zip(heat[d.weekday()], row["hours"])]
+        return heat
+
+    def stats(self, first, last):
+        """The Analytics page's data for a date range (same shape as analytics.summarize)."""
+        totals = self.totals(first, last)
+        return {"days": totals["days"], "summary": {c: totals[c] for c in CATEGORIES},
+                "heatmap": self.heatmap(first, last)}
+
+    def day_stats(self, day_key):
+        """The Analytics page's data for one day, or None if its row is missing or dirty."""
+        row = self.rows.get(day_key)
+        if row is None or day_key in self.dirty:
+            return None
+        return {"days": 1, "summary": {c: row[c] for c in CATEGORIES}, "heatmap": None}
@@ -0,0 +1,377 @@
+"""Headless scheduling engine for Zenith (usable without tkinter)."""
+from bisect import bisect_right
+from collections import OrderedDict
+
+from model import (MEAL_DURATION, PRIORITY_RANK, TASK, DayPlan, Event, compile_class, compile_day,
+                   compile_meal, compile_task, minutes_label, parse_hhmm, task_minutes)
+from profiling import profiled
+
+# --- CONFIGURATION ---
+DAY_START = 8 * 60      # Active day starts at 08:00
+DAY_END = 23 * 60       # ... and ends at 23:00
+
+# --- HELPER FUNCTIONS ---
+def time_to_min(t_str):
+    """Convert HH:MM string to minutes from midnight (0 if it is not a valid time)."""
+    try:
+        return parse_hhmm(t_str)
+    except ValueError:
+        return 0
+
+def min_to_time(mins):
+    """Convert minutes from midnight to HH:MM."""
+    return minutes_label(mins)
+
+# --- FREE GAP INDEX ---
+class FreeGapIndex:
+    """
+    The gaps left between fixed events, in timeline order.
+
+    Tasks always go at the *start* of the first gap long enough for them,
+    so placing one only shrinks that gap. A max-tree over the gap lengths
+    finds the leftmost gap that fits and updates it in O(log n).
+    """
+
+    def __init__(self, events, day_start=DAY_START, day_end=DAY_END):
+        # Same walk the timeline scan does: the gap before each event runs
+        # from the furthest end seen so far up to that event's start.
+        self.starts, self.ends = [], []
+        pointer = day_start
+        for ev in events:
+            self.starts.append(pointer)
+            self.ends.append(ev.start)
+            pointer = max(pointer, ev.end)
+        self.starts.append(pointer)
+        self.ends.append(day_end)
+
+        size = 1
+        while size < len(self.starts):
+            size *= 2
+        self._size = size
+        self._tree = [float("-inf")] * (2 * size)
+        for i, (s, e) in enumerate(zip(self.starts, self.ends)):
+            self._tree[size + i] = e - s
+        for i in range(size - 1, 0, -1):
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def longest(self):
+        """Length of the largest gap left."""
+        return self._tree[1]
+
+    def take(self, length):
+        """Reserve `length` minutes in the first gap that fits. Returns its start, or None."""
+        tree = self._tree
+        if tree[1] < length:
+            return None
+
+        i = 1
+        while i < self._size:
+            i *= 2
+            if tree[i] < length:
+                i += 1
+
+        gap = i - self._size
+        start = self.starts[gap]
+        self.starts[gap] = start + length
+        tree[i] = self.ends[gap] - self.starts[gap]
+        i //= 2
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+        return start
+
+# --- SCHEDULER ---
+def _place_linear(timeline, tasks, day_start, day_end, placed=None):
+    """
+    Original placement: rescan the timeline from day_start for every task.
+    `placed`, if given, collects each task's start (None when it did not fit).
+    """
+    for task in tasks:
+        if placed is not None:
+            placed.append(None)
+        t_dur = task.minutes
+        current_pointer = day_start
+
+        for i in range(len(timeline) + 1):
+            gap_start = current_pointer
+            if i < len(timeline):
+                gap_end = timeline[i].start
+                next_event_end = timeline[i].end
+            else:
+                gap_end = day_end
+                next_event_end = day_end
+
+            if gap_end - gap_start >= t_dur:
+                if placed is not None:
+                    placed[-1] = gap_start
+                timeline.append(Event(task.name, gap_start, gap_start + t_dur, TASK, task.completed))
+                timeline.sort(key=lambda e: e.start)
+                break
+
+            current_pointer = max(current_pointer, next_event_end)
+    return timeline
+
+def _needs_linear(events, tasks):
+    return any(t.minutes <= 0 for t in tasks) or any(e.end < e.start for e in events)
+
+def place_tasks(plan, day_start=DAY_START, day_end=DAY_END):
+    """Timeline (list of Event, sorted by start) of a compiled day."""
+    timeline = list(plan.events)
+
+    if _needs_linear(timeline, plan.tasks):
+        # Empty tasks and events that end before they start leave gaps the
+        # index does not model; keep these (malformed) days on the original scan.
+        return _place_linear(timeline, plan.tasks, day_start, day_end)
+
+    gaps = FreeGapIndex(timeline, day_start, day_end)
+    for task in plan.tasks:
+        start = gaps.take(task.minutes)
+        if start is not None:
+            timeline.append(Event(task.name, start, start + task.minutes, TASK, task.completed))
+    # Stable sort of the insertion order == re-sorting after every placement
+    timeline.sort(key=lambda e: e.start)
+    return timeline
+
+def schedule_plan(plan, day_start=DAY_START, day_end=DAY_END):
+    """Schedule items (dicts with start/end labels) of a compiled day."""
+    return [e.as_dict() for e in place_tasks(plan, day_start, day_end)]
+
+def build_schedule(data, day_start=DAY_START, day_end=DAY_END):
+    """
+    Smart Algorithm:
+    1. Place fixed events (Classes, Meals).
+    2. Identify gaps.
+    3. Fit tasks into the first gap that fits, in priority order.
+    Entries that fail to parse are left out (see model.compile_day).
+    Days marked "optimize" are placed by optimize.optimize_plan instead.
+    """
+    plan = compile_day(data)
+    if data.get("optimize"):
+        return optimized_schedule(plan, day_start, day_end)
+    return schedule_plan(plan, day_start, day_end)
+
+def optimized_schedule(plan, day_start=DAY_START, day_end=DAY_END):
+    from optimize import optimize_plan     # it builds on this module
+    return optimize_plan(plan, day_start, day_end).schedule()
+
+# --- INCREMENTAL SCHEDULER ---
+class IncrementalScheduler:
+    """
+    A day being edited, re-placed one edit at a time.
+
+    Tasks are placed in priority order and each one only sees the gaps the
+    tasks before it left, so an edit never moves the tasks placed before the
+    first one it can affect. Those keep their slots; the gap index is rebuilt
+    around them and only the rest are placed again. `schedule()` is always
+    the same as build_schedule() of the edited data.
+    """
+
+    def __init__(self, data, day_start=DAY_START, day_end=DAY_END):
+        self.day_start, self.day_end = day_start, day_end
+        self.errors = []
+        # Parallel to data["classes"] / data["tasks"]; None where an entry did not compile
+        self._classes = [self._compile(compile_class, c) for c in data.get("classes", [])]
+        self._meals = [m for m in (self._compile(compile_meal, *item) for item in data.get("meals", {}).items()) if m]
+        self._tasks = [self._compile(compile_task, t) for t in data.get("tasks", [])]
+        self._sort_events()
+        self._order = sorted((t for t in self._tasks if t), key=lambda t: t.rank)
+        self._starts = []       # start of each task in _order, None if it did not fit
+        self._linear = False    # last placement used the original scan (malformed day)
+        self._replay(0)
+
+    def _compile(self, compile_one, *args):
+        try:
+            return compile_one(*args)
+        except ValueError as e:
+            self.errors.append(str(e))
+            return None
+
+    def _sort_events(self):
+        self._events = sorted([c for c in self._classes if c] + self._meals, key=lambda e: e.start)
+
+    def _replay(self, p):
+        """Keep the placements of _order[:p] and place _order[p:] again."""
+        if _needs_linear(self._events, self._order):
+            self._starts, self._linear = [], True
+            _place_linear(list(self._events), self._order, self.day_start, self.day_end, self._starts)
+            return
+        if self._linear:
+            # Slots found by the scan are not what the gap index would have picked
+            p, self._linear = 0, False
+        placed = [Event(t.name, s, s + t.minutes, TASK) for t, s in zip(self._order[:p], self._starts) if s is not None]
+        gaps = FreeGapIndex(sorted(self._events + placed, key=lambda e: e.start), self.day_start, self.day_end)
+        del self._starts[p:]
+        for task in self._order[p:]:
+            self._starts.append(gaps.take(task.minutes))
+
+    # --- Edits ---
+    def add_task(self, t):
+        """Append a task dict (as stored in data["tasks"]). Raises ValueError if it does not compile."""
+        task = compile_task(t)
+        p = bisect_right([x.rank for x in self._order], task.rank)
+        self._tasks.append(task)
+        self._order.insert(p, task)
+        self._starts.insert(p, None)
+        self._replay(p)
+
+    def remove_task(self, index):
+        """Remove data["tasks"][index]."""
+        task = self._tasks.pop(index)
+        if task is None:
+            return
+        p = next(i for i, x in enumerate(self._order) if x is task)
+        del self._order[p]
+        del self._starts[p]
+        self._replay(p)
+
+    def add_class(self, c):
+        """Append a class dict (as stored in data["classes"]). Raises ValueError if it does not compile."""
+        ev = compile_class(c)
+        self._classes.append(ev)
+        self._sort_events()
+        # Only the first task whose slot the new event cuts into (and everything after it) can move.
+        # The gap before an event runs up to its start even past day_end, so an event
+        # that late can also make room for tasks that did not fit.
+        late = ev.start > self.day_end
+        p = next((i for i, (t, s) in enumerate(zip(self._order, self._starts))
+                  if (s is None and late) or (s is not None and ev.start < s + t.minutes and ev.end > s)),
+                 len(self._order))
+        self._replay(p)
+
+    def remove_class(self, index):
+        """Remove data["classes"][index]."""
+        ev = self._classes.pop(index)
+        if ev is None:
+            return
+        self._sort_events()
+        # Freed time starts at ev.start: tasks placed before it keep their slots,
+        # anything placed after it (or left out) may now fit earlier. Slots past
+        # day_end only existed because of a late event, which may be this one.
+        p = next((i for i, (t, s) in enumerate(zip(self._order, self._starts))
+                  if s is None or s >= ev.start or s + t.minutes > self.day_end), len(self._order))
+        self._replay(p)
+
+    def preview(self, add, undo):
+        """(schedule, unplaced) with a tentative edit applied, then undone."""
+        add()
+        try:
+            return self.schedule(), self.unplaced()
+        finally:
+            undo()
+
+    # --- Results ---
+    def timeline(self):
+        """Events and placed tasks, sorted by start (same order place_tasks() gives)."""
+        timeline = list(self._events)
+        timeline += [Event(t.name, s, s + t.minutes, TASK, t.completed)
+                     for t, s in zip(self._order, self._starts) if s is not None]
+        timeline.sort(key=lambda e: e.start)
+        return timeline
+
+    def schedule(self):
+        return [e.as_dict() for e in self.timeline()]
+
+    def unplaced(self):
+        """Tasks (in priority order) that did not fit anywhere in the day."""
+        return [t for t, s in zip(self._order, self._starts) if s is None]
+
+# --- SCHEDULE CACHE ---
+def day_fingerprint(data):
+    """Everything placement depends on (completion flags excluded)."""
+    return (
+        tuple((c.get("name"), c.get("start"), c.get("end")) for c in data.get("classes", [])),
+        tuple(data.get("meals", {}).items()),
+        tuple((t.get("name"), t.get("duration"), t.get("unit"), t.get("priority")) for t in data.get("tasks", [])),
+        bool(data.get("optimize")),
+    )
+
+def snapshot_day(data):
+    """Copy of a day that another thread can read while the UI keeps editing the original."""
+    snap = {"classes": [dict(c) for c in data.get("classes", [])],
+            "tasks": [dict(t) for t in data.get("tasks", [])],
+            "meals": dict(data.get("meals", {}))}
+    if data.get("optimize"):
+        snap["optimize"] = True
+    return snap
+
+@profiled("compute_schedule")
+def compute_entry(data):
+    """(fingerprint, plan, schedule) of a day, as ScheduleCache stores it. Touches no shared state."""
+    fp = day_fingerprint(data)
+    plan = compile_day(data)
+    return fp, plan, optimized_schedule(plan) if data.get("optimize") else schedule_plan(plan)
+
+class ScheduleCache:
+    """
+    LRU cache of computed schedules, keyed by day key and checked against
+    a content fingerprint. A day is compiled (parsed and validated) only
+    when its content changes. Returned schedules are shared: treat them as read-only.
+
+    get() computes on a miss. To compute elsewhere (e.g. on a worker
+    thread), use lookup(), compute_entry() and put(); the cache itself is
+    only meant to be used from one thread.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # day_key -> (fingerprint, plan, schedule)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, day_key, data):
+        """Schedule for `data`, computed only if the day changed since last time."""
+        schedule = self.lookup(day_key, data)
+        if schedule is None:
+            schedule = self.put(day_key, compute_entry(data))
+        return schedule
+
+    def lookup(self, day_key, data):
+        """Cached schedule for `data`, or None (counted as a miss) if it needs computing."""
+        entry = self._entries.get(day_key)
+        if entry is not None and entry[0] == day_fingerprint(data):
+            self.hits += 1
+            self._entries.move_to_end(day_key)
+            return entry[2]
+        self.misses += 1
+        return None
+
+    def put(self, day_key, entry):
+        """Store a compute_entry() result. Returns its schedule."""
+        self._entries[day_key] = entry
+        self._entries.move_to_end(day_key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry[2]
+
+    def plan(self, day_key):
+        """Compiled DayPlan behind the cached schedule (None if not cached)."""
+        entry = self._entries.get(day_key)
+        return entry[1] if entry is not None else None
+
+    def set_completed(self, day_key, task_name, value):
+        """Patch a completion toggle into the cached schedule (no re-placement)."""
+        entry = self._entries.get(day_key)
+        if entry is None:
+            return
+        for task in entry[1].tasks:
+            if task.name == task_name:
+                task.completed = value
+        for item in entry[2]:
+            if item["type"] == "Task" and item["name"] == task_name:
+                item["completed"] = value
+
+    def invalidate(self, day_key=None):
+        """Drop one day (or everything when no key is given)."""
+        if day_key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(day_key, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,369 @@
+"""
+Headless HTTP/JSON API for Zenith, for other tools to read the plan and
+tick tasks off without the window:
+
+    python Zenith.py serve --port 8765
+
+    GET  /api/days/<date>                  schedule of a day ("today", DD-MM-YYYY or YYYY-MM-DD)
+    PUT  /api/days/<date>                  replace a day: {"tasks": [...], "classes": [...], "meals": {...}}
+                                           (+ "optimize": true to place its tasks with optimize.py)
+    POST /api/days/<date>/tasks/<name>     set a task's completion: {"completed": true}
+                                           (the rest of the path is the name, percent-decoded)
+    POST /api/days/<date>/tasks            the same with the name in the body: {"name": ..., "completed": true}
+    GET  /api/analytics?view=week&date=..  minutes per type (view: day, week or month)
+    GET  /api/metrics                      request counts and latency percentiles per route
+
+The server owns the data directory while it runs, like the window does:
+do not run both on the same directory at once.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import date as _date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote
+
+from analytics import date_range, month_bounds, week_bounds
+from dayindex import DayIndex, parse_day_key
+from model import compile_day
+from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+from rollups import ROLLUP_FILE, RollupStore, compute_rollups, day_rollup
+from scheduler import ScheduleCache, compute_entry, snapshot_day
+from storage import DATA_DIR, DATA_FILE, DayStore, key_for_date
+
+HOST = "127.0.0.1"
+PORT = 8765
+CACHE_DAYS = 256        # schedules kept by the server's cache
+DAY_LOCKS = 64          # striped day locks: days sharing one wait for each other
+METRICS_WINDOW = 4096   # latest requests per route the percentiles are taken over
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# --- METRICS ---
+class LatencyMetrics:
+    """Request count, errors and latency percentiles per route (over its last `window` requests)."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self._routes = {}       # route -> [count, errors, deque of seconds]
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok=True):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = [0, 0, deque(maxlen=self.window)]
+            stats[0] += 1
+            stats[1] += not ok
+            stats[2].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            routes = {r: (count, errors, sorted(samples)) for r, (count, errors, samples) in self._routes.items()}
+        out = {}
+        for route, (count, errors, samples) in routes.items():
+            pct = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000 if samples else 0.0
+            out[route] = {"count": count, "errors": errors, "p50_ms": pct(0.50), "p90_ms": pct(0.90),
+                          "p99_ms": pct(0.99), "max_ms": samples[-1] * 1000 if samples else 0.0}
+        return out
+
+# --- SERVICE ---
+class ZenithService:
+    """
+    The window's day operations (schedule, toggle, save, analytics) for
+    many threads at once.
+
+    The store, calendar, rollups and schedule cache are single-threaded
+    structures: they are only touched under `_lock`, briefly. Each day also
+    has a day lock (one of DAY_LOCKS, picked by the key's hash, so their
+    number stays fixed however many days are asked for), held across a
+    whole read-modify-write of that day (including computing its
+    schedule), so concurrent toggles and saves of one day are applied one
+    after the other while other days go on.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, legacy_file=DATA_FILE, cache_days=CACHE_DAYS):
+        self.store = DayStore(data_dir, legacy_file=legacy_file)
+        self.calendar = Calendar(os.path.join(data_dir, RECURRENCE_FILE))
+        self.days = LayeredDays(self.store, self.calendar)
+        self.rollups = RollupStore(os.path.join(data_dir, ROLLUP_FILE))
+        self.rollups.load(self.stamp(), self.store.keys)
+        self.cache = ScheduleCache(cache_days)
+        self.metrics = LatencyMetrics()
+        self._lock = threading.RLock()
+        self._day_locks = [threading.Lock() for _ in range(DAY_LOCKS)]
+        self._index = None
+
+    def stamp(self):
+        return self.store.stamp() + [self.calendar.stamp()]
+
+    def close(self):
+        with self._lock:
+            self.store.close()
+            self.rollups.save(self.stamp())
+
+    def day_lock(self, day_key):
+        return self._day_locks[hash(day_key) % len(self._day_locks)]
+
+    def day_key(self, date):
+        """Key `date` is stored under: its canonical key, or an older-style key holding it."""
+        key = key_for_date(date)
+        with self._lock:
+            if key in self.days:
+                return key
+            if self._index is None:
+                self._index = DayIndex(self.days.keys())
+            return self._index.key_for(date) or key
+
+    # --- Operations ---
+    def schedule(self, date):
+        key = self.day_key(date)
+        with self.day_lock(key):
+            with self._lock:
+                if key not in self.days:
+                    raise ApiError(404, f"no schedule for {key}")
+                data = self.days[key]
+                schedule = self.cache.lookup(key, data)
+                snapshot = snapshot_day(data) if schedule is None else None
+            if schedule is None:
+                entry = compute_entry(snapshot)     # outside the shared lock: other days go on meanwhile
+                with self._lock:
+                    schedule = self.cache.put(key, entry)
+            with self._lock:
+                if key in self.rollups.dirty:
+                    self.rollups.update(key, day_rollup(schedule, data))
+                plan = self.cache.plan(key)
+                return {"day": key, "date": date.isoformat(), "errors": plan.errors if plan else [],
+                        "schedule": [dict(item) for item in schedule]}
+
+    def set_completed(self, date, task_name, completed):
+        key = self.day_key(date)
+        with self.day_lock(key), self._lock:
+            tasks = [t for t in self.days.get(key, {}).get("tasks", []) if t.get("name") == task_name]
+            if not tasks:
+                raise ApiError(404, f"no task {task_name!r} on {key}")
+            for t in tasks:
+                t["completed"] = completed
+            self.store.set_completed(key, task_name, completed)
+            self.cache.set_completed(key, task_name, completed)
+            schedule = self.cache.lookup(key, self.days[key])
+            if schedule is None:
+                self.rollups.invalidate(key)
+            else:
+                done = len([x for x in schedule if x["type"] == "Task" and x.get("completed")])
+                self.rollups.patch(key, tasks_done=done)
+        return {"day": key, "task": task_name, "completed": completed}
+
+    def put_day(self, date, data):
+        data = check_day(data)
+        key = key_for_date(date)
+        with self.day_lock(key), self._lock:
+            self.days[key] = data
+            self.cache.invalidate(key)
+            self.rollups.invalidate(key)
+            if self._index is not None:
+                self._index.add(key)
+        return {"day": key, "errors": []}
+
+    def analytics(self, view, date):
+        if view == "day":
+            first = last = date
+        elif view in ("week", "month"):
+            first, last = (week_bounds if view == "week" else month_bounds)(date)
+        else:
+            raise ApiError(400, "view must be day, week or month")
+        with self._lock:
+            stale = self.rollups.dirty_in(first, last)
+            for d in date_range(first, last):
+                k = key_for_date(d)
+                if k not in self.rollups.rows and k not in self.rollups.dirty and k in self.days:
+                    stale.append(k)
+            jobs = []
+            for k in stale:
+                if k not in self.days:
+                    self.rollups.drop(k)
+                    continue
+                data = self.days[k]
+                jobs.append((k, self.rollups.generation(k), self.cache.lookup(k, data), snapshot_day(data)))
+        results = compute_rollups(jobs)
+        with self._lock:
+            for k, gen, entry, row in results:
+                # Computed outside the locks: a toggle or edit since then wins
+                if entry is not None and gen == self.rollups.generation(k) and self.cache.plan(k) is None:
+                    self.cache.put(k, entry)
+                self.rollups.update(k, row, gen)
+            stats = self.rollups.stats(first, last)
+        stats.update(view=view, first=first.isoformat(), last=last.isoformat())
+        return stats
+
+def check_day(data):
+    """
+    The day to store from a PUT body, or ApiError(400). Nothing that the
+    scheduler would skip is accepted: a stored day must always schedule.
+    """
+    if not isinstance(data, dict):
+        raise ApiError(400, "body must be a JSON object")
+    for field, kind in (("tasks", list), ("classes", list), ("meals", dict)):
+        if not isinstance(data.get(field, kind()), kind):
+            raise ApiError(400, f"'{field}' must be a {kind.__name__}")
+    day = {"tasks": data.get("tasks", []), "classes": data.get("classes", []), "meals": data.get("meals", {})}
+    for field in ("tasks", "classes"):
+        for item in day[field]:
+            if not isinstance(item, dict) or not isinstance(item.get("name"), str):
+                raise ApiError(400, f"every entry of '{field}' must be an object with a string 'name'")
+    for t in day["tasks"]:
+        if not isinstance(t.get("completed", False), bool):
+            raise ApiError(400, f"task {t['name']!r}: 'completed' must be true or false")
+    errors = compile_day(day).errors
+    if errors:
+        raise ApiError(400, "; ".join(errors))
+    if data.get("optimize"):
+        day["optimize"] = True
+    return day
+
+# --- HTTP ---
+def parse_path_date(text):
+    text = unquote(text)
+    date = _date.today() if text == "today" else parse_day_key(text)
+    if date is None:
+        raise ApiError(400, f"not a date: {text!r} (use today, DD-MM-YYYY or YYYY-MM-DD)")
+    return date
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: a client reuses its connection
+    disable_nagle_algorithm = True  # headers and body go out as two writes: don't hold the second for an ACK
+    server_version = "Zenith"
+    verbose = False
+
+    # (method, path pattern, route name for the metrics, handler)
+    ROUTES = []
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        t0 = time.perf_counter()
+        path, _, query = self.path.partition("?")
+        route, status = f"{method} (unknown)", 404
+        try:
+            for m, pattern, name, handler in self.ROUTES:
+                match = pattern.fullmatch(path)
+                if m == method and match is not None:
+                    route = name
+                    status, body = 200, handler(self, *match.groups(), query=parse_qs(query))
+                    break
+            else:
+                raise ApiError(404, f"no route for {method} {path}")
+        except ApiError as e:
+            status, body = e.status, {"error": str(e)}
+        except Exception as e:
+            status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, body)
+        self.server.service.metrics.record(route, time.perf_counter() - t0, status < 500)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ApiError(400, "body is not valid JSON") from None
+        if not isinstance(body, dict):
+            raise ApiError(400, "body must be a JSON object")
+        return body
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    # --- Routes ---
+    def get_day(self, date, query):
+        return self.server.service.schedule(parse_path_date(date))
+
+    def put_day(self, date, query):
+        return self.server.service.put_day(parse_path_date(date), self.read_json())
+
+    def post_task(self, date, name=None, query=None):
+        body = self.read_json()
+        completed = body.get("completed")
+        if not isinstance(completed, bool):
+            raise ApiError(400, "body must be {\"completed\": true|false}")
+        if name is None:
+            name = body.get("name")
+            if not isinstance(name, str):
+                raise ApiError(400, "body must name the task: {\"name\": ..., \"completed\": true|false}")
+        else:
+            name = unquote(name)
+        return self.server.service.set_completed(parse_path_date(date), name, completed)
+
+    def get_analytics(self, query):
+        view = query.get("view", ["day"])[0]
+        return self.server.service.analytics(view, parse_path_date(query.get("date", ["today"])[0]))
+
+    def get_metrics(self, query):
+        service = self.server.service
+        with service._lock:
+            cache = {"hits": service.cache.hits, "misses": service.cache.misses, "size": len(service.cache)}
+        return {"routes": service.metrics.snapshot(), "schedule_cache": cache}
+
+ApiHandler.ROUTES = [
+    ("GET", re.compile(r"/api/days/([^/]+)"), "GET /api/days/<date>", ApiHandler.get_day),
+    ("PUT", re.compile(r"/api/days/([^/]+)"), "PUT /api/days/<date>", ApiHandler.put_day),
+    ("POST", re.compile(r"/api/days/([^/]+)/tasks/(.+)"), "POST /api/days/<date>/tasks/<name>", ApiHandler.post_task),
+    ("POST", re.compile(r"/api/days/([^/]+)/tasks/?"), "POST /api/days/<date>/tasks", ApiHandler.post_task),
+    ("GET", re.compile(r"/api/analytics"), "GET /api/analytics", ApiHandler.get_analytics),
+    ("GET", re.compile(r"/api/metrics"), "GET /api/metrics", ApiHandler.get_metrics),
+]
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # bursts from a load generator wait instead of being refused
+
+    def __init__(self, service, host=HOST, port=PORT):
+        super().__init__((host, port), ApiHandler)
+        self.service = service
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="Zenith.py serve", description="Serve Zenith's schedules as a local JSON API.")
+    parser.add_argument("--data", default=DATA_DIR, help="zenith_data directory")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    ApiHandler.verbose = args.verbose
+    service = ZenithService(args.data)
+    server = ApiServer(service, args.host, args.port)
+    print(f"Serving {args.data} on http://{args.host}:{server.server_address[1]}/api/ (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
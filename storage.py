@@ -0,0 +1,485 @@
+"""Persistence for Zenith: per-day files plus an append-only change journal."""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from profiling import profiled
+
+DATA_FILE = "weekly_timetable.json"     # legacy single-file format
+DATA_DIR = "zenith_data"
+COMPACT_AFTER = 500     # journal records before they are folded into the day files
+CACHE_DAYS = 32         # days kept in memory
+DEBOUNCE = 0.25         # seconds a burst of changes is collected before one write
+RETRY_DELAY = 1.0       # seconds before retrying a failed write
+
+# --- FILE HELPERS ---
+def atomic_write_json(path, obj, fsync=True, **dump_kwargs):
+    """Write JSON to a temp file and rename it over `path`, so readers never see a torn file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, **dump_kwargs)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def fsync_dir(path):
+    """Make the renames into a directory durable (not possible on Windows, where it is skipped)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+def read_journal(path):
+    """Yield the records of a journal file. A torn last line (crash mid-append) is ignored."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
+
+def trim_torn_tail(path):
+    """Cut a half-written last line so new appends don't get glued onto it."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def apply_record(weekly_data, rec):
+    """Replay one journal record. Records are idempotent, so replaying twice is harmless."""
+    op = rec["op"]
+    if op == "put_day":
+        weekly_data[rec["day"]] = rec["data"]
+    elif op == "delete_day":
+        weekly_data.pop(rec["day"], None)
+    elif op == "set_completed":
+        for t in weekly_data.get(rec["day"], {}).get("tasks", []):
+            if t["name"] == rec["task"]:
+                t["completed"] = rec["value"]
+
+def key_for_date(date):
+    """Key a day is stored under, e.g. "Saturday 17-10-2026"."""
+    return f"{date:%A} {date:%d-%m-%Y}"
+
+def date_of_key(day_key):
+    """The date of a key made by key_for_date(), or None for keys it would not have made."""
+    try:
+        date = datetime.strptime(day_key.split(" ", 1)[1], "%d-%m-%Y").date()
+    except (IndexError, ValueError):
+        return None
+    return date if key_for_date(date) == day_key else None
+
+def coalesce(batch):
+    """
+    Drop the records of a batch that a later record in the same batch fully
+    overwrites: anything before a put_day or delete_day of the same day, and
+    earlier toggles of the same task. Order of the rest is kept.
+    """
+    kept, replaced, toggled = [], set(), set()
+    for item in reversed(batch):
+        rec = item[1]
+        day = rec["day"]
+        if day in replaced:
+            continue
+        if rec["op"] in ("put_day", "delete_day"):
+            replaced.add(day)
+        elif rec["op"] == "set_completed":
+            if (day, rec["task"]) in toggled:
+                continue
+            toggled.add((day, rec["task"]))
+        kept.append(item)
+    kept.reverse()
+    return kept
+
+def day_filename(day_key):
+    """Stable, filesystem-safe file name for a day key."""
+    safe = re.sub(r"[^0-9A-Za-z-]+", "_", day_key).strip("_")
+    digest = hashlib.sha1(day_key.encode("utf-8")).hexdigest()[:8]
+    return f"{safe}-{digest}.json"
+
+# --- LEGACY FORMAT ---
+def load_legacy(path=DATA_FILE):
+    """The old `weekly_timetable.json` (+ its journal, if any) as one dict."""
+    try:
+        weekly_data = read_json(path, {})
+    except ValueError:
+        weekly_data = {}
+    for journal in (path + ".journal.old", path + ".journal"):
+        for rec in read_journal(journal):
+            apply_record(weekly_data, rec)
+    return weekly_data
+
+# --- DAY STORE ---
+class DayStore:
+    """
+    One JSON file per day under `root/days`, read only when that day is
+    asked for; the last `cache_days` days used stay in memory.
+
+    Changes go into a per-day pending index at once (so a day read from
+    disk is always its file plus its pending records) and are handed to a
+    writer thread; the caller never waits on disk. The writer collects a
+    burst of changes for `debounce` seconds, drops the ones overwritten
+    within the burst and appends the rest to `root/journal.jsonl` in one
+    write (fsynced if `fsync`). Failed writes are retried and reported on
+    `errors`, a queue the UI polls.
+
+    Once the journal grows past `compact_after` records the writer seals
+    it (renames it to `journal.old`) and rewrites only the touched day
+    files and the manifest, each through an atomic temp-file rename. The
+    sealed journal is deleted last and records are idempotent, so an
+    interrupted compaction is simply redone.
+
+    `manifest.json` lists every stored day key; it is only read when the
+    full key list is needed, so startup cost does not grow with history.
+    Behaves like a dict of day_key -> day data for the UI.
+    """
+
+    def __init__(self, root=DATA_DIR, legacy_file=DATA_FILE, compact_after=COMPACT_AFTER,
+                 cache_days=CACHE_DAYS, fsync=False, debounce=DEBOUNCE):
+        self.root = root
+        self.days_dir = os.path.join(root, "days")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.journal_path = os.path.join(root, "journal.jsonl")
+        self.sealed_path = os.path.join(root, "journal.old")
+        self.compact_after = compact_after
+        self.cache_days = cache_days
+        self.fsync = fsync
+        self.debounce = debounce
+        self.errors = queue.Queue()     # exceptions from the writer thread, for the UI to poll
+        self.last_error = None          # set while writes are failing
+
+        self._days = OrderedDict()      # LRU of loaded days
+        self._pending = {}              # day_key -> [(seq, op, json line)] not yet in the day files
+        self._manifest = None           # set of day keys, loaded on demand
+        self._seq = 0
+        self._lock = threading.Lock()
+
+        # Writer thread state (guarded by _cond)
+        self._queue = []                # [(seq, record, json line)] not yet in the journal
+        self._written_seq = 0
+        self._cond = threading.Condition()
+        self._flushing = False
+        self._closing = False
+        self._writer = None
+        # Only touched by the writer thread
+        self._sealed_seq = 0
+        self._records = 0
+        self._journal = None
+
+        os.makedirs(self.days_dir, exist_ok=True)
+        atexit.register(self.close)
+        if legacy_file and os.path.exists(legacy_file) and not os.path.exists(self.manifest_path):
+            self.migrate_legacy(legacy_file)
+
+        trim_torn_tail(self.journal_path)
+        for rec in read_journal(self.sealed_path):
+            self._index(rec)
+        self._sealed_seq = self._seq
+        for rec in read_journal(self.journal_path):
+            self._index(rec)
+            self._records += 1
+        self._written_seq = self._seq
+
+        if os.path.exists(self.sealed_path):
+            # A previous session stopped before finishing its compaction
+            self._start_writer()
+
+    # --- Migration ---
+    def migrate_legacy(self, legacy_file):
+        """One-time split of the old single JSON file into day files."""
+        weekly_data = load_legacy(legacy_file)
+        for day_key, data in weekly_data.items():
+            atomic_write_json(self._day_path(day_key), data, fsync=True, indent=2)
+        # The day files must be on disk before the manifest says the migration is done
+        fsync_dir(self.days_dir)
+        atomic_write_json(self.manifest_path, {"days": sorted(weekly_data)}, fsync=True)
+        fsync_dir(self.root)
+
+        # Keep the old files around, out of the way of the next startup
+        for path in (legacy_file, legacy_file + ".journal", legacy_file + ".journal.old"):
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+
+    # --- Dict-like access ---
+    def __contains__(self, day_key):
+        if day_key in self._days:
+            return True
+        op = self._pending_op(day_key)
+        if op is not None:
+            return op == "put_day"
+        return os.path.exists(self._day_path(day_key))
+
+    def __getitem__(self, day_key):
+        data = self.get(day_key)
+        if data is None:
+            raise KeyError(day_key)
+        return data
+
+    def __setitem__(self, day_key, data):
+        self.put_day(day_key, data)
+
+    def get(self, day_key, default=None):
+        if day_key in self._days:
+            self._days.move_to_end(day_key)
+            return self._days[day_key]
+
+        # Take the pending records *before* reading the file: whether or not
+        # the compactor has rewritten it meanwhile, replaying them gives the same day.
+        with self._lock:
+            pending = [line for _, _, line in self._pending.get(day_key, [])]
+        box = {}
+        path = self._day_path(day_key)
+        if os.path.exists(path):
+            box[day_key] = read_json(path)
+        for line in pending:
+            apply_record(box, json.loads(line))
+
+        if day_key not in box:
+            return default
+        self._remember(day_key, box[day_key])
+        return box[day_key]
+
+    def keys(self):
+        """Every stored day key, sorted (reads the manifest the first time)."""
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = set(read_json(self.manifest_path, {"days": []})["days"])
+            keys = set(self._manifest)
+        for k in list(self._pending):
+            op = self._pending_op(k)
+            if op == "put_day":
+                keys.add(k)
+            elif op == "delete_day":
+                keys.discard(k)
+        return sorted(keys)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def stamp(self):
+        """Size and mtime of the manifest and journals: changes whenever the stored days do."""
+        stamp = []
+        for path in (self.manifest_path, self.journal_path, self.sealed_path):
+            try:
+                st = os.stat(path)
+                stamp.append([st.st_size, st.st_mtime_ns])
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        for day_key in self.keys():
+            yield day_key, self[day_key]
+
+    # --- Changes ---
+    def put_day(self, day_key, data):
+        self._remember(day_key, data)
+        self.append({"op": "put_day", "day": day_key, "data": data})
+
+    def delete_day(self, day_key):
+        self._days.pop(day_key, None)
+        self.append({"op": "delete_day", "day": day_key})
+
+    def set_completed(self, day_key, task_name, value):
+        rec = {"op": "set_completed", "day": day_key, "task": task_name, "value": value}
+        if day_key in self._days:
+            apply_record(self._days, rec)
+        self.append(rec)
+
+    def append(self, rec):
+        """Record a change; it is written by the writer thread."""
+        seq, line = self._index(rec)
+        with self._cond:
+            self._queue.append((seq, rec, line))
+            self._cond.notify_all()
+        if self._writer is None:
+            self._start_writer()
+
+    def _index(self, rec):
+        # Keep the serialized form: the UI goes on mutating the dicts it passed in
+        line = json.dumps(rec)
+        with self._lock:
+            self._seq += 1
+            self._pending.setdefault(rec["day"], []).append((self._seq, rec["op"], line))
+            return self._seq, line
+
+    def _pending_op(self, day_key):
+        """The last pending put_day / delete_day of a day, or None."""
+        with self._lock:
+            ops = [op for _, op, _ in self._pending.get(day_key, []) if op != "set_completed"]
+        return ops[-1] if ops else None
+
+    def _remember(self, day_key, data):
+        self._days[day_key] = data
+        self._days.move_to_end(day_key)
+        while len(self._days) > self.cache_days:
+            self._days.popitem(last=False)
+
+    def _day_path(self, day_key):
+        return os.path.join(self.days_dir, day_filename(day_key))
+
+    # --- Writer thread ---
+    def _start_writer(self):
+        self._writer = threading.Thread(target=self._run_writer, name="zenith-writer", daemon=True)
+        self._writer.start()
+
+    def _run_writer(self):
+        try:
+            if os.path.exists(self.sealed_path):
+                self._write_safely(self._fold_sealed)
+            while True:
+                with self._cond:
+                    while not self._queue and not self._closing:
+                        self._cond.wait()
+                    if not self._queue:
+                        return
+                    # Debounce: let the rest of a burst arrive
+                    deadline = time.monotonic() + self.debounce
+                    while not (self._closing or self._flushing):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    batch, self._queue = self._queue, []
+
+                if self._write_safely(self._write_batch, batch):
+                    with self._cond:
+                        self._written_seq = batch[-1][0]
+                        self._cond.notify_all()
+                    continue
+
+                with self._cond:
+                    self._queue[:0] = batch     # keep it for the next attempt
+                    self._cond.notify_all()
+                    if self._closing:
+                        return
+                time.sleep(RETRY_DELAY)
+        finally:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _write_safely(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            self.last_error = e
+            self.errors.put(e)
+            return False
+        self.last_error = None
+        return True
+
+    @profiled("save_data")
+    def _write_batch(self, batch):
+        kept = coalesce(batch)
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        self._journal.write("".join(line + "\n" for _, _, line in kept))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self._records += len(kept)
+        if self._records >= self.compact_after:
+            # Seal the journal and fold it into the day files
+            self._journal.close()
+            self._journal = None
+            os.replace(self.journal_path, self.sealed_path)
+            self._sealed_seq = batch[-1][0]
+            self._records = 0
+            self._fold_sealed()
+
+    def flush(self, timeout=None):
+        """Write everything queued now. False if a write failed or `timeout` ran out."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._seq
+            self._flushing = True
+            self._cond.notify_all()
+            try:
+                while self._written_seq < target:
+                    if self.last_error is not None or self._writer is None or not self._writer.is_alive():
+                        return False
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing = False
+        return True
+
+    @profiled("fold_journal")
+    def _fold_sealed(self):
+        by_day = OrderedDict()
+        for rec in read_journal(self.sealed_path):
+            by_day.setdefault(rec["day"], []).append(rec)
+
+        new_keys, gone = set(), set()
+        for day_key, recs in by_day.items():
+            path = self._day_path(day_key)
+            box = {}
+            if os.path.exists(path):
+                box[day_key] = read_json(path)
+            for rec in recs:
+                apply_record(box, rec)
+            if day_key in box:
+                atomic_write_json(path, box[day_key], fsync=True, indent=2)
+                new_keys.add(day_key)
+            else:
+                # Deleted (or never stored)
+                if os.path.exists(path):
+                    os.remove(path)
+                gone.add(day_key)
+
+        manifest = set(read_json(self.manifest_path, {"days": []})["days"])
+        if not new_keys <= manifest or gone & manifest:
+            atomic_write_json(self.manifest_path, {"days": sorted((manifest | new_keys) - gone)}, fsync=True)
+
+        with self._lock:
+            if self._manifest is not None:
+                self._manifest = (self._manifest | new_keys) - gone
+            for day_key in by_day:
+                left = [r for r in self._pending.get(day_key, []) if r[0] > self._sealed_seq]
+                if left:
+                    self._pending[day_key] = left
+                else:
+                    self._pending.pop(day_key, None)
+        os.remove(self.sealed_path)
+
+    def close(self):
+        """Write what is queued and stop the writer. Raises the last error if changes are left unsaved."""
+        atexit.unregister(self.close)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        if self._queue:
+            raise self.last_error or OSError("unsaved changes left in the queue")
@@ -0,0 +1,68 @@
+"""
+Checks for archive.py: an archive gives back exactly what was packed,
+odd days included, and a damaged file is refused before it is mapped.
+
+    python -m pytest -q test_archive.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import archive
+from archive import Archive, write_archive
+from storage import DayStore
+
+def day(*tasks):
+    return {"tasks": [{"name": n, "duration": 30, "priority": "High"} for n in tasks],
+            "classes": [{"name": "Math", "start": "09:00", "end": "10:00"}], "meals": {"Lunch": "13:00"}}
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_round_trip(self):
+        days = {
+            "Monday 12-10-2026": day("a", "b"),
+            "Tuesday 13-10-2026": dict(day("c"), optimize=True),         # a field the columns do not hold
+            "Wednesday 14-10-2026": {"tasks": [], "classes": [{"name": "x", "start": "9am", "end": "10:00"}]},
+            "Someday": day("d"),                                           # no date in the key
+        }
+        days["Monday 12-10-2026"]["tasks"][1]["completed"] = True
+        path = os.path.join(self.root, "history.zarc")
+        write_archive(path, sorted(days.items()))
+
+        with Archive(path) as packed:
+            self.assertEqual(sorted(packed.keys()), sorted(days))
+            self.assertEqual(dict(packed.items()), days)
+            self.assertNotIn("Thursday 15-10-2026", packed)
+            self.assertIsNone(packed.get("Thursday 15-10-2026"))
+            packed["Monday 12-10-2026"]["tasks"].clear()
+            self.assertEqual(packed["Monday 12-10-2026"], days["Monday 12-10-2026"])
+
+    def test_pack_a_store(self):
+        data = os.path.join(self.root, "zenith_data")
+        store = DayStore(data, legacy_file=None)
+        store.put_day("Monday 12-10-2026", day("a"))
+        store.put_day("Odd key", day("b"))
+        store.close()
+        path = os.path.join(self.root, "history.zarc")
+        self.assertEqual(archive.main(["pack", "--data", data, "-o", path]), 0)
+        with archive.Archive(path) as packed:
+            self.assertEqual(dict(packed.items()), {"Monday 12-10-2026": day("a"), "Odd key": day("b")})
+
+    def test_empty_or_truncated_file(self):
+        path = os.path.join(self.root, "history.zarc")
+        write_archive(path, [("Monday 12-10-2026", day("a"))])
+        with open(path, "rb") as f:
+            packed = f.read()
+        for data in (b"", packed[:20], packed[:-8]):
+            with open(path, "wb") as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                Archive(path)
+        os.remove(path)     # nothing left open
+
+if __name__ == "__main__":
+    unittest.main()
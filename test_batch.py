@@ -0,0 +1,56 @@
+"""
+Checks for batch.py: stores are found before their first compaction, an
+empty range is an error, and `Zenith.py export` writes a calendar.
+
+    python -m pytest -q test_batch.py
+"""
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import batch
+from Zenith import COMMANDS
+from storage import DayStore
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.data = os.path.join(self.root, "alice")
+        store = DayStore(self.data, legacy_file=None)
+        store.put_day("Saturday 17-10-2026", {"tasks": [{"name": "Read", "duration": 30, "priority": "High"}],
+                                              "classes": [], "meals": {}})
+        store.close()
+        self.out = os.path.join(self.root, "out.jsonl")
+
+    def run_batch(self, data, first):
+        return batch.main(["--data", data, "--from", first, "--workers", "1", "-o", self.out])
+
+    def test_fresh_store(self):
+        self.assertFalse(os.path.exists(os.path.join(self.data, "manifest.json")))
+        self.assertTrue(batch.is_store_dir(self.data))
+        for data in (self.data, self.root):     # the store itself, or a directory of users
+            self.assertEqual(self.run_batch(data, "17-10-2026"), 0)
+            with open(self.out) as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual([(r["user"], r["date"]) for r in rows], [("alice", "2026-10-17")])
+
+    def test_no_days_in_range(self):
+        self.assertEqual(self.run_batch(self.data, "18-10-2026"), 1)
+
+    def test_export_writes_ics(self):
+        self.assertEqual(batch.export_main(["--data", self.data, "--from", "17-10-2026", "--workers", "1", "-o", self.out]), 0)
+        with open(self.out) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "BEGIN:VCALENDAR")
+        self.assertIn("SUMMARY:Read", lines)
+
+    def test_every_subcommand_has_a_main(self):
+        for module, func in COMMANDS.values():
+            self.assertTrue(callable(getattr(importlib.import_module(module), func)), module)
+
+if __name__ == "__main__":
+    unittest.main()
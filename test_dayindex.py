@@ -0,0 +1,81 @@
+"""
+Checks for dayindex.py: keys in any spelling find their date, navigation
+matches a scan of the sorted dates, and `reindex` leaves each date under
+its canonical key alone.
+
+    python -m pytest -q test_dayindex.py
+"""
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from dayindex import DayIndex, merge_duplicates, parse_day_key
+from storage import DayStore, key_for_date
+
+DAY = date(2026, 10, 17)    # a Saturday
+
+class DayIndexTest(unittest.TestCase):
+    def test_parse_day_key(self):
+        for key in ("Saturday 17-10-2026", "Monday 17-10-2026", "17-10-2026", "Saturday 2026-10-17",
+                    "17/10/2026", "Sat 17.10.2026", "Saturday 17-10-2026 "):
+            self.assertEqual(parse_day_key(key), DAY, key)
+        self.assertEqual(parse_day_key("5-1-2026"), date(2026, 1, 5))
+        for key in ("", "Saturday", "Saturday 31-02-2026", "Week 42"):
+            self.assertIsNone(parse_day_key(key), key)
+
+    def test_navigation_matches_a_scan(self):
+        rnd = random.Random(9)
+        dates = sorted({DAY + timedelta(days=rnd.randrange(-200, 200)) for _ in range(80)})
+        index = DayIndex([key_for_date(d) for d in dates] + ["notes"])
+        self.assertEqual(index.unparsed, {"notes"})
+        self.assertEqual(len(index), len(dates))
+        for d in (DAY + timedelta(days=i) for i in range(-210, 210)):
+            self.assertEqual(index.prev(d), max((x for x in dates if x < d), default=None))
+            self.assertEqual(index.next(d), min((x for x in dates if x > d), default=None))
+            self.assertEqual(d in index, d in dates)
+        first, last = DAY - timedelta(days=30), DAY + timedelta(days=30)
+        self.assertEqual(list(index.between(first, last)),
+                         [(d, key_for_date(d)) for d in dates if first <= d <= last])
+
+        for d in dates[::2]:
+            index.discard(key_for_date(d))
+        self.assertEqual(index.next(DAY - timedelta(days=300)), dates[1])
+
+    def test_canonical_key_comes_first(self):
+        index = DayIndex(["Monday 17-10-2026", "17-10-2026"])
+        self.assertEqual(index.key_for(DAY), "Monday 17-10-2026")
+        index.add("Saturday 17-10-2026")
+        self.assertEqual(index.key_for(DAY), "Saturday 17-10-2026")
+        self.assertEqual(list(index.duplicates()), [(DAY, ["Saturday 17-10-2026", "Monday 17-10-2026", "17-10-2026"])])
+        index.discard("Monday 17-10-2026")
+        index.discard("17-10-2026")
+        self.assertEqual(list(index.duplicates()), [])
+
+class MergeDuplicatesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.store = DayStore(self.root, legacy_file=None)
+        self.addCleanup(self.store.close)
+
+    def test_copies_are_merged_under_the_canonical_key(self):
+        read = {"name": "Read", "duration": 30, "priority": "High"}
+        math = {"name": "Math", "start": "09:00", "end": "10:00"}
+        self.store.put_day("Saturday 17-10-2026", {"tasks": [read], "classes": [], "meals": {"Lunch": "13:00"}})
+        self.store.put_day("Monday 17-10-2026", {"tasks": [read, {"name": "Run", "duration": 20, "priority": "Low"}],
+                                                 "classes": [math], "meals": {"Lunch": "12:00", "Dinner": "20:00"}})
+        self.store.put_day("18-10-2026", {"tasks": [], "classes": [math], "meals": {}})
+        self.store.put_day("Monday 19-10-2026", {"tasks": [], "classes": [], "meals": {}})
+
+        self.assertEqual(merge_duplicates(self.store), 2)
+        self.assertEqual(sorted(self.store.keys()), ["Monday 19-10-2026", "Saturday 17-10-2026", "Sunday 18-10-2026"])
+        merged = self.store["Saturday 17-10-2026"]
+        self.assertEqual([t["name"] for t in merged["tasks"]], ["Read", "Run"])
+        self.assertEqual(merged["classes"], [math])
+        self.assertEqual(merged["meals"], {"Lunch": "13:00", "Dinner": "20:00"})
+        self.assertEqual(merge_duplicates(self.store), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Checks for interchange.py: a schedule exported with `generate --format
+ics/csv` and imported into an empty store comes back as the same days.
+
+    python -m pytest -q test_interchange.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import batch
+import interchange
+from model import compile_day
+from recurrence import RECURRENCE_FILE, Calendar, LayeredDays
+from storage import DayStore
+
+MEALS = {"Breakfast": "09:00", "Lunch": "13:00", "Dinner": "20:00"}      # the default template's
+DAYS = {
+    "Monday 12-10-2026": {"classes": [{"name": "Math, 101", "start": "10:00", "end": "11:30"}], "meals": MEALS,
+                          "tasks": [{"name": "Essay", "duration": 45, "priority": "High", "completed": True},
+                                    {"name": "Call", "duration": 2, "priority": "Low", "unit": "minutes"},
+                                    {"name": "Gym", "duration": 2, "priority": "Medium"}]},       # 2 hours
+    "Tuesday 13-10-2026": {"classes": [], "meals": MEALS,
+                           "tasks": [{"name": "Read", "duration": 30, "priority": "Low"}]},
+}
+
+def open_days(root):
+    return LayeredDays(DayStore(root, legacy_file=None), Calendar(os.path.join(root, RECURRENCE_FILE)))
+
+def placed(data):
+    plan = compile_day(data)
+    return (sorted((e.name, e.start, e.end) for e in plan.events),
+            sorted((t.name, t.minutes, t.rank, t.completed) for t in plan.tasks))
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.source = os.path.join(self.root, "source")
+        days = open_days(self.source)
+        for key, data in DAYS.items():
+            days[key] = data
+        days.close()
+
+    def round_trip(self, fmt):
+        exported = os.path.join(self.root, f"export.{fmt}")
+        target = os.path.join(self.root, f"imported-{fmt}")
+        self.assertEqual(batch.main(["--data", self.source, "--from", "12-10-2026", "--to", "13-10-2026",
+                                     "--workers", "1", "--format", fmt, "-o", exported]), 0)
+        self.assertEqual(interchange.main([exported, "--data", target]), 0)
+        days = open_days(target)
+        try:
+            self.assertEqual(sorted(days.keys()), sorted(DAYS))
+            for key, data in DAYS.items():
+                self.assertEqual(placed(days[key]), placed(data))
+        finally:
+            days.close()
+
+    def test_ics(self):
+        self.round_trip("ics")
+
+    def test_csv(self):
+        self.round_trip("csv")
+
+    def test_import_twice_adds_nothing(self):
+        self.round_trip("ics")
+        self.round_trip("ics")
+
+class ImporterTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_rules_are_saved_before_the_days_using_them(self):
+        days = open_days(self.root)
+        importer = interchange.Importer(days, days.calendar, buffer_days=1)
+        importer.add({"date": date(2026, 10, 12), "type": "Class", "name": "Math", "start": 600, "end": 660,
+                      "completed": False, "uid": "math", "rrule": {"FREQ": "WEEKLY", "BYDAY": "MO"}})
+        for d in (13, 14):      # fills the buffer: the first date is written
+            importer.add({"date": date(2026, 10, d), "type": "Task", "name": "Read", "start": 480, "end": 510,
+                          "completed": False, "priority": "High"})
+        self.assertEqual([r["name"] for r in Calendar(os.path.join(self.root, RECURRENCE_FILE)).rules], ["Math"])
+        importer.close()
+        days.close()
+
+    def test_failed_save_stops_the_import(self):
+        class Unsaved(dict):
+            def flush(self):
+                return False
+        importer = interchange.Importer(Unsaved(), Calendar(os.path.join(self.root, RECURRENCE_FILE)))
+        importer.add({"date": date(2026, 10, 12), "type": "Task", "name": "Read", "start": 480, "end": 510,
+                      "completed": False})
+        with self.assertRaises(OSError):
+            importer.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Checks for optimize.py: it never places fewer minutes of a priority than
+first-fit without placing more of a higher one, and finds the best
+placement on days small enough to search exhaustively.
+
+    python -m pytest -q test_optimize.py
+"""
+import itertools
+import random
+import time
+import unittest
+
+from model import TASK, compile_day
+from optimize import optimize_plan, placed_minutes, priority_weights
+from scheduler import DAY_END, DAY_START, FreeGapIndex, build_schedule, min_to_time
+
+RANKS = {"High": 0, "Medium": 1, "Low": 2}
+
+def task(name, minutes, priority):
+    return {"name": name, "duration": minutes, "priority": priority}
+
+def random_day(rnd, n_tasks=7):
+    classes = []
+    for _ in range(rnd.randrange(1, 5)):
+        start = rnd.randrange(DAY_START, DAY_END - 30)
+        classes.append({"name": "C", "start": min_to_time(start), "end": min_to_time(start + rnd.choice([30, 60, 180]))})
+    tasks = [task(f"T{i}", rnd.choice([15, 30, 45, 60, 90, 120, 240]), rnd.choice(["High", "Medium", "Low"]))
+             for i in range(n_tasks)]
+    return {"classes": classes, "tasks": tasks, "meals": {}}
+
+def best_score(plan):
+    """Highest score of any assignment of tasks to gaps (or to none), by brute force."""
+    gaps = FreeGapIndex(plan.events, DAY_START, DAY_END)
+    caps = [e - s for s, e in zip(gaps.starts, gaps.ends) if e > s]
+    weights = priority_weights(plan.tasks)
+    best = 0
+    for choice in itertools.product(range(len(caps) + 1), repeat=len(plan.tasks)):
+        used = [0] * len(caps)
+        for t, g in zip(plan.tasks, choice):
+            if g < len(caps):
+                used[g] += t.minutes
+        if all(u <= c for u, c in zip(used, caps)):
+            best = max(best, sum(t.minutes * weights[t.rank] for t, g in zip(plan.tasks, choice) if g < len(caps)))
+    return best
+
+class OptimizeTest(unittest.TestCase):
+    def test_keeps_high_priority_over_more_low_minutes(self):
+        # First-fit places Urgent + L1; L1 + L2 would place more minutes but drop Urgent
+        data = {"classes": [{"name": "Work", "start": "09:00", "end": "22:00"}], "meals": {},
+                "tasks": [task("Urgent", 12, "High"), task("L1", 60, "Low"), task("L2", 60, "Low")]}
+        plan = compile_day(data)
+        result = optimize_plan(plan)
+        self.assertNotIn("Urgent", [t.name for t in result.unplaced])
+        self.assertEqual(placed_minutes(plan.tasks, result.unplaced), [12, 0, 60])
+
+    def test_never_gives_up_priority_minutes(self):
+        rnd = random.Random(3)
+        for _ in range(200):
+            data = random_day(rnd, n_tasks=12)
+            plan = compile_day(data)
+            first_fit = [0, 0, 0]
+            priority = {t["name"]: t["priority"] for t in data["tasks"]}
+            for item in build_schedule(data):
+                if item["type"] == "Task":
+                    first_fit[RANKS[priority[item["name"]]]] += item["duration"]
+            # High minutes first, then Medium, then Low: never behind first-fit in that order
+            self.assertGreaterEqual(placed_minutes(plan.tasks, optimize_plan(plan).unplaced), first_fit)
+
+    def test_finds_the_best_placement_of_small_days(self):
+        rnd = random.Random(4)
+        for _ in range(30):
+            plan = compile_day(random_day(rnd, n_tasks=6))
+            result = optimize_plan(plan)
+            self.assertEqual(result.score, best_score(plan))
+
+    def test_placed_tasks_fit_around_the_events(self):
+        rnd = random.Random(5)
+        for _ in range(100):
+            result = optimize_plan(compile_day(random_day(rnd, n_tasks=10)))
+            tasks = [e for e in result.timeline if e.kind == TASK]
+            for t in tasks:
+                self.assertTrue(DAY_START <= t.start and t.end <= DAY_END)
+                for e in result.timeline:
+                    if e is not t:
+                        self.assertFalse(e.start < t.end and t.start < e.end, (t, e))
+
+    def test_budget_bounds_the_whole_search(self):
+        # Hundreds of tasks and hundreds of gaps too short for them: every strategy would run long
+        classes = [{"name": "C", "start": min_to_time(m), "end": min_to_time(m + 1)} for m in range(DAY_START, DAY_END, 3)]
+        rnd = random.Random(6)
+        data = {"classes": classes, "meals": {},
+                "tasks": [task(f"T{i}", rnd.choice([10, 12, 15]), rnd.choice(list(RANKS))) for i in range(400)]}
+        plan = compile_day(data)
+        t0 = time.perf_counter()
+        result = optimize_plan(plan, budget=0.3)
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        self.assertGreaterEqual(result.score, result.greedy_score)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Checks for recurrence.py: rules expand to the right dates, days are stored
+as deltas and read back as they were saved, and `compact` turns repeated
+classes into rules without changing any schedule.
+
+    python -m pytest -q test_recurrence.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from recurrence import RECURRENCE_FILE, Calendar, LayeredDays, extract_rules, is_delta
+from scheduler import build_schedule
+from storage import DayStore, key_for_date
+
+MONDAY = date(2026, 10, 5)
+
+def strip_rules(day):
+    return dict(day, classes=[{k: v for k, v in c.items() if k != "rule"} for c in day["classes"]])
+
+class RecurrenceTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.open()
+
+    def open(self):
+        self.store = DayStore(self.root, legacy_file=None)
+        self.addCleanup(self.store.close)
+        self.calendar = Calendar(os.path.join(self.root, RECURRENCE_FILE))
+        self.days = LayeredDays(self.store, self.calendar)
+
+    def reopen(self):
+        self.store.close()
+        self.open()
+
+    def test_rules_and_templates(self):
+        math = self.calendar.add_rule("Math", "10:00", "11:00", [0, 2], first=MONDAY,
+                                      last=MONDAY + timedelta(days=20), exceptions=[MONDAY + timedelta(days=7)])
+        self.calendar.set_template("Saturday", {"meals": {"Lunch": "14:00"}})
+        self.reopen()
+
+        held = [d for d in (MONDAY + timedelta(days=i) for i in range(-7, 28)) if self.calendar.rules_on(d)]
+        self.assertEqual([(d - MONDAY).days for d in held], [0, 2, 9, 14, 16])
+        self.assertEqual(self.calendar.base(MONDAY)["classes"],
+                         [{"name": "Math", "start": "10:00", "end": "11:00", "rule": math["id"]}])
+        saturday = self.calendar.base(MONDAY + timedelta(days=5))["meals"]
+        self.assertEqual(saturday, {"Breakfast": "09:00", "Lunch": "14:00", "Dinner": "20:00"})
+
+        self.calendar.add_exception(math["id"], MONDAY + timedelta(days=14))
+        self.assertEqual(self.calendar.rules_on(MONDAY + timedelta(days=14)), [])
+
+    def test_days_are_stored_as_deltas(self):
+        math = self.calendar.add_rule("Math", "10:00", "11:00", [0])
+        art = self.calendar.add_rule("Art", "15:00", "16:00", [0])
+        key = key_for_date(MONDAY)
+        # A rule-only date exists, but is not a stored day
+        self.assertIn(key, self.days)
+        self.assertEqual(self.days.keys(), [])
+
+        day = dict(self.days[key])
+        day["classes"] = [c for c in day["classes"] if c["rule"] != art["id"]] + \
+                         [{"name": "Lab", "start": "17:00", "end": "18:00"}]
+        day["meals"] = {"Breakfast": "08:00", "Lunch": "13:00"}
+        day["tasks"] = [{"name": "Read", "duration": 30, "priority": "High"}]
+        day["optimize"] = True
+        self.days[key] = day
+        self.reopen()
+
+        stored = self.store[key]
+        self.assertTrue(is_delta(stored))
+        self.assertEqual(stored["classes"], [{"name": "Lab", "start": "17:00", "end": "18:00"}])
+        self.assertEqual(stored["skip"], [art["id"]])
+        self.assertEqual(stored["meals"], {"Breakfast": "08:00", "Dinner": None})
+        self.assertEqual(self.days[key], day)
+        self.assertEqual(self.days.keys(), [key])
+
+        # Later rule changes reach the stored day; full copies stay as they are
+        self.calendar.remove_rule(math["id"])
+        self.assertEqual([c["name"] for c in self.days[key]["classes"]], ["Lab"])
+        full = {"tasks": [], "classes": [{"name": "Old", "start": "09:00", "end": "10:00"}], "meals": {}}
+        self.store.put_day(key_for_date(MONDAY + timedelta(days=7)), full)
+        self.assertEqual(self.days[key_for_date(MONDAY + timedelta(days=7))], full)
+
+    def test_compact_keeps_every_schedule(self):
+        weeks = 5
+        before = {}
+        for i in range(weeks):
+            d = MONDAY + timedelta(days=7 * i)
+            classes = [{"name": "Gym", "start": "07:00", "end": "08:00"}]
+            if i != 2:
+                classes.append({"name": "Math", "start": "10:00", "end": "11:00"})
+            if i == 4:
+                classes.append({"name": "Talk", "start": "18:00", "end": "19:00"})
+            before[key_for_date(d)] = {"tasks": [{"name": f"T{i}", "duration": 60, "priority": "Medium"}],
+                                       "classes": classes, "meals": {"Lunch": "13:00"}}
+            self.store.put_day(key_for_date(d), before[key_for_date(d)])
+
+        same = lambda full, resolved: build_schedule(full) == build_schedule(resolved)
+        rules, rewritten = extract_rules(self.store, self.calendar, min_weeks=3, check=same)
+        self.assertEqual(sorted(r["name"] for r in rules), ["Gym", "Math"])
+        math = next(r for r in rules if r["name"] == "Math")
+        self.assertEqual(math["except"], [(MONDAY + timedelta(days=14)).isoformat()])
+        self.assertEqual(rewritten, weeks)
+        self.reopen()
+
+        for key, full in before.items():
+            self.assertTrue(is_delta(self.store[key]))
+            self.assertEqual(build_schedule(strip_rules(self.days[key])), build_schedule(full))
+
+if __name__ == "__main__":
+    unittest.main()
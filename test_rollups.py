@@ -0,0 +1,111 @@
+"""
+Checks for rollups.py: range stats from the running totals match
+summarizing the schedules directly, outdated rows are refused, and the
+saved file is merged with the changes made while it was being read.
+
+    python -m pytest -q test_rollups.py
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from analytics import summarize
+from rollups import RollupStore, day_rollup
+from scheduler import DAY_END, DAY_START, build_schedule, min_to_time
+from storage import key_for_date
+
+FIRST = date(2026, 9, 1)
+
+def random_day(rnd):
+    classes = []
+    for _ in range(rnd.randrange(0, 4)):
+        start = rnd.randrange(DAY_START, DAY_END - 30)
+        classes.append({"name": "C", "start": min_to_time(start), "end": min_to_time(start + rnd.choice([30, 60, 90]))})
+    tasks = [{"name": f"T{i}", "duration": rnd.choice([15, 30, 60, 120]), "priority": rnd.choice(["High", "Medium", "Low"]),
+              "completed": rnd.random() < 0.3} for i in range(rnd.randrange(0, 6))]
+    return {"classes": classes, "tasks": tasks, "meals": {"Lunch": "13:00"} if rnd.random() < 0.5 else {}}
+
+class RollupStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.path = os.path.join(self.root, "rollups.json")
+        rnd = random.Random(7)
+        # Every other day or so over two months
+        self.days = {}
+        for i in range(60):
+            if rnd.random() < 0.6:
+                d = FIRST + timedelta(days=i)
+                self.days[d] = random_day(rnd)
+        self.schedules = {d: build_schedule(data) for d, data in self.days.items()}
+
+    def filled(self):
+        rollups = RollupStore(self.path)
+        rollups.load("s1", lambda: [key_for_date(d) for d in self.days])
+        for d, data in self.days.items():
+            self.assertTrue(rollups.update(key_for_date(d), day_rollup(self.schedules[d], data)))
+        return rollups
+
+    def test_stats_match_summarize(self):
+        rollups = self.filled()
+        rnd = random.Random(8)
+        for _ in range(100):
+            first = FIRST + timedelta(days=rnd.randrange(-5, 65))
+            last = first + timedelta(days=rnd.randrange(0, 30))
+            dates = [d for d in sorted(self.days) if first <= d <= last]
+            if not dates:
+                self.assertEqual(rollups.totals(first, last)["days"], 0)
+                continue
+            self.assertEqual(rollups.stats(first, last), summarize([self.schedules[d] for d in dates], dates))
+
+    def test_outdated_rows_are_refused(self):
+        rollups = self.filled()
+        k = key_for_date(min(self.days))
+        gen = rollups.generation(k)
+        rollups.invalidate(k)
+        self.assertIn(k, rollups.dirty)
+        self.assertIsNone(rollups.day_stats(k))
+        row = day_rollup(self.schedules[min(self.days)], self.days[min(self.days)])
+        self.assertFalse(rollups.update(k, row, gen))       # computed before the change
+        self.assertTrue(rollups.update(k, dict(row), rollups.generation(k)))
+
+        # A toggle patches the clean row and outdates rows still being computed
+        gen = rollups.generation(k)
+        rollups.patch(k, tasks_done=row["tasks_done"] + 1)
+        self.assertEqual(rollups.rows[k]["tasks_done"], row["tasks_done"] + 1)
+        self.assertFalse(rollups.update(k, row, gen))
+
+    def test_adopt_keeps_changes_made_while_reading(self):
+        self.filled().save("s1")
+        keys = [key_for_date(d) for d in sorted(self.days)]
+        changed, updated, patched = keys[:3]
+
+        rollups = RollupStore(self.path)
+        saved = rollups.read("s1", lambda: self.fail("a fresh file needs no key list"))
+        rollups.invalidate(changed)
+        rollups.update(updated, dict(saved[0][updated], tasks_done=99))
+        rollups.patch(patched, tasks_done=0)     # no row yet: recomputed rather than trusted
+        self.assertTrue(rollups.adopt(saved))
+
+        self.assertEqual(rollups.dirty, {changed, patched})
+        self.assertEqual(rollups.rows[updated]["tasks_done"], 99)
+        self.assertEqual(set(rollups.rows), set(keys) - {changed, patched})
+
+    def test_stale_file_is_rebuilt(self):
+        self.filled().save("s1")
+        keys = [key_for_date(d) for d in self.days]
+        rollups = RollupStore(self.path)
+        self.assertFalse(rollups.load("s2", lambda: keys))
+        self.assertEqual((rollups.rows, rollups.dirty), ({}, set(keys)))
+
+        rollups = RollupStore(self.path)
+        saved = rollups.read("s1", lambda: keys)
+        rollups.invalidate_all()        # e.g. a weekly rule added before the file was taken in
+        rollups.adopt(saved)
+        self.assertEqual((rollups.rows, rollups.dirty), ({}, set(keys)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Checks for scheduler.py: placement gives the same schedules as the
+original calculate_schedule (copied below as it was) on random days,
+malformed ones included, and the editor's IncrementalScheduler the same
+as placing the edited day from scratch.
+
+    python -m pytest -q test_scheduler.py
+"""
+import random
+import unittest
+from datetime import datetime
+
+from scheduler import IncrementalScheduler, build_schedule, min_to_time
+
+# --- BASELINE ---
+# ModernTimetableApp.calculate_schedule and its helpers before the free-gap index, unchanged
+
+def time_to_min(t_str):
+    """Convert HH:MM string to minutes from midnight."""
+    try:
+        t = datetime.strptime(t_str, "%H:%M")
+        return t.hour * 60 + t.minute
+    except:
+        return 0
+
+def calculate_schedule(data):
+    timeline = []
+
+    # 1. Fixed Events
+    for c in data.get("classes", []):
+        s, e = time_to_min(c["start"]), time_to_min(c["end"])
+        timeline.append({"name": c["name"], "start_min": s, "end_min": e, "type": "Class", "duration": e-s})
+
+    for m, t in data.get("meals", {}).items():
+        s = time_to_min(t)
+        timeline.append({"name": m, "start_min": s, "end_min": s+45, "type": "Meal", "duration": 45})
+
+    timeline.sort(key=lambda x: x['start_min'])
+
+    # 2. Place Tasks
+    tasks = sorted(data.get("tasks", []), key=lambda x: {"High": 0, "Medium": 1, "Low": 2}[x["priority"]])
+
+    # Define active day range (e.g., 08:00 to 23:00)
+    day_start = 8 * 60
+    day_end = 23 * 60
+
+    for task in tasks:
+        t_dur = task["duration"]
+        if t_dur < 10: t_dur = t_dur * 60 # Assume hours if small number
+
+        current_pointer = day_start
+
+        # Try to find a gap
+        for i in range(len(timeline) + 1):
+            # Determine gap window
+            gap_start = current_pointer
+            if i < len(timeline):
+                gap_end = timeline[i]['start_min']
+                next_event_end = timeline[i]['end_min']
+            else:
+                gap_end = day_end
+                next_event_end = day_end # End of loop
+
+            if gap_end - gap_start >= t_dur:
+                # Found space!
+                timeline.append({
+                    "name": task["name"],
+                    "start_min": gap_start,
+                    "end_min": gap_start + t_dur,
+                    "type": "Task",
+                    "duration": t_dur,
+                    "completed": task.get("completed", False)
+                })
+                timeline.sort(key=lambda x: x['start_min'])
+                break
+
+            current_pointer = max(current_pointer, next_event_end)
+
+    # Add formatted time strings
+    for item in timeline:
+        item['start'] = min_to_time(item['start_min'])
+        item['end'] = min_to_time(item['end_min'])
+
+    return timeline
+
+# --- RANDOM DAYS ---
+def random_class(rnd):
+    start = rnd.randrange(0, 1439)
+    end = start + rnd.choice([0, 10, 30, 45, 60, 120, 300, -5])    # -5: ends before it starts
+    return {"name": f"C{rnd.randrange(99)}", "start": min_to_time(start), "end": min_to_time(max(0, min(end, 1439)))}
+
+def random_task(rnd):
+    return {"name": f"T{rnd.randrange(99)}", "duration": rnd.choice([0, 1, 2, 5, 15, 20, 30, 45, 60, 90, 120, 200, 600]),
+            "priority": rnd.choice(["High", "Medium", "Low"]), "completed": rnd.random() < 0.3}
+
+def random_day(rnd, max_classes=8, max_tasks=12):
+    meals = {"Breakfast": "09:00", "Lunch": "13:00", "Dinner": "20:00"}
+    return {"classes": [random_class(rnd) for _ in range(rnd.randrange(max_classes))],
+            "tasks": [random_task(rnd) for _ in range(rnd.randrange(max_tasks))],
+            "meals": meals if rnd.random() < 0.8 else {}}
+
+class PlacementTest(unittest.TestCase):
+    def test_matches_the_original_schedule(self):
+        rnd = random.Random(1)
+        for _ in range(3000):
+            data = random_day(rnd)
+            self.assertEqual(build_schedule(data), calculate_schedule(data), data)
+
+    def test_matches_the_original_schedule_on_busy_days(self):
+        rnd = random.Random(2)
+        for _ in range(100):
+            data = random_day(rnd, max_classes=60, max_tasks=150)
+            self.assertEqual(build_schedule(data), calculate_schedule(data))
+
+class IncrementalSchedulerTest(unittest.TestCase):
+    def test_edits_match_build_schedule(self):
+        rnd = random.Random(3)
+        for _ in range(300):
+            data = random_day(rnd)
+            if rnd.random() < 0.1:
+                data["classes"].append({"name": "bad", "start": "x", "end": "10:00"})     # left out, like compile_day does
+            inc = IncrementalScheduler(data)
+            for _ in range(10):
+                r = rnd.random()
+                if r < 0.35:
+                    t = random_task(rnd)
+                    data["tasks"].append(t)
+                    inc.add_task(t)
+                elif r < 0.55 and data["tasks"]:
+                    i = rnd.randrange(len(data["tasks"]))
+                    data["tasks"].pop(i)
+                    inc.remove_task(i)
+                elif r < 0.8:
+                    c = random_class(rnd)
+                    data["classes"].append(c)
+                    inc.add_class(c)
+                elif data["classes"]:
+                    i = rnd.randrange(len(data["classes"]))
+                    data["classes"].pop(i)
+                    inc.remove_class(i)
+                self.assertEqual(inc.schedule(), build_schedule(data))
+
+    def test_preview_leaves_the_day_as_it_was(self):
+        data = {"tasks": [{"name": n, "duration": 30, "priority": "High"} for n in ("a", "b")],
+                "classes": [{"name": "Math", "start": "09:00", "end": "10:00"}], "meals": {"Lunch": "13:00"}}
+        inc = IncrementalScheduler(data)
+        extra = {"name": "c", "duration": 45, "priority": "Low"}
+        schedule, unplaced = inc.preview(lambda: inc.add_task(extra), lambda: inc.remove_task(2))
+        self.assertEqual(schedule, build_schedule(dict(data, tasks=data["tasks"] + [extra])))
+        self.assertEqual(unplaced, [])
+        self.assertEqual(inc.schedule(), build_schedule(data))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Checks for server.py: PUT bodies are checked before anything is stored,
+concurrent toggles of a day all land, task names may hold any character,
+and the day locks stay a fixed set.
+
+    python -m pytest -q test_server.py
+"""
+import http.client
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from server import DAY_LOCKS, ApiError, ApiServer, ZenithService
+
+DAY = date(2026, 10, 17)
+
+def day(*tasks):
+    return {"tasks": [{"name": n, "duration": 15, "priority": "Medium"} for n in tasks],
+            "classes": [{"name": "Math", "start": "09:00", "end": "10:00"}], "meals": {}}
+
+class ServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.service = ZenithService(self.root, legacy_file=None)
+        self.addCleanup(self.service.close)
+
+    def test_bad_days_are_not_stored(self):
+        bad = [[], {"tasks": {}}, {"tasks": ["Read"]}, {"tasks": [{"duration": 30, "priority": "High"}]},
+               {"tasks": [{"name": "Read", "duration": 30, "priority": "Urgent"}]},
+               {"tasks": [{"name": "Read", "duration": 30, "priority": "High", "completed": "yes"}]},
+               {"classes": [{"name": "Math", "start": "9am", "end": "10:00"}]}]
+        for body in bad:
+            with self.assertRaises(ApiError) as caught:
+                self.service.put_day(DAY, body)
+            self.assertEqual(caught.exception.status, 400)
+        self.assertEqual(self.service.days.keys(), [])
+
+    def test_concurrent_toggles_all_land(self):
+        names = [f"Task {i}" for i in range(20)]
+        self.service.put_day(DAY, day(*names))
+        threads = [threading.Thread(target=self.service.set_completed, args=(DAY, n, True)) for n in names]
+        threads += [threading.Thread(target=self.service.schedule, args=(DAY,)) for _ in range(5)]
+        threads += [threading.Thread(target=self.service.analytics, args=("week", DAY)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        schedule = self.service.schedule(DAY)["schedule"]
+        self.assertTrue(all(x["completed"] for x in schedule if x["type"] == "Task"))
+        self.assertEqual(self.service.analytics("day", DAY)["days"], 1)
+
+    def test_day_locks_stay_fixed(self):
+        for i in range(500):
+            self.service.put_day(DAY + timedelta(days=i), day("a"))
+        self.assertEqual(len(self.service._day_locks), DAY_LOCKS)
+
+class HttpTest(unittest.TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        service = ZenithService(root, legacy_file=None)
+        self.server = ApiServer(service, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(service.close)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+        self.addCleanup(self.conn.close)
+
+    def call(self, method, path, body=None):
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                          headers={"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_task_names_with_slashes(self):
+        names = ["Read ch. 1/2", "50% done", "Math / Physics"]
+        self.assertEqual(self.call("PUT", f"/api/days/{DAY.isoformat()}", day(*names))[0], 200)
+        self.assertEqual(self.call("POST", f"/api/days/{DAY.isoformat()}/tasks/{quote(names[0], safe='')}",
+                                   {"completed": True})[0], 200)
+        self.assertEqual(self.call("POST", f"/api/days/{DAY.isoformat()}/tasks/{quote(names[1])}",
+                                   {"completed": True})[0], 200)
+        self.assertEqual(self.call("POST", f"/api/days/{DAY.isoformat()}/tasks",
+                                   {"name": names[2], "completed": True})[0], 200)
+        status, body = self.call("GET", f"/api/days/{DAY.isoformat()}")
+        self.assertEqual(status, 200)
+        self.assertEqual({x["name"]: x["completed"] for x in body["schedule"] if x["type"] == "Task"},
+                         dict.fromkeys(names, True))
+
+    def test_unknown_task(self):
+        self.call("PUT", f"/api/days/{DAY.isoformat()}", day("Read"))
+        self.assertEqual(self.call("POST", f"/api/days/{DAY.isoformat()}/tasks/Write", {"completed": True})[0], 404)
+        self.assertEqual(self.call("POST", f"/api/days/{DAY.isoformat()}/tasks", {"completed": True})[0], 400)
+
+if __name__ == "__main__":
+    unittest.main()
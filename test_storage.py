@@ -0,0 +1,120 @@
+"""
+Checks for storage.py: the journal is replayed on reopen (a torn last
+record dropped) and compacted into day files across sessions, and the
+legacy file is only moved aside once the migrated days are on disk.
+
+    python -m pytest -q test_storage.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import storage
+from storage import DayStore
+
+def day(*tasks):
+    return {"tasks": [{"name": n, "duration": 30, "priority": "High"} for n in tasks],
+            "classes": [{"name": "Math", "start": "09:00", "end": "10:00"}], "meals": {"Lunch": "13:00"}}
+
+class DayStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def open(self, compact_after=1000):
+        return DayStore(self.root, legacy_file=None, compact_after=compact_after, debounce=0)
+
+    def test_reopen_replays_the_journal(self):
+        store = self.open()
+        store.put_day("Monday 12-10-2026", day("a", "b"))
+        store.put_day("Tuesday 13-10-2026", day("c"))
+        store.set_completed("Monday 12-10-2026", "b", True)
+        store.delete_day("Tuesday 13-10-2026")
+        store.close()
+
+        store = self.open()
+        self.assertEqual(store.keys(), ["Monday 12-10-2026"])
+        self.assertNotIn("Tuesday 13-10-2026", store)
+        self.assertEqual([t.get("completed", False) for t in store["Monday 12-10-2026"]["tasks"]], [False, True])
+        store.close()
+
+    def test_torn_last_record_is_dropped(self):
+        store = self.open()
+        store.put_day("Monday 12-10-2026", day("a"))
+        store.close()
+        with open(os.path.join(self.root, "journal.jsonl"), "a") as f:
+            f.write('{"op": "put_day", "day": "Tuesday 13-10-2026", "da')      # crash mid-append
+
+        store = self.open()
+        self.assertEqual(store.keys(), ["Monday 12-10-2026"])
+        store.put_day("Wednesday 14-10-2026", day("b"))
+        store.close()
+        store = self.open()
+        self.assertEqual(store.keys(), ["Monday 12-10-2026", "Wednesday 14-10-2026"])
+        store.close()
+
+    def test_compaction_after_reopen(self):
+        store = self.open(compact_after=5)
+        for i in range(1, 21):
+            store.put_day(f"Day {i:02d}-10-2026", day(f"t{i}"))
+        store.close()
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "days"))), 20)     # compacted into day files
+
+        store = self.open(compact_after=5)
+        for i in range(1, 21, 2):
+            store.set_completed(f"Day {i:02d}-10-2026", f"t{i}", True)
+        store.delete_day("Day 20-10-2026")
+        store.close()
+        self.assertFalse(os.path.exists(os.path.join(self.root, "journal.old")))
+
+        store = self.open(compact_after=5)
+        self.assertEqual(store.keys(), sorted(f"Day {i:02d}-10-2026" for i in range(1, 20)))
+        for i in range(1, 20):
+            self.assertEqual(store[f"Day {i:02d}-10-2026"]["tasks"][0].get("completed", False), i % 2 == 1)
+        store.close()
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.legacy = os.path.join(self.root, "weekly_timetable.json")
+        with open(self.legacy, "w") as f:
+            json.dump({"Monday 12-10-2026": day("a"), "Tuesday 13-10-2026": day("b")}, f)
+
+    def test_days_are_durable_before_the_legacy_file_moves(self):
+        events = []
+        real_fsync, real_replace = os.fsync, os.replace
+        def fsync(fd):
+            events.append("fsync")
+            real_fsync(fd)
+        def fsync_dir(path):
+            events.append(("fsync_dir", path))
+        def replace(src, dst):
+            events.append(("replace", os.path.basename(dst)))
+            real_replace(src, dst)
+        data = os.path.join(self.root, "data")
+        with mock.patch.object(storage.os, "fsync", fsync), mock.patch.object(storage, "fsync_dir", fsync_dir), \
+                mock.patch.object(storage.os, "replace", replace):
+            store = DayStore(data, legacy_file=self.legacy)
+        store.close()
+
+        moved = events.index(("replace", "weekly_timetable.json.migrated"))
+        days_synced = events.index(("fsync_dir", os.path.join(data, "days")))
+        for name in ("Monday 12-10-2026", "Tuesday 13-10-2026"):
+            written = events.index(("replace", storage.day_filename(name)))
+            self.assertEqual(events[written - 1], "fsync")
+            self.assertLess(written, days_synced)
+        self.assertLess(days_synced, events.index(("replace", "manifest.json")))
+        self.assertLess(events.index(("fsync_dir", data)), moved)
+
+        self.assertFalse(os.path.exists(self.legacy))
+        store = DayStore(data, legacy_file=self.legacy)
+        self.assertEqual(store.keys(), ["Monday 12-10-2026", "Tuesday 13-10-2026"])
+        self.assertEqual(store["Tuesday 13-10-2026"], day("b"))
+        store.close()
+
+if __name__ == "__main__":
+    unittest.main()